@@ -0,0 +1,67 @@
+import logging
+import os
+import sys
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from duckdb_fns.connection import get_connection, log_peak_memory
+from path_fns.filepaths import (
+    PERSONS_BY_DOD_RAW_OUT_PATH,
+    NAMES_RAW_OUT_PATH_GIVEN_NAME,
+    NAMES_RAW_OUT_PATH_FAMILY_NAME,
+    WIKIDATA_DUMP_STAGING,
+)
+from scrape_wikidata.wikidata_dump import (
+    stage_dump,
+    get_raw_persons,
+    write_raw_persons_by_dod,
+    get_raw_names,
+)
+
+# An alternative to 01_scrape_persons.py and 02_scrape_names.py that reads a
+# locally downloaded Wikidata JSON dump rather than querying the SPARQL endpoint
+# e.g. https://dumps.wikimedia.org/wikidatawiki/entities/latest-all.json.bz2
+#
+# python 01_02_ingest_wikidata_dump.py latest-all.json.bz2
+#
+# or, with a faster parallel decompressor:
+#
+# lbzip2 -dc latest-all.json.bz2 | python 01_02_ingest_wikidata_dump.py -
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("scrape_wikidata").setLevel(logging.INFO)
+logging.getLogger("duckdb_fns").setLevel(logging.INFO)
+
+if __name__ == "__main__":
+    dump_path = sys.argv[1]
+
+    for path in [
+        WIKIDATA_DUMP_STAGING,
+        PERSONS_BY_DOD_RAW_OUT_PATH,
+        NAMES_RAW_OUT_PATH_GIVEN_NAME,
+        NAMES_RAW_OUT_PATH_FAMILY_NAME,
+    ]:
+        Path(path).mkdir(parents=True, exist_ok=True)
+
+    stage_dump(dump_path, WIKIDATA_DUMP_STAGING)
+
+    con = get_connection()
+
+    raw_persons = get_raw_persons(con, WIKIDATA_DUMP_STAGING).fetch_arrow_table()
+    write_raw_persons_by_dod(raw_persons)
+
+    for name_type, out_path in [
+        ("given", NAMES_RAW_OUT_PATH_GIVEN_NAME),
+        ("family", NAMES_RAW_OUT_PATH_FAMILY_NAME),
+    ]:
+        names = get_raw_names(con, WIKIDATA_DUMP_STAGING, name_type)
+        pq.write_table(
+            names.fetch_arrow_table(),
+            os.path.join(out_path, "dump_name_variants.parquet"),
+        )
+
+    log_peak_memory(con, "01_02_ingest_wikidata_dump")
@@ -0,0 +1,18 @@
+import logging
+
+from scrape_wikidata.compaction import compact_raw_persons
+
+# Merges the many small files written by 01_scrape_persons.py (one per month of
+# date of death, or one per year before 1700) into a few large files, which are
+# much faster for 03_raw_persons_data_to_one_line_per_person.py to read.
+#
+# Can be run at any point during the scrape, and as often as you like. The raw
+# files that have been compacted are listed in a manifest, so 01_scrape_persons.py
+# does not scrape them again
+
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("scrape_wikidata").setLevel(logging.INFO)
+
+compact_raw_persons()
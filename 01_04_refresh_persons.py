@@ -0,0 +1,23 @@
+import logging
+import sys
+
+from scrape_wikidata.refresh import refresh_persons
+
+# Rescrapes the humans modified on Wikidata since the last refresh, rather than
+# every date of death.  The first refresh covers everything modified since the
+# scrape by 01_scrape_persons.py began.
+#
+# python 01_04_refresh_persons.py [modified since, e.g. 2022-09-01T00:00:00Z]
+#
+# Then apply the refresh to the one row per person data with
+#
+# python 03_raw_persons_data_to_one_line_per_person.py --incremental
+
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("scrape_wikidata").setLevel(logging.INFO)
+
+since = sys.argv[1] if len(sys.argv) > 1 else None
+
+refresh_persons(since=since)
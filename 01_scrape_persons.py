@@ -1,10 +1,10 @@
 import datetime
 import calendar
 import time
-import os
 import pandas as pd
 
 from scrape_wikidata.query_wikidata import query_with_date, QUERY_HUMAN
+from scrape_wikidata.compaction import raw_file_exists
 from path_fns.filepaths import (
     PERSONS_BY_DOD_RAW_OUT_PATH,
     persons_by_dob_raw_filename_year_month,
@@ -31,7 +31,7 @@ for year in range(2000, 1700, -1):
         filename = persons_by_dob_raw_filename_year_month(year, month)
         dfs = []
         start_time = time.time()
-        if not os.path.exists(filename):
+        if not raw_file_exists(filename):
             for this_date in date_list:
                 print(f"Scraping date {this_date}")
                 df = query_with_date(QUERY_HUMAN, this_date)
@@ -51,7 +51,7 @@ for year in range(1700, -2000, -1):
     print(f"Starting year {year}")
 
     filename = persons_by_dob_raw_filename_full_year(year)
-    if not os.path.exists(filename):
+    if not raw_file_exists(filename):
         dfs = []
         start_time = time.time()
         for month in range(12, 0, -1):
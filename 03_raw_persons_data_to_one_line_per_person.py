@@ -1,24 +1,59 @@
-import duckdb
-import pyarrow.parquet as pq
+import logging
+import os
+import sys
 
-from path_fns.filepaths import (
-    PERSONS_BY_DOB_RAW_OUT_PATH,
-    PERSONS_PROCESSED_ONE_ROW_PER_PERSON,
+from duckdb_fns.connection import get_connection, log_peak_memory
+
+from path_fns.filepaths import PERSONS_PROCESSED_ONE_ROW_PER_PERSON
+from scrape_wikidata.compaction import (
+    read_raw_persons,
+    raw_persons_paths,
+    unified_string_schema,
+)
+from scrape_wikidata.refresh import (
+    load_refresh_state,
+    dirty_deltas,
+    mark_deltas_applied,
+    read_delta_humans,
+    read_delta_rows,
 )
 
-# Using arrow to read because it performs schema merging
-# i.e. if some files are missing a column it doesn't matter
-# duckdb doesn't do this
-arrow_table = pq.read_table(PERSONS_BY_DOB_RAW_OUT_PATH)
+# python 03_raw_persons_data_to_one_line_per_person.py [--incremental]
+#
+# With --incremental, only the humans rescraped by 01_04_refresh_persons.py since
+# this last ran are recomputed, and the rest are kept from the existing output
+
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("duckdb_fns").setLevel(logging.INFO)
 
-con = duckdb.connect(":memory:")
+incremental = "--incremental" in sys.argv[1:] and os.path.exists(
+    PERSONS_PROCESSED_ONE_ROW_PER_PERSON
+)
+refresh_state = load_refresh_state()
+dirty = dirty_deltas(refresh_state)
+
+if incremental:
+    # The schema of the whole raw store, so that every column exists even if
+    # no rescraped human has a value for it
+    schema = unified_string_schema(raw_persons_paths(refresh_state["deltas"]))
+    arrow_table = read_delta_rows(dirty, refresh_state["deltas"], schema)
+    print(f"Recomputing {arrow_table.num_rows:,.0f} rescraped rows")
+else:
+    # Using arrow to read because it performs schema merging
+    # i.e. if some files are missing a column it doesn't matter
+    # duckdb doesn't do this.  Reads both the compacted files written by
+    # 01_03_compact_raw_persons.py and any raw files not yet compacted
+    arrow_table = read_raw_persons()
+
+con = get_connection()
 con.register("df", arrow_table)
 
 wikireplace = """replace({col}, 'http://www.wikidata.org/entity/', '') as {col}"""
 cast_date = "TRY_CAST({col} as date) as {col}"
 
-sql = f"""
-COPY (
+one_row_per_person_sql = f"""
 with nowikiurl as
 (
 select
@@ -119,13 +154,38 @@ select
     array_filter(ethnicity, x -> x is not null) as ethnicity,
     array_filter(ethnicityLabel, x -> x is not null) as ethnicityLabel
 from distinct_arrays
-)
-TO '{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}' (FORMAT 'parquet')
-
 """
 
-
-con.execute(sql)
+if incremental:
+    con.register("dirty_humans", read_delta_humans(dirty))
+    tmp_path = f"{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}.tmp"
+    sql = f"""
+    COPY (
+    select *
+    from '{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}'
+    where human not in (select human from dirty_humans)
+
+    union all
+
+    select *
+    from ({one_row_per_person_sql})
+    )
+    TO '{tmp_path}' (FORMAT 'parquet')
+    """
+    con.execute(sql)
+    os.replace(tmp_path, PERSONS_PROCESSED_ONE_ROW_PER_PERSON)
+else:
+    sql = f"""
+    COPY (
+    {one_row_per_person_sql}
+    )
+    TO '{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}' (FORMAT 'parquet')
+    """
+    con.execute(sql)
+
+# Both runs include every delta, so none remain dirty
+mark_deltas_applied(dirty)
+log_peak_memory(con, "03_raw_persons_data_to_one_line_per_person")
 
 
 import pandas as pd
@@ -0,0 +1,52 @@
+import logging
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from corrupt.phonetic_index import PhoneticNameIndex
+from path_fns.filepaths import (
+    NAMES_PROCESSED_NAME_FREQUENCY_COUNTS,
+    NAMES_PROCESSED_PHONETIC_NAME_INDEX,
+    phonetic_name_index_filename,
+)
+from transform_master_data.phonetic import PHONETIC_ENCODINGS
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    format="%(message)s",
+)
+logger.setLevel(logging.INFO)
+
+# Build an index from phonetic code to the given or family names with that code,
+# weighted by how common each name is, for the full_name_sound_alike corruption
+# function.  Uses the name frequency counts written by 04_create_name_lookups.py.
+#
+# Names are swapped token by token, so only single token names are indexed, and
+# initials such as 'j.' are left out
+
+NAME_TYPE_COLUMNS = {"given": "given_nameLabel", "family": "family_nameLabel"}
+
+Path(NAMES_PROCESSED_PHONETIC_NAME_INDEX).mkdir(parents=True, exist_ok=True)
+
+name_frequency_counts = pq.read_table(NAMES_PROCESSED_NAME_FREQUENCY_COUNTS)
+
+for name_type, name_col in NAME_TYPE_COLUMNS.items():
+    counts = name_frequency_counts.filter(
+        pc.and_(
+            pc.equal(name_frequency_counts["name_col"], name_col),
+            pc.match_substring_regex(name_frequency_counts["name"], r"^[^ .]{2,}$"),
+        )
+    )
+    for encoding, encode in PHONETIC_ENCODINGS.items():
+        index = PhoneticNameIndex.build(
+            counts["name"].to_pylist(), counts["count"].to_numpy(), encode
+        )
+        index.save(phonetic_name_index_filename(name_type, encoding))
+
+        num_sound_alike = int((index.group_end - index.group_start > 1).sum())
+        logger.info(
+            f"Indexed {len(index.names):,.0f} {name_type} names by {encoding} into "
+            f"{len(index.codes):,.0f} codes, {num_sound_alike:,.0f} names have "
+            "a sound-alike"
+        )
@@ -1,15 +1,30 @@
+import logging
+import os
+from pathlib import Path
+
 import pyarrow.parquet as pq
 from transform_master_data.alt_name_lookups import (
+    NAME_FREQUENCY_COUNTS_VERSION,
+    get_name_frequency_counts,
     get_name_weighted_lookup,
 )
-import duckdb
+
+from duckdb_fns.connection import get_connection, log_peak_memory
 from path_fns.filepaths import (
     NAMES_RAW_OUT_PATH_GIVEN_NAME,
     NAMES_RAW_OUT_PATH_FAMILY_NAME,
     PERSONS_PROCESSED_ONE_ROW_PER_PERSON,
     NAMES_PROCESSED_GIVEN_NAME_ALT_LOOKUP,
     NAMES_PROCESSED_FAMILY_NAME_ALT_LOOKUP,
+    NAMES_PROCESSED_NAME_FREQUENCY_COUNTS,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    format="%(message)s",
 )
+logging.getLogger("duckdb_fns").setLevel(logging.INFO)
+logger.setLevel(logging.INFO)
 
 # Use the alternative names in out_data/wikidata/raw/names
 # to create lookups like.  These can then be fed to numpy np.random.choice(names, p=weights)
@@ -19,7 +34,41 @@ from path_fns.filepaths import (
 # |:----------------|:----------------------------------|:-------------------------|
 # | jody            | ['joseph', 'joe', 'judith', 'jo'] | [0.43, 0.23, 0.16, 0.16] |
 
-con = duckdb.connect()
+Path(NAMES_PROCESSED_NAME_FREQUENCY_COUNTS).parent.mkdir(parents=True, exist_ok=True)
+
+con = get_connection()
+
+# Name frequencies for both given and family names are computed together and
+# cached until the scraped data changes, or the cache was written by a different
+# version of get_name_frequency_counts.  Counting the names is most of the work,
+# so rebuilding the lookups from the cache is much faster
+VERSION_KEY = b"name_frequency_counts_version"
+
+
+def frequency_counts_stale():
+    if not os.path.exists(NAMES_PROCESSED_NAME_FREQUENCY_COUNTS):
+        return True
+    if os.path.getmtime(NAMES_PROCESSED_NAME_FREQUENCY_COUNTS) < os.path.getmtime(
+        PERSONS_PROCESSED_ONE_ROW_PER_PERSON
+    ):
+        return True
+    metadata = pq.read_schema(NAMES_PROCESSED_NAME_FREQUENCY_COUNTS).metadata or {}
+    return metadata.get(VERSION_KEY) != NAME_FREQUENCY_COUNTS_VERSION.encode()
+
+
+if frequency_counts_stale():
+    name_frequency_counts = get_name_frequency_counts(
+        con, f"'{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}'"
+    ).fetch_arrow_table()
+    name_frequency_counts = name_frequency_counts.replace_schema_metadata(
+        {VERSION_KEY: NAME_FREQUENCY_COUNTS_VERSION}
+    )
+    pq.write_table(name_frequency_counts, NAMES_PROCESSED_NAME_FREQUENCY_COUNTS)
+else:
+    logger.info(f"Using cached {NAMES_PROCESSED_NAME_FREQUENCY_COUNTS}")
+    name_frequency_counts = pq.read_table(NAMES_PROCESSED_NAME_FREQUENCY_COUNTS)
+
+con.register("name_frequency_counts", name_frequency_counts)
 
 alt_names_given = pq.read_table(NAMES_RAW_OUT_PATH_GIVEN_NAME)
 con.register("alt_names_given", alt_names_given)
@@ -29,7 +78,7 @@ weighted_lookup_given_name = get_name_weighted_lookup(
     con,
     "given_nameLabel",
     "alt_names_given",
-    f"'{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}'",
+    "name_frequency_counts",
 )
 weighted_lookup_given_name = weighted_lookup_given_name.fetch_arrow_table()
 
@@ -43,8 +92,10 @@ weighted_lookup_family_name = get_name_weighted_lookup(
     con,
     "family_nameLabel",
     "alt_names_family",
-    f"'{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}'",
+    "name_frequency_counts",
 )
 weighted_lookup_family_name = weighted_lookup_family_name.fetch_arrow_table()
 
 pq.write_table(weighted_lookup_family_name, NAMES_PROCESSED_FAMILY_NAME_ALT_LOOKUP)
+
+log_peak_memory(con, "04_create_name_lookups")
@@ -1,25 +1,54 @@
-import duckdb
+import logging
 import pyarrow.parquet as pq
 from pathlib import Path
 import os
 from path_fns.filepaths import (
     TRANSFORMED_MASTER_DATA_ONE_ROW_PER_PERSON,
+    TRANSFORMED_MASTER_DATA_VOCABULARIES,
+    TRANSFORMED_MASTER_DATA_PERSON_IDS,
     PERSONS_PROCESSED_ONE_ROW_PER_PERSON,
+    NAMES_PROCESSED_GIVEN_NAME_ALT_LOOKUP,
+    NAMES_PROCESSED_FAMILY_NAME_ALT_LOOKUP,
+    transformed_master_data_vocabulary_filename,
 )
 
 
 from transform_master_data.full_name_alternatives_per_person import (
     add_full_name_alternatives_per_person,
 )
+from transform_master_data.full_name_tokens import add_full_name_tokens
+from transform_master_data.person_ids import add_person_ids
 from transform_master_data.pipeline import SQLPipeline
+from duckdb_fns.connection import get_connection, log_peak_memory
 
 from transform_master_data.parse_point import parse_point_to_lat_lng
+from transform_master_data.dictionary_encode import (
+    DICTIONARY_ENCODED_COLUMNS,
+    get_vocabulary,
+    dictionary_encode_list_column,
+)
+
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("duckdb_fns").setLevel(logging.INFO)
 
 Path(TRANSFORMED_MASTER_DATA_ONE_ROW_PER_PERSON).mkdir(parents=True, exist_ok=True)
+Path(TRANSFORMED_MASTER_DATA_VOCABULARIES).mkdir(parents=True, exist_ok=True)
+Path(TRANSFORMED_MASTER_DATA_PERSON_IDS).parent.mkdir(parents=True, exist_ok=True)
 
-con = duckdb.connect()
+con = get_connection()
 pipeline = SQLPipeline(con)
 
+# Build a vocabulary for each dictionary encoded column, which is shared by all
+# records and used to decode the corrupted output
+for colname in DICTIONARY_ENCODED_COLUMNS:
+    vocabulary = get_vocabulary(
+        con, colname, f"'{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}'"
+    ).fetch_arrow_table()
+    con.register(f"vocabulary_{colname}", vocabulary)
+    pq.write_table(vocabulary, transformed_master_data_vocabulary_filename(colname))
+
 
 sql = f"""
 select *
@@ -31,15 +60,28 @@ limit 20
 
 pipeline.enqueue_sql(sql, "df")
 
+pipeline = add_person_ids(
+    pipeline, output_table_name="df_person_ids", input_table_name="df"
+)
+
 pipeline = add_full_name_alternatives_per_person(
-    pipeline, output_table_name="df_full_names", input_table_name="df"
+    pipeline, output_table_name="df_full_names", input_table_name="df_person_ids"
+)
+
+# Pre-tokenise the full name, so the corruption functions do no string parsing
+pipeline = add_full_name_tokens(
+    pipeline,
+    given_name_lookup_table=f"'{NAMES_PROCESSED_GIVEN_NAME_ALT_LOOKUP}'",
+    family_name_lookup_table=f"'{NAMES_PROCESSED_FAMILY_NAME_ALT_LOOKUP}'",
+    output_table_name="df_full_name_tokens",
+    input_table_name="df_full_names",
 )
 
 pipeline = parse_point_to_lat_lng(
     pipeline,
     "birth_coordinates",
     output_table_name="df_bc_fixed",
-    input_table_name="df_full_names",
+    input_table_name="df_full_name_tokens",
 )
 pipeline = parse_point_to_lat_lng(
     pipeline,
@@ -48,6 +90,18 @@ pipeline = parse_point_to_lat_lng(
     input_table_name="df_bc_fixed",
 )
 
+input_table_name = "df_rc_fixed"
+for colname in DICTIONARY_ENCODED_COLUMNS:
+    output_table_name = f"df_{colname}_encoded"
+    pipeline = dictionary_encode_list_column(
+        pipeline,
+        colname,
+        vocabulary_table_name=f"vocabulary_{colname}",
+        output_table_name=output_table_name,
+        input_table_name=input_table_name,
+    )
+    input_table_name = output_table_name
+
 
 df = pipeline.execute_pipeline()
 
@@ -58,3 +112,10 @@ out_path = os.path.join(
 
 df_arrow = df.fetch_arrow_table()
 pq.write_table(df_arrow, out_path)
+
+# Side table mapping each integer person_id back to its Wikidata id
+pq.write_table(
+    df_arrow.select(["person_id", "human"]), TRANSFORMED_MASTER_DATA_PERSON_IDS
+)
+
+log_peak_memory(con, "05_transform_raw_data")
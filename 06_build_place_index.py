@@ -0,0 +1,36 @@
+import logging
+from pathlib import Path
+
+from corrupt.place_index import PlaceIndex
+from duckdb_fns.connection import get_connection, log_peak_memory
+from path_fns.filepaths import (
+    PERSONS_PROCESSED_ONE_ROW_PER_PERSON,
+    TRANSFORMED_MASTER_DATA_PLACE_INDEX,
+)
+from transform_master_data.pipeline import SQLPipeline
+from transform_master_data.places import get_distinct_places
+
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("duckdb_fns").setLevel(logging.INFO)
+
+# Build a spatial index over all the places of birth and residence in the scraped
+# data, so that corruption functions can swap a location for a real nearby place
+
+Path(TRANSFORMED_MASTER_DATA_PLACE_INDEX).mkdir(parents=True, exist_ok=True)
+
+con = get_connection()
+pipeline = SQLPipeline(con)
+
+pipeline = get_distinct_places(
+    pipeline, input_table_name=f"'{PERSONS_PROCESSED_ONE_ROW_PER_PERSON}'"
+)
+places = pipeline.execute_pipeline().fetch_arrow_table()
+
+place_index = PlaceIndex.build(places)
+place_index.save(TRANSFORMED_MASTER_DATA_PLACE_INDEX)
+
+print(f"Indexed {places.num_rows:,.0f} places")
+
+log_peak_memory(con, "06_build_place_index")
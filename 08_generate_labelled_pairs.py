@@ -0,0 +1,42 @@
+import logging
+
+from linkage_benchmark.labelled_pairs import (
+    DEFAULT_BLOCKING_RULES,
+    generate_labelled_pairs,
+)
+from path_fns.filepaths import CORRUPTED_RECORDS, LABELLED_PAIRS
+from duckdb_fns.connection import get_connection, log_peak_memory
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("linkage_benchmark").setLevel(logging.INFO)
+logging.getLogger("duckdb_fns").setLevel(logging.INFO)
+logger.setLevel(logging.INFO)
+
+# Produces labelled pairwise comparisons from the corrupted records, using
+# blocking rules to avoid materialising the full Cartesian product.
+
+# The keys are the names of the partitions in the output, the values are SQL
+# expressions that produce the blocking key e.g. "substr(dob, 1, 4)"
+blocking_rules = DEFAULT_BLOCKING_RULES
+
+con = get_connection()
+
+summary = generate_labelled_pairs(
+    con,
+    f"'{CORRUPTED_RECORDS}'",
+    LABELLED_PAIRS,
+    blocking_rules=blocking_rules,
+    num_chunks=16,
+)
+
+for rule_name, counts in summary.items():
+    logger.info(
+        f"{rule_name}: {counts['pairs_written']:,.0f} pairs written "
+        f"({counts['expected_pairs']:,.0f} before removing pairs "
+        "generated by earlier rules)"
+    )
+
+log_peak_memory(con, "08_generate_labelled_pairs")
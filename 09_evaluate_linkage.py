@@ -0,0 +1,66 @@
+import logging
+import os
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from linkage_benchmark.evaluate import (
+    threshold_sweep,
+    cluster_predictions,
+    cluster_metrics,
+)
+from duckdb_fns.connection import get_connection, log_peak_memory
+from path_fns.filepaths import (
+    CORRUPTED_RECORDS,
+    LINKAGE_PREDICTIONS,
+    LINKAGE_EVALUATION,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(
+    format="%(message)s",
+)
+logging.getLogger("linkage_benchmark").setLevel(logging.INFO)
+logging.getLogger("duckdb_fns").setLevel(logging.INFO)
+logger.setLevel(logging.INFO)
+
+# Scores a linker's predictions against the cluster labels in the corrupted records.
+# The predictions parquet should have the columns id_l, id_r and score
+
+# Rounding scores limits the number of thresholds in the output.  Set to None
+# to output a row for every distinct score
+score_decimal_places = 3
+
+# Thresholds at which to cluster the predictions and compute cluster metrics
+cluster_thresholds = [0.5, 0.9, 0.99]
+
+Path(LINKAGE_EVALUATION).mkdir(parents=True, exist_ok=True)
+
+con = get_connection()
+
+records_table = f"'{CORRUPTED_RECORDS}'"
+predictions_table = f"'{LINKAGE_PREDICTIONS}'"
+
+sweep = threshold_sweep(
+    con,
+    predictions_table,
+    records_table,
+    score_decimal_places=score_decimal_places,
+).fetch_arrow_table()
+pq.write_table(sweep, os.path.join(LINKAGE_EVALUATION, "threshold_sweep.parquet"))
+
+best = sweep.to_pandas().sort_values("f1", ascending=False).head(1)
+logger.info(f"Best pairwise F1:\n{best.to_string(index=False)}")
+
+for threshold in cluster_thresholds:
+    cluster_predictions(con, predictions_table, records_table, threshold, "clusters")
+    metrics = cluster_metrics(con, "clusters").df()
+    metrics.insert(0, "threshold", threshold)
+    logger.info(f"Cluster metrics:\n{metrics.to_string(index=False)}")
+
+    out_path = os.path.join(
+        LINKAGE_EVALUATION, f"cluster_metrics_threshold_{threshold}.parquet"
+    )
+    metrics.to_parquet(out_path, index=False)
+
+log_peak_memory(con, "09_evaluate_linkage")
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import time
+
+import pyarrow.parquet as pq
+
+from duckdb_fns.connection import get_connection
+from path_fns.filepaths import PERSONS_BY_DOD_RAW_OUT_PATH
+from scrape_wikidata.compaction import compact_raw_persons, read_raw_persons
+
+# Compares the time taken to scan the raw scraped persons as they are written by
+# 01_scrape_persons.py, one small file per month, against the same data after
+# compaction.  The raw files are left in place, and the compacted files are
+# written to a temporary directory.
+#
+# python -m benchmarks.benchmark_compaction [raw persons directory] [repeats]
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(raw_dir=PERSONS_BY_DOD_RAW_OUT_PATH, repeats=3):
+    repeats = int(repeats)
+    con = get_connection()
+    num_raw_files = len([f for f in os.listdir(raw_dir) if f.endswith(".parquet")])
+
+    with tempfile.TemporaryDirectory() as compacted_dir:
+        manifest_path = os.path.join(compacted_dir, "manifest.json")
+        start = time.perf_counter()
+        manifest = compact_raw_persons(
+            raw_dir=raw_dir,
+            compacted_dir=compacted_dir,
+            manifest_path=manifest_path,
+            delete_sources=False,
+        )
+        compaction_time = time.perf_counter() - start
+        empty_dir = os.path.join(compacted_dir, "no_raw_files")
+        os.makedirs(empty_dir)
+
+        print(f"Compacted {num_raw_files:,.0f} raw files into {len(manifest):,.0f}")
+        print(f"{'compaction':40} {compaction_time:8.2f} s")
+
+        timings = {
+            # As 03_raw_persons_data_to_one_line_per_person.py read them before
+            "pq.read_table, raw files": lambda: pq.read_table(raw_dir).num_rows,
+            "read_raw_persons, raw files": lambda: read_raw_persons(
+                raw_dir=raw_dir, compacted_dir=empty_dir
+            ).num_rows,
+            "read_raw_persons, compacted files": lambda: read_raw_persons(
+                raw_dir=empty_dir, compacted_dir=compacted_dir
+            ).num_rows,
+            "duckdb count(*), raw files": lambda: con.execute(
+                f"select count(*) from '{raw_dir}/*.parquet'"
+            ).fetchone()[0],
+            "duckdb count(*), compacted files": lambda: con.execute(
+                f"select count(*) from '{compacted_dir}/*.parquet'"
+            ).fetchone()[0],
+        }
+
+        print(f"Best of {repeats} runs")
+        row_counts = set()
+        for name, fn in timings.items():
+            t, num_rows = best_of(fn, repeats)
+            row_counts.add(num_rows)
+            print(f"{name:40} {t:8.2f} s  {num_rows:,.0f} rows")
+
+    if len(row_counts) != 1:
+        raise ValueError(f"Row counts differ: {row_counts}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
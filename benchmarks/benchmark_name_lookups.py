@@ -0,0 +1,212 @@
+import sys
+import time
+
+import pyarrow.parquet as pq
+
+from duckdb_fns.connection import get_connection
+from path_fns.filepaths import (
+    NAMES_RAW_OUT_PATH_GIVEN_NAME,
+    NAMES_RAW_OUT_PATH_FAMILY_NAME,
+    PERSONS_PROCESSED_ONE_ROW_PER_PERSON,
+)
+from transform_master_data.alt_name_lookups import (
+    get_name_frequency_counts,
+    get_name_weighted_lookup,
+)
+from transform_master_data.pipeline import SQLPipeline
+
+# Compares the time taken to build the given and family name lookups in
+# 04_create_name_lookups.py against the previous implementation, and checks
+# that both produce the same lookups.
+#
+# Counting the names takes most of the time, and is the same work in both, so
+# the speed-up comes from reusing the cached name frequency counts.  Without the
+# cache the new path is slightly slower, since it also materialises the counts
+# so they can be written to the cache
+#
+# python -m benchmarks.benchmark_name_lookups [path to one row per person parquet] [repeats]
+
+
+def legacy_get_name_weighted_lookup(
+    con, raw_name_col, tablename_alt_names, tablename_scraped_one_row_per_person
+):
+    """The name lookup as built before name frequencies were shared between
+    name columns, kept for comparison"""
+
+    # The table 'name_frequency_counts' contains a count of
+    # name frequencies from the scraped data
+
+    pipeline = SQLPipeline(con)
+
+    sql = f"""
+    select unnest({raw_name_col}) as name
+    from {tablename_scraped_one_row_per_person}
+    """
+    pipeline.enqueue_sql(sql, "all_names")
+
+    # Grouped by the lower cased name, as the name frequency counts now are, so
+    # that the lookups can be compared.  Previously names differing only in case
+    # were counted separately
+    sql = """
+    select lower(name) as name, count(*) as count
+    from all_names
+    group by lower(all_names.name)
+    order by count desc
+    """
+
+    pipeline.enqueue_sql(sql, "name_frequency_counts")
+
+    # Concatenate all of our name variants of different types
+    sql = f"""
+    select
+        lower(original_name) as original_name, lower(alt_name) as alt_name, name_variant_type
+    from {tablename_alt_names}
+
+    union all
+
+    select
+        lower(alt_name) as original_name, lower(original_name) as alt_name, name_variant_type
+    from {tablename_alt_names}
+    """
+
+    pipeline.enqueue_sql(sql, "name_variants_concat")
+
+    sql = """
+    select distinct original_name, alt_name, name_variant_type
+        from name_variants_concat
+    """
+
+    pipeline.enqueue_sql(sql, "distinct_names_concat")
+
+    # Weight the name variants, using the frequency of the name variant as the weight
+    # but adding arbitrary greater emphasis
+    # to alt names that appear in nicknames, diminutive and hypocorism
+    sql = """
+      select n.*,
+
+        case
+            when name_variant_type = 'nickname' then count+5000
+            when name_variant_type = 'diminutive' then count+2000
+            when name_variant_type = 'hypocorism' then count+2000
+            else  count
+            end as weighted_count
+
+        from distinct_names_concat as n
+        inner join
+        name_frequency_counts as c
+        on n.alt_name = c.name
+        where
+        count >= 10
+        and original_name != alt_name
+    """
+
+    pipeline.enqueue_sql(sql, "names_with_weights_as_counts")
+
+    # Group by original_name and alt_name, summing the counts
+    sql = """
+    select
+        original_name,
+        alt_name,
+        sum(weighted_count) as weight
+    from names_with_weights_as_counts
+    group by original_name, alt_name
+    order by original_name, weight desc
+    """
+    pipeline.enqueue_sql(sql, "names_with_weights_as_floats")
+
+    # Get proportions within groups by counts
+    sql = """
+    select
+        original_name,
+        alt_name,
+        cast(weight as double)/(sum(weight) over (partition by original_name)) as weight
+    from names_with_weights_as_floats
+    """
+
+    pipeline.enqueue_sql(sql, "weighted_proportions")
+
+    # One row per original name, with alt names and weights as lists
+
+    sql = """
+    select
+        original_name,
+        list(alt_name) as alt_name_arr,
+        list(weight)  as alt_name_weight_arr
+    from weighted_proportions
+    group by original_name
+    """
+
+    pipeline.enqueue_sql(sql, "final")
+
+    # Run this to see intermediate outputs
+    # return pipeline.execute_pipeline_in_parts()
+    return pipeline.execute_pipeline()
+
+
+def _lookup_as_dict(arrow_table):
+    lookup = {}
+    for row in arrow_table.to_pylist():
+        weights = zip(row["alt_name_arr"], row["alt_name_weight_arr"])
+        lookup[row["original_name"]] = {k: round(v, 9) for k, v in weights}
+    return lookup
+
+
+def _best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main(persons_path=PERSONS_PROCESSED_ONE_ROW_PER_PERSON, repeats=3):
+    con = get_connection()
+    con.register("alt_names_given", pq.read_table(NAMES_RAW_OUT_PATH_GIVEN_NAME))
+    con.register("alt_names_family", pq.read_table(NAMES_RAW_OUT_PATH_FAMILY_NAME))
+    name_cols = {
+        "given_nameLabel": "alt_names_given",
+        "family_nameLabel": "alt_names_family",
+    }
+
+    def legacy():
+        return {
+            name_col: legacy_get_name_weighted_lookup(
+                con, name_col, alt_names, f"'{persons_path}'"
+            ).fetch_arrow_table()
+            for name_col, alt_names in name_cols.items()
+        }
+
+    def lookups_from_counts():
+        return {
+            name_col: get_name_weighted_lookup(
+                con, name_col, alt_names, "name_frequency_counts"
+            ).fetch_arrow_table()
+            for name_col, alt_names in name_cols.items()
+        }
+
+    def shared_counts():
+        counts = get_name_frequency_counts(con, f"'{persons_path}'")
+        con.register("name_frequency_counts", counts.fetch_arrow_table())
+        return lookups_from_counts()
+
+    legacy_time, legacy_lookups = _best_of(legacy, int(repeats))
+    new_time, lookups = _best_of(shared_counts, int(repeats))
+    cached_time, _ = _best_of(lookups_from_counts, int(repeats))
+
+    for name_col in name_cols:
+        if _lookup_as_dict(legacy_lookups[name_col]) != _lookup_as_dict(
+            lookups[name_col]
+        ):
+            raise ValueError(f"Lookups for {name_col} differ")
+
+    print(f"Best of {repeats} runs")
+    print(f"Previous implementation:      {legacy_time:,.2f}s")
+    print(f"Counting names for the cache: {new_time:,.2f}s")
+    print(f"Cached name frequency counts: {cached_time:,.2f}s")
+    print(f"Speed-up when not cached: {legacy_time / new_time:,.2f}x")
+    print(f"Speed-up when cached: {legacy_time / cached_time:,.2f}x")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
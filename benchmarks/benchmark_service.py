@@ -0,0 +1,64 @@
+import http.client
+import io
+import statistics
+import sys
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from corrupt.service import RecordService, make_server
+
+# Measures the latency of requests to the record service (corrupt/service.py)
+# for different numbers of records, on a kept-alive connection as a test
+# harness would make them.  The service is started in this process, on the
+# first LIMIT master records.
+#
+# python -m benchmarks.benchmark_service [limit] [requests]
+
+
+def read_response(response, output_format):
+    body = response.read()
+    if output_format == "parquet":
+        return pq.read_table(io.BytesIO(body))
+    return pa.ipc.open_stream(body).read_all()
+
+
+def main(limit=20_000, num_requests=20):
+    num_requests = int(num_requests)
+
+    start = time.perf_counter()
+    service = RecordService(limit=int(limit))
+    print(
+        f"Loaded {len(service.prepared):,.0f} master records in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+
+    for num_records in [100, 1000, 5000]:
+        for output_format in ["arrow", "parquet"]:
+            times = []
+            for seed in range(num_requests):
+                start = time.perf_counter()
+                connection.request(
+                    "GET",
+                    f"/records?n={num_records}&seed={seed}&format={output_format}",
+                )
+                table = read_response(connection.getresponse(), output_format)
+                times.append(time.perf_counter() - start)
+                assert table.num_rows == num_records
+            print(
+                f"n={num_records:<5} {output_format:8} "
+                f"median {statistics.median(times) * 1000:7.1f} ms"
+            )
+
+    connection.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
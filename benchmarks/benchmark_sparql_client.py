@@ -0,0 +1,139 @@
+import gzip
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
+
+from scrape_wikidata.query_wikidata import QUERY_HUMAN
+from scrape_wikidata.sparql_client import get_session, run_query
+
+# Measures the per-request latency of SPARQL queries against a local stub
+# server, comparing a new connection per request with no compression, as
+# SPARQLWrapper made them, against the pooled session in sparql_client.py.
+#
+# There is no TLS locally, so the cost of setting up a connection to the real
+# endpoint is simulated by delaying the first response on each new connection
+# by connect_ms milliseconds.  The response is around 300 result rows.
+#
+# python -m benchmarks.benchmark_sparql_client [requests] [connect_ms]
+
+
+def make_response_body(num_rows=300):
+    cols = ["human", "given_name", "family_name", "occupation", "place_birth"]
+    bindings = []
+    for i in range(num_rows):
+        row = {
+            col: {
+                "type": "uri",
+                "value": f"http://www.wikidata.org/entity/Q{i * 7919 + j}",
+            }
+            for j, col in enumerate(cols)
+        }
+        row["humanLabel"] = {
+            "xml:lang": "en",
+            "type": "literal",
+            "value": f"Person {i}",
+        }
+        row["dob"] = {"type": "literal", "value": f"19{i % 100:02}-03-11T00:00:00Z"}
+        bindings.append(row)
+    results = {"head": {"vars": list(bindings[0])}, "results": {"bindings": bindings}}
+    return json.dumps(results).encode()
+
+
+class StubSparqlHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which on a kept-alive
+    # connection would otherwise wait on the client's delayed ack
+    disable_nagle_algorithm = True
+    body = make_response_body()
+    gzipped_body = gzip.compress(body)
+    connect_seconds = 0
+
+    def setup(self):
+        super().setup()
+        self.first_request = True
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self):
+        if self.first_request:
+            time.sleep(self.connect_seconds)
+            self.first_request = False
+
+        body = self.body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = self.gzipped_body
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.respond()
+
+
+def query_new_connection(endpoint_url, query):
+    """A GET on a new connection with no compression, as SPARQLWrapper made it"""
+    url = endpoint_url + "?" + urlencode({"query": query, "format": "json"})
+    request = urllib.request.Request(
+        url, headers={"Accept": "application/sparql-results+json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def median_latency(fn, num_requests):
+    times = []
+    for _ in range(num_requests):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), sum(times)
+
+
+def main(num_requests=200, connect_ms=50):
+    num_requests = int(num_requests)
+    StubSparqlHandler.connect_seconds = float(connect_ms) / 1000
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSparqlHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint_url = f"http://127.0.0.1:{server.server_address[1]}/sparql"
+
+    short_query = "SELECT ?human WHERE { ?human wdt:P31 wd:Q5 } LIMIT 300"
+
+    timings = {
+        "new connection, GET, uncompressed": lambda: query_new_connection(
+            endpoint_url, short_query
+        ),
+        "pooled session, GET, gzip": lambda: run_query(short_query, endpoint_url),
+        "pooled session, POST (QUERY_HUMAN), gzip": lambda: run_query(
+            QUERY_HUMAN, endpoint_url
+        ),
+    }
+
+    print(
+        f"{num_requests} requests, {connect_ms}ms simulated connection setup, "
+        f"{len(StubSparqlHandler.body):,.0f} byte response "
+        f"({len(StubSparqlHandler.gzipped_body):,.0f} gzipped)"
+    )
+    for name, fn in timings.items():
+        median, total = median_latency(fn, num_requests)
+        print(f"{name:45} median {median * 1000:7.2f} ms  total {total:6.2f} s")
+
+    get_session().close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,41 @@
+import statistics
+import subprocess
+import sys
+import time
+
+# Measures how long it takes to start the corruption entry point, and to import
+# the corruption functions in a fresh process, as a worker process would.
+#
+# python -m benchmarks.benchmark_startup [repeats]
+
+COMMANDS = {
+    "python interpreter": ["-c", "pass"],
+    "import corrupt.config": ["-c", "import corrupt.config"],
+    "import corrupt.run": ["-c", "import corrupt.run"],
+    "python -m corrupt --help": ["-m", "corrupt", "--help"],
+    # Everything that 07_corrupt_records.py imported before doing any work
+    "import pandas, numpy, duckdb, pyarrow": [
+        "-c",
+        "import pandas, numpy, duckdb, pyarrow.parquet",
+    ],
+}
+
+
+def time_command(args, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(repeats=10):
+    print(f"Median wall time of {repeats} runs")
+    for name, args in COMMANDS.items():
+        t = time_command(args, int(repeats))
+        print(f"{name:40} {t * 1000:8,.0f} ms")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,12 @@
+"""
+Corrupt the master data, see corrupt/run.py:
+
+python -m corrupt --limit 1000
+
+Modules in this package import heavy dependencies (pandas, duckdb, pyarrow)
+inside the functions that use them, and read nothing at import time, so that
+importing them is fast, e.g. in worker processes
+"""
+from corrupt.run import main
+
+main()
@@ -0,0 +1,73 @@
+from functools import partial
+
+from corrupt.corrupt_date import (
+    date_corrupt_timedelta,
+    date_corrupt_timedelta_batch,
+    date_corrupt_typo,
+    date_corrupt_typo_batch,
+    date_gen_uncorrupted_record,
+    date_gen_uncorrupted_record_batch,
+)
+from corrupt.corrupt_lat_lng import (
+    lat_lng_corrupt_distance,
+    lat_lng_corrupt_distance_batch,
+    lat_lng_corrupt_nearby_place,
+    lat_lng_corrupt_nearby_place_batch,
+)
+from corrupt.corrupt_name import full_name_sound_alike, full_name_sound_alike_batch
+from corrupt.corrupt_string import (
+    string_corrupt_numpad,
+    string_corrupt_numpad_records_batch,
+)
+
+# Batch versions of the corruption functions, which take a list of formatted
+# master records and a list of the output records to modify, and draw their
+# random numbers for every record at once.  Keyed by the function used in the
+# config, in the same way as SQL_EXPRESSIONS in corrupt/sql_pushdown.py, so the
+# config does not change.  Functions with no batch version are applied record by
+# record
+
+BATCH_FUNCTIONS = {
+    date_gen_uncorrupted_record: date_gen_uncorrupted_record_batch,
+    date_corrupt_timedelta: date_corrupt_timedelta_batch,
+    date_corrupt_typo: date_corrupt_typo_batch,
+    string_corrupt_numpad: string_corrupt_numpad_records_batch,
+    lat_lng_corrupt_distance: lat_lng_corrupt_distance_batch,
+    lat_lng_corrupt_nearby_place: lat_lng_corrupt_nearby_place_batch,
+    full_name_sound_alike: full_name_sound_alike_batch,
+}
+
+
+def compile_fn_to_batch(fn):
+    """
+    Look up the batch version of a corruption function, including functions
+    wrapped in functools.partial, with the same keyword arguments.
+
+    Returns None if the function has no batch version
+    """
+    kwargs = {}
+    if isinstance(fn, partial):
+        kwargs = fn.keywords
+        fn = fn.func
+
+    if fn not in BATCH_FUNCTIONS:
+        return None
+    return partial(BATCH_FUNCTIONS[fn], **kwargs)
+
+
+def apply_fn_to_records(fn, formatted_master_records, records_to_modify):
+    """
+    Apply a corruption function to each of formatted_master_records, modifying
+    the output record at the same position in records_to_modify, with a single
+    call of its batch version if it has one
+    """
+    batch_fn = compile_fn_to_batch(fn)
+    if batch_fn is not None:
+        batch_fn(formatted_master_records, records_to_modify=records_to_modify)
+        return records_to_modify
+
+    for formatted_master_record, record_to_modify in zip(
+        formatted_master_records, records_to_modify
+    ):
+        fn(formatted_master_record, record_to_modify=record_to_modify)
+    return records_to_modify
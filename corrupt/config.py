@@ -0,0 +1,283 @@
+from functools import partial
+
+from corrupt.corrupt_string import string_corrupt_numpad
+from corrupt.corruption_functions import (
+    master_record_no_op,
+    basic_null_fn,
+    format_master_record_first_array_item,
+)
+from corrupt.corrupt_occupation import (
+    occupation_format_master_record,
+    occupation_gen_uncorrupted_record,
+    occupation_corrupt,
+)
+from corrupt.corrupt_name import (
+    full_name_gen_uncorrupted_record,
+    full_name_alternative,
+    each_name_alternatives,
+    full_name_typo,
+    full_name_sound_alike,
+    full_name_null,
+)
+from corrupt.corrupt_date import (
+    date_corrupt_timedelta,
+    date_gen_uncorrupted_record,
+)
+from corrupt.corrupt_country_citizenship import (
+    country_citizenship_format_master_record,
+    country_citizenship_corrupt,
+    country_citizenship_gen_uncorrupted_record,
+)
+from corrupt.corrupt_lat_lng import (
+    lat_lng_uncorrupted_record,
+    lat_lng_corrupt_distance,
+    lat_lng_corrupt_nearby_place,
+)
+from corrupt.duplicate_counts import zipf_duplicate_count_dist
+from corrupt.error_model import GaussianCopulaErrorModel
+
+# The default corruption settings used by python -m corrupt and 07_corrupt_records.py
+# Importing this module does no I/O, so it is safe to import in worker processes
+
+# Configure how corruptions will be made for each field
+
+# Col name is the OUTPUT column name.  For instance, we may input given name,
+# family name etc to output full_name
+
+# Guide to keys:
+# format_master_data.  This functino may apply additional cleaning to the master
+# record.  The same formatted master ata is then available to the
+# 'gen_uncorrupted_record' and 'corruption_functions'
+
+
+# Finally, as we generate more duplicate records, we introduce more and more errors.
+# The keys start_prob_corrupt, end_prob_corrupt, start_prob_null, end_prob_null control
+# the probability of corruption
+
+CONFIG = [
+    {
+        "col_name": "full_name",
+        "format_master_data": master_record_no_op,
+        "gen_uncorrupted_record": full_name_gen_uncorrupted_record,
+        "corruption_functions": [
+            {"fn": full_name_alternative, "p": 0.45},
+            {"fn": each_name_alternatives, "p": 0.35},
+            {"fn": full_name_typo, "p": 0.1},
+            {"fn": full_name_sound_alike, "p": 0.1},
+        ],
+        "null_function": full_name_null,
+        "start_prob_null": 0.05,
+        "end_prob_null": 0.1,
+        "start_prob_corrupt": 0.3,
+        "end_prob_corrupt": 0.6,
+    },
+    {
+        "col_name": "occupation",
+        "format_master_data": occupation_format_master_record,
+        "gen_uncorrupted_record": occupation_gen_uncorrupted_record,
+        "corruption_functions": [{"fn": occupation_corrupt, "p": 1.0}],
+        "null_function": basic_null_fn("occupation"),
+    },
+    {
+        "col_name": "dob",
+        "format_master_data": partial(
+            format_master_record_first_array_item, colname="dob"
+        ),
+        "gen_uncorrupted_record": partial(
+            date_gen_uncorrupted_record, input_colname="dob", output_colname="dob"
+        ),
+        "corruption_functions": [
+            {
+                "fn": partial(
+                    date_corrupt_timedelta, input_colname="dob", output_colname="dob"
+                ),
+                "p": 0.7,
+            },
+            {
+                "fn": partial(
+                    string_corrupt_numpad, input_colname="dob", output_colname="dob"
+                ),
+                "p": 0.3,
+            },
+        ],
+        "null_function": basic_null_fn("dob"),
+        "start_prob_null": 0.05,
+        "end_prob_null": 0.2,
+        "start_prob_corrupt": 0.2,
+        "end_prob_corrupt": 0.4,
+    },
+    {
+        "col_name": "birth_coordinates",
+        "format_master_data": master_record_no_op,
+        "gen_uncorrupted_record": partial(
+            lat_lng_uncorrupted_record,
+            input_colname="birth_coordinates",
+            output_colname="birth_coordinates",
+        ),
+        "corruption_functions": [
+            {
+                "fn": partial(
+                    lat_lng_corrupt_distance,
+                    input_colname="birth_coordinates",
+                    output_colname="birth_coordinates",
+                    distance_min=0.1,
+                    distance_max=10,
+                ),
+                "p": 1.0,
+            },
+        ],
+        "null_function": basic_null_fn("birth_coordinates"),
+    },
+    {
+        "col_name": "residence_coordinates",
+        "format_master_data": master_record_no_op,
+        "gen_uncorrupted_record": partial(
+            lat_lng_uncorrupted_record,
+            input_colname="residence_coordinates",
+            output_colname="residence_coordinates",
+        ),
+        "corruption_functions": [
+            {
+                "fn": partial(
+                    lat_lng_corrupt_distance,
+                    input_colname="residence_coordinates",
+                    output_colname="residence_coordinates",
+                    distance_min=0.1,
+                    distance_max=10,
+                ),
+                "p": 0.5,
+            },
+            {
+                "fn": partial(
+                    lat_lng_corrupt_nearby_place,
+                    input_colname="residence_coordinates",
+                    output_colname="residence_coordinates",
+                ),
+                "p": 0.5,
+            },
+        ],
+        "null_function": basic_null_fn("residence_coordinates"),
+    },
+    {
+        "col_name": "country_citizenLabel",
+        "format_master_data": country_citizenship_format_master_record,
+        "gen_uncorrupted_record": country_citizenship_gen_uncorrupted_record,
+        "corruption_functions": [{"fn": country_citizenship_corrupt, "p": 1.0}],
+        "null_function": basic_null_fn("country_citizenship"),
+    },
+]
+
+
+# How many corrupted records to generate per person
+MAX_CORRUPTED_RECORDS = 3
+
+# Errors in some columns tend to occur together, e.g. a person who moves house
+# is likely to have both a different residence and a different citizenship
+ERROR_CORRELATIONS = {
+    ("residence_coordinates", "country_citizenLabel"): 0.5,
+    ("full_name", "dob"): 0.2,
+}
+
+
+def get_duplicate_count_dist(max_corrupted_records=MAX_CORRUPTED_RECORDS):
+    """
+    The distribution of the number of corrupted records per person.  Any of the
+    distributions in corrupt.duplicate_counts can be used here e.g.
+    poisson_duplicate_count_dist
+    """
+    return zipf_duplicate_count_dist(max_corrupted_records)
+
+
+def get_error_model(
+    config=CONFIG,
+    max_corrupted_records=MAX_CORRUPTED_RECORDS,
+    correlations=ERROR_CORRELATIONS,
+):
+    return GaussianCopulaErrorModel(
+        config,
+        max_duplicate_index=max_corrupted_records,
+        correlations=correlations,
+    )
+
+
+def config_with_overrides(config, overrides):
+    """
+    A copy of config with settings changed for some columns, leaving config
+    itself unchanged.  overrides is of the form {col_name: {key: value}} e.g.
+
+    {"dob": {"start_prob_null": 0.2, "end_prob_null": 0.4}}
+
+    The key "p" sets the weights of the column's corruption functions, in order
+    e.g. {"full_name": {"p": [0.2, 0.2, 0.3, 0.3]}}
+    """
+    col_names = {entry["col_name"] for entry in config}
+    unknown = set(overrides) - col_names
+    if unknown:
+        raise ValueError(f"Overrides for columns not in the config: {unknown}")
+
+    new_config = []
+    for entry in config:
+        entry = dict(entry)
+        entry_overrides = dict(overrides.get(entry["col_name"], {}))
+        weights = entry_overrides.pop("p", None)
+        if weights is not None:
+            if len(weights) != len(entry["corruption_functions"]):
+                raise ValueError(
+                    f"{entry['col_name']} has {len(entry['corruption_functions'])} "
+                    f"corruption functions, but {len(weights)} weights were given"
+                )
+            entry["corruption_functions"] = [
+                {**f, "p": p} for f, p in zip(entry["corruption_functions"], weights)
+            ]
+        entry.update(entry_overrides)
+        new_config.append(entry)
+    return new_config
+
+
+# Source systems for multi-source (link-only) generation, see corrupt/multi_source.py.
+# Every source is corrupted from the same formatted master records, so all
+# sources' configs must share the format_master_data and gen_uncorrupted_record
+# functions, and only differ in their corruption settings.  Optional keys:
+#
+# coverage: the probability that a person appears in the source (default 1.0)
+# max_corrupted_records: default MAX_CORRUPTED_RECORDS
+# include_uncorrupted_record: whether the source also contains each person's
+#   uncorrupted record (default False)
+# duplicate_count_dist, error_correlations: defaults from get_duplicate_count_dist
+#   and ERROR_CORRELATIONS
+SOURCES = [
+    {
+        "source_dataset": "register",
+        "config": config_with_overrides(
+            CONFIG,
+            {
+                "full_name": {"start_prob_corrupt": 0.1, "end_prob_corrupt": 0.1},
+                "dob": {"start_prob_null": 0.01, "end_prob_null": 0.01},
+            },
+        ),
+        "coverage": 0.9,
+        "max_corrupted_records": 1,
+    },
+    {
+        "source_dataset": "survey",
+        "config": config_with_overrides(
+            CONFIG,
+            {
+                "full_name": {"p": [0.2, 0.25, 0.3, 0.25]},
+                "dob": {"start_prob_null": 0.2, "end_prob_null": 0.3},
+                "occupation": {"start_prob_null": 0.4},
+            },
+        ),
+        "coverage": 0.6,
+        "max_corrupted_records": 2,
+    },
+]
+
+
+# Default grid for a parameter sweep (see corrupt/sweep.py), with a dataset for
+# every combination of values
+SWEEP_GRID = {
+    "*.start_prob_corrupt": [0.2, 0.4],
+    "*.end_prob_corrupt": [0.4, 0.6],
+    "max_corrupted_records": [1, 3],
+}
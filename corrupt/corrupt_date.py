@@ -6,18 +6,24 @@ from corrupt.geco_corrupt import (
     CorruptValueNumpad,
     position_mod_uniform,
 )
+from corrupt.corrupt_string import string_corrupt_numpad_batch
 
 
 def date_gen_uncorrupted_record(
-    formatted_master_record, input_colname, output_colname, record_to_modify={}
+    formatted_master_record, input_colname, output_colname, record_to_modify=None
 ):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     record_to_modify[output_colname] = str(formatted_master_record[input_colname])
     return record_to_modify
 
 
 def date_corrupt_typo(
-    formatted_master_record, input_colname, output_colname, record_to_modify={}
+    formatted_master_record, input_colname, output_colname, record_to_modify=None
 ):
+    if record_to_modify is None:
+        record_to_modify = {}
 
     if not formatted_master_record[input_colname]:
         record_to_modify[output_colname] = None
@@ -36,10 +42,12 @@ def date_corrupt_typo(
 
 
 def date_corrupt_timedelta(
-    formatted_master_record, input_colname, output_colname, record_to_modify={}
+    formatted_master_record, input_colname, output_colname, record_to_modify=None
 ):
+    if record_to_modify is None:
+        record_to_modify = {}
 
-    if formatted_master_record[input_colname]:
+    if not formatted_master_record[input_colname]:
         record_to_modify[output_colname] = None
         return record_to_modify
 
@@ -57,3 +65,90 @@ def date_corrupt_timedelta(
     input_value = input_value + delta
     record_to_modify[output_colname] = str(input_value)
     return record_to_modify
+
+
+def dates_as_datetime64(formatted_master_records, input_colname):
+    """Collect a date column from a list of formatted master records into a
+    datetime64[D] array, with NaT where the date is missing
+    """
+    values = [r[input_colname] for r in formatted_master_records]
+    values = [v if v else None for v in values]
+    return np.array(values, dtype="datetime64[D]")
+
+
+def datetime64_to_iso_strings(dates):
+    """Format a datetime64[D] array as ISO date strings in bulk.  NaT becomes None"""
+    strings = np.datetime_as_string(dates, unit="D").astype(object)
+    strings[np.isnat(dates)] = None
+    return strings
+
+
+def timedelta_corrupt_datetime64(dates):
+    """Vectorised version of the small/medium/large timedelta corruption in
+    date_corrupt_timedelta.  Takes and returns a datetime64[D] array
+    """
+    n = len(dates)
+    choice = np.random.choice([0, 1, 2], size=n, p=[0.7, 0.2, 0.1])
+
+    # randint's upper bound is exclusive, unlike random.randint
+    small = np.random.randint(-5, 6, size=n)
+    medium = np.random.randint(-61, 62, size=n)
+    large = np.full(n, 1000)
+
+    delta_days = np.choose(choice, [small, medium, large])
+    return dates + delta_days.astype("timedelta64[D]")
+
+
+def date_gen_uncorrupted_record_batch(
+    formatted_master_records, input_colname, output_colname, records_to_modify=None
+):
+    if records_to_modify is None:
+        records_to_modify = [{} for _ in formatted_master_records]
+
+    dates = dates_as_datetime64(formatted_master_records, input_colname)
+    strings = datetime64_to_iso_strings(dates)
+
+    for record_to_modify, s in zip(records_to_modify, strings):
+        record_to_modify[output_colname] = s
+    return records_to_modify
+
+
+def date_corrupt_timedelta_batch(
+    formatted_master_records, input_colname, output_colname, records_to_modify=None
+):
+    """Batch version of date_corrupt_timedelta"""
+    if records_to_modify is None:
+        records_to_modify = [{} for _ in formatted_master_records]
+
+    dates = dates_as_datetime64(formatted_master_records, input_colname)
+    strings = datetime64_to_iso_strings(timedelta_corrupt_datetime64(dates))
+
+    for record_to_modify, s in zip(records_to_modify, strings):
+        record_to_modify[output_colname] = s
+    return records_to_modify
+
+
+def date_corrupt_typo_batch(
+    formatted_master_records,
+    input_colname,
+    output_colname,
+    records_to_modify=None,
+    start_pos=2,
+):
+    """Batch version of date_corrupt_typo.
+
+    By default the first two characters (the century) are left alone, as in
+    date_corrupt_typo.  Use start_pos=0 to match string_corrupt_numpad
+    """
+    if records_to_modify is None:
+        records_to_modify = [{} for _ in formatted_master_records]
+
+    dates = dates_as_datetime64(formatted_master_records, input_colname)
+    strings = datetime64_to_iso_strings(dates)
+    strings = string_corrupt_numpad_batch(
+        strings, row_prob=0.5, col_prob=0.5, start_pos=start_pos
+    )
+
+    for record_to_modify, s in zip(records_to_modify, strings):
+        record_to_modify[output_colname] = s
+    return records_to_modify
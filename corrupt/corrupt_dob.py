@@ -6,6 +6,9 @@ def dob_format_master_record(master_input_record):
     return master_input_record
 
 
-def dob_gen_uncorrupted_record(formatted_master_record, record_to_modify={}):
+def dob_gen_uncorrupted_record(formatted_master_record, record_to_modify=None):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     record_to_modify["dob"] = formatted_master_record["dob"]
     return record_to_modify
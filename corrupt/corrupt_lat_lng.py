@@ -1,7 +1,12 @@
+import functools
 import math
 import random
+import numpy as np
 from numpy.random import chisquare
 
+from corrupt.place_index import PlaceIndex
+from path_fns.filepaths import TRANSFORMED_MASTER_DATA_PLACE_INDEX
+
 
 def offset_by_distance_in_random_direction(geo_struct, distance_km):
 
@@ -27,8 +32,10 @@ def lat_lng_corrupt_distance(
     output_colname,
     distance_min=10,
     distance_max=10,
-    record_to_modify={},
+    record_to_modify=None,
 ):
+    if record_to_modify is None:
+        record_to_modify = {}
 
     if not formatted_master_record[input_colname]:
         record_to_modify[output_colname] = None
@@ -36,7 +43,7 @@ def lat_lng_corrupt_distance(
     else:
         geostruct = formatted_master_record[input_colname][0]
         # Chisquare 3 runs between 0 and about 10
-        chi = chisquare(3, 1)
+        chi = chisquare(3)
         multiplier = (distance_max - distance_min) / 10
         distance = (chi * multiplier) + distance_min
         new_geostruct = offset_by_distance_in_random_direction(geostruct, distance)
@@ -45,10 +52,172 @@ def lat_lng_corrupt_distance(
 
 
 def lat_lng_uncorrupted_record(
-    formatted_master_record, input_colname, output_colname, record_to_modify={}
+    formatted_master_record, input_colname, output_colname, record_to_modify=None
 ):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     if not formatted_master_record[input_colname]:
         record_to_modify[output_colname] = None
     else:
         record_to_modify[output_colname] = formatted_master_record[input_colname][0]
     return record_to_modify
+
+
+R_EARTH_KM = 6371
+
+
+def lat_lng_first_point_as_arrays(formatted_master_records, input_colname):
+    """Take the first point of each record's coordinate list as lat and lng arrays.
+
+    Records with no coordinates are NaN in both arrays
+    """
+    n = len(formatted_master_records)
+    lat = np.full(n, np.nan)
+    lng = np.full(n, np.nan)
+    for i, r in enumerate(formatted_master_records):
+        points = r[input_colname]
+        if points is not None and len(points) > 0:
+            lat[i] = points[0]["lat"]
+            lng[i] = points[0]["lng"]
+    return lat, lng
+
+
+def offset_by_distance_in_random_direction_batch(
+    lat, lng, distance_km, great_circle=False
+):
+    """Vectorised version of offset_by_distance_in_random_direction
+
+    lat, lng and distance_km are arrays of the same length.  Null (NaN) inputs
+    produce NaN outputs.
+
+    If great_circle is True, the destination point is found using the
+    great circle formula rather than the flat earth approximation, which
+    behaves correctly near the poles and for large distances
+    """
+
+    bearing = np.random.uniform(0, 2 * np.pi, size=len(lat))
+
+    if not great_circle:
+        dx = np.sin(bearing) * distance_km
+        dy = np.cos(bearing) * distance_km
+        new_lat = lat + np.degrees(dy / R_EARTH_KM)
+        new_lng = lng + np.degrees(dx / R_EARTH_KM) / np.cos(np.radians(lat))
+        return new_lat, new_lng
+
+    lat_rad = np.radians(lat)
+    lng_rad = np.radians(lng)
+    angular_distance = distance_km / R_EARTH_KM
+
+    new_lat_rad = np.arcsin(
+        np.sin(lat_rad) * np.cos(angular_distance)
+        + np.cos(lat_rad) * np.sin(angular_distance) * np.cos(bearing)
+    )
+    new_lng_rad = lng_rad + np.arctan2(
+        np.sin(bearing) * np.sin(angular_distance) * np.cos(lat_rad),
+        np.cos(angular_distance) - np.sin(lat_rad) * np.sin(new_lat_rad),
+    )
+
+    new_lat = np.degrees(new_lat_rad)
+    # Normalise longitude to [-180, 180)
+    new_lng = (np.degrees(new_lng_rad) + 540) % 360 - 180
+    return new_lat, new_lng
+
+
+def lat_lng_corrupt_distance_batch(
+    formatted_master_records,
+    input_colname,
+    output_colname,
+    distance_min=10,
+    distance_max=10,
+    great_circle=False,
+    records_to_modify=None,
+):
+    """Batch version of lat_lng_corrupt_distance
+
+    Takes the same keyword arguments as lat_lng_corrupt_distance, so the
+    same config entry can be used for birth_coordinates and residence_coordinates.
+
+    formatted_master_records is a list of formatted master records, and
+    records_to_modify (if provided) is a list of output records of the same length.
+    """
+    if records_to_modify is None:
+        records_to_modify = [{} for _ in formatted_master_records]
+
+    lat, lng = lat_lng_first_point_as_arrays(formatted_master_records, input_colname)
+
+    # Chisquare 3 runs between 0 and about 10
+    chi = chisquare(3, len(lat))
+    multiplier = (distance_max - distance_min) / 10
+    distance = (chi * multiplier) + distance_min
+
+    new_lat, new_lng = offset_by_distance_in_random_direction_batch(
+        lat, lng, distance, great_circle=great_circle
+    )
+
+    is_null = np.isnan(lat)
+    for i, record_to_modify in enumerate(records_to_modify):
+        if is_null[i]:
+            record_to_modify[output_colname] = None
+        else:
+            record_to_modify[output_colname] = {
+                "lat": float(new_lat[i]),
+                "lng": float(new_lng[i]),
+            }
+    return records_to_modify
+
+
+@functools.lru_cache(maxsize=None)
+def get_place_index():
+    return PlaceIndex.load(TRANSFORMED_MASTER_DATA_PLACE_INDEX)
+
+
+def lat_lng_corrupt_nearby_place_batch(
+    formatted_master_records,
+    input_colname,
+    output_colname,
+    records_to_modify=None,
+):
+    """Replace each location with the location of a real nearby place, using
+    the place index built by 06_build_place_index.py.
+
+    Where no other place is nearby, the original location is kept
+    """
+    if records_to_modify is None:
+        records_to_modify = [{} for _ in formatted_master_records]
+
+    place_index = get_place_index()
+
+    lat, lng = lat_lng_first_point_as_arrays(formatted_master_records, input_colname)
+    position = place_index.nearby_place_positions(lat, lng)
+
+    is_null = np.isnan(lat)
+    for i, record_to_modify in enumerate(records_to_modify):
+        if is_null[i]:
+            record_to_modify[output_colname] = None
+        elif position[i] == -1:
+            record_to_modify[output_colname] = {
+                "lat": float(lat[i]),
+                "lng": float(lng[i]),
+            }
+        else:
+            record_to_modify[output_colname] = {
+                "lat": float(place_index.lat[position[i]]),
+                "lng": float(place_index.lng[position[i]]),
+            }
+    return records_to_modify
+
+
+def lat_lng_corrupt_nearby_place(
+    formatted_master_record, input_colname, output_colname, record_to_modify=None
+):
+    if record_to_modify is None:
+        record_to_modify = {}
+
+    lat_lng_corrupt_nearby_place_batch(
+        [formatted_master_record],
+        input_colname,
+        output_colname,
+        records_to_modify=[record_to_modify],
+    )
+    return record_to_modify
@@ -1,13 +1,15 @@
 import numpy as np
 import functools
 import random
-import pandas as pd
 
 from corrupt.geco_corrupt import CorruptValueQuerty, position_mod_uniform
+from path_fns.filepaths import phonetic_name_index_filename
 
 
 @functools.lru_cache(maxsize=None)
 def get_given_name_alternatives_lookup():
+    import pandas as pd
+
     in_path = "out_data/wikidata/processed/alt_name_lookups/given_name_lookup.parquet"
     df = pd.read_parquet(in_path).set_index("original_name")
     return df.to_dict(orient="index")
@@ -15,18 +17,25 @@ def get_given_name_alternatives_lookup():
 
 @functools.lru_cache(maxsize=None)
 def get_family_name_alternatives_lookup():
+    import pandas as pd
+
     in_path = "out_data/wikidata/processed/alt_name_lookups/family_name_lookup.parquet"
     df = pd.read_parquet(in_path).set_index("original_name")
     return df.to_dict(orient="index")
 
 
-def full_name_gen_uncorrupted_record(master_record, record_to_modify={}):
+def full_name_gen_uncorrupted_record(master_record, record_to_modify=None):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     record_to_modify["full_name"] = master_record["humanLabel"][0]
     return record_to_modify
 
 
-def full_name_alternative(formatted_master_record, record_to_modify={}):
+def full_name_alternative(formatted_master_record, record_to_modify=None):
     """Choose an alternative full name if one exists"""
+    if record_to_modify is None:
+        record_to_modify = {}
 
     options = formatted_master_record["full_name_arr"]
     if options is None:
@@ -38,46 +47,69 @@ def full_name_alternative(formatted_master_record, record_to_modify={}):
     return record_to_modify
 
 
-def each_name_alternatives(formatted_master_record, record_to_modify={}):
-    """Choose a full name if one exists"""
-
-    options = formatted_master_record["full_name_arr"]
-
-    if options is None:
-        record_to_modify["full_name"] = None
-        return record_to_modify
-
-    full_name = options[0]
-
-    names = full_name.split(" ")
+def _full_name_token_alternatives(formatted_master_record):
+    """
+    The (alt_names, weights) for each token of the full name, or None where the
+    token has no alternatives.  Cached on the formatted master record, so the
+    lookups are only done once per person rather than once per duplicate
+    """
+    token_alternatives = formatted_master_record.get("_full_name_token_alternatives")
+    if token_alternatives is not None:
+        return token_alternatives
 
     given_name_alt_lookup = get_given_name_alternatives_lookup()
     family_name_alt_lookup = get_family_name_alternatives_lookup()
 
-    output_names = []
-    for n in names:
-        n = n.lower()
+    token_alternatives = []
+    tokens = formatted_master_record["full_name_tokens"]
+    has_alt = formatted_master_record["full_name_token_has_alt"]
+    for n, n_has_alt in zip(tokens, has_alt):
+        # Tokens without alternatives were identified in 05_transform_raw_data.py
+        if not n_has_alt:
+            token_alternatives.append(None)
+            continue
+
         if n in given_name_alt_lookup:
             name_dict = given_name_alt_lookup[n]
-            alt_names = name_dict["alt_name_arr"]
-            weights = name_dict["alt_name_weight_arr"]
-            output_names.append(np.random.choice(alt_names, p=weights))
-
-        elif n in family_name_alt_lookup:
+        else:
             name_dict = family_name_alt_lookup[n]
-            alt_names = name_dict["alt_name_arr"]
-            weights = name_dict["alt_name_weight_arr"]
-            output_names.append(np.random.choice(alt_names, p=weights))
+        token_alternatives.append(
+            (name_dict["alt_name_arr"], name_dict["alt_name_weight_arr"])
+        )
 
-        else:
+    formatted_master_record["_full_name_token_alternatives"] = token_alternatives
+    return token_alternatives
+
+
+def each_name_alternatives(formatted_master_record, record_to_modify=None):
+    """Choose an alternative for each token in the full name, where one exists"""
+    if record_to_modify is None:
+        record_to_modify = {}
+
+    tokens = formatted_master_record["full_name_tokens"]
+
+    if tokens is None:
+        record_to_modify["full_name"] = None
+        return record_to_modify
+
+    token_alternatives = _full_name_token_alternatives(formatted_master_record)
+
+    output_names = []
+    for n, alternatives in zip(tokens, token_alternatives):
+        if alternatives is None:
             output_names.append(n)
+        else:
+            alt_names, weights = alternatives
+            output_names.append(np.random.choice(alt_names, p=weights))
 
     record_to_modify["full_name"] = " ".join(output_names).lower()
 
     return record_to_modify
 
 
-def full_name_typo(formatted_master_record, record_to_modify={}):
+def full_name_typo(formatted_master_record, record_to_modify=None):
+    if record_to_modify is None:
+        record_to_modify = {}
 
     options = formatted_master_record["full_name_arr"]
 
@@ -96,32 +128,103 @@ def full_name_typo(formatted_master_record, record_to_modify={}):
     return record_to_modify
 
 
-def full_name_null(formatted_master_record, record_to_modify={}):
+# Phonetic encoding of the index used by full_name_sound_alike, one of
+# transform_master_data.phonetic.PHONETIC_ENCODINGS
+SOUND_ALIKE_ENCODING = "nysiis"
 
-    new_name = formatted_master_record["full_name_arr"][0].split(" ")
+# The index, given or family names, used for tokens of each role
+SOUND_ALIKE_NAME_TYPES = {"first": "given", "middle": "given", "last": "family"}
 
-    try:
-        first = new_name.pop(0)
-    except IndexError:
-        first = None
-    try:
-        last = new_name.pop()
-    except IndexError:
-        last = None
 
-    # Erase middle names with probability 0.5
-    new_name = [n for n in new_name if random.uniform(0, 1) > 0.5]
+@functools.lru_cache(maxsize=None)
+def get_phonetic_name_index(name_type, encoding=SOUND_ALIKE_ENCODING):
+    """The index built by 04_02_build_phonetic_name_index.py"""
+    from corrupt.phonetic_index import PhoneticNameIndex
+
+    return PhoneticNameIndex.load(phonetic_name_index_filename(name_type, encoding))
+
+
+def full_name_sound_alike_batch(
+    formatted_master_records, records_to_modify=None, encoding=SOUND_ALIKE_ENCODING
+):
+    """
+    Swap one token of each full name for a name that sounds alike, e.g. jon for
+    john, drawn in proportion to how common each name is.  The token is chosen
+    at random from the tokens that have a sound-alike.
+
+    A sound-alike is drawn for every token, for all records at once, from the
+    index built by 04_02_build_phonetic_name_index.py
+    """
+    if records_to_modify is None:
+        records_to_modify = [{} for _ in formatted_master_records]
+
+    tokens_by_name_type = {
+        name_type: [] for name_type in SOUND_ALIKE_NAME_TYPES.values()
+    }
+    for i, formatted_master_record in enumerate(formatted_master_records):
+        tokens = formatted_master_record["full_name_tokens"]
+        if tokens is None:
+            continue
+        roles = formatted_master_record["full_name_token_roles"]
+        for j, (token, role) in enumerate(zip(tokens, roles)):
+            tokens_by_name_type[SOUND_ALIKE_NAME_TYPES[role]].append((i, j, token))
+
+    # The (token position, sound-alike) options for each record
+    options = {}
+    for name_type, refs in tokens_by_name_type.items():
+        index = get_phonetic_name_index(name_type, encoding)
+        sound_alikes = index.sound_alikes([token for _, _, token in refs])
+        for (i, j, _), sound_alike in zip(refs, sound_alikes):
+            if sound_alike is not None:
+                options.setdefault(i, []).append((j, sound_alike))
+
+    for i, record_to_modify in enumerate(records_to_modify):
+        tokens = formatted_master_records[i]["full_name_tokens"]
+        if tokens is None:
+            record_to_modify["full_name"] = None
+            continue
+
+        tokens = list(tokens)
+        if i in options:
+            j, sound_alike = random.choice(options[i])
+            tokens[j] = sound_alike
+        record_to_modify["full_name"] = " ".join(tokens)
+    return records_to_modify
+
+
+def full_name_sound_alike(formatted_master_record, record_to_modify=None):
+    if record_to_modify is None:
+        record_to_modify = {}
+
+    full_name_sound_alike_batch(
+        [formatted_master_record], records_to_modify=[record_to_modify]
+    )
+    return record_to_modify
+
+
+# Probability of keeping each token of the full name in full_name_null
+FULL_NAME_NULL_KEEP_PROB = {"first": 0.5, "middle": 0.5, "last": 0.5}
 
-    # Erase first or last name with prob null prob
 
-    if random.uniform(0, 1) > 1 / 2:
-        first = None
-    if random.uniform(0, 1) > 1 / 2:
-        last = None
+def full_name_null(formatted_master_record, record_to_modify=None):
+    """Erase each of the first, middle and last names with some probability"""
+    if record_to_modify is None:
+        record_to_modify = {}
+
+    tokens = formatted_master_record["full_name_tokens"]
+
+    if tokens is None:
+        record_to_modify["full_name"] = None
+        return record_to_modify
+
+    roles = formatted_master_record["full_name_token_roles"]
 
-    new_name = [first] + new_name + [last]
+    new_name = [
+        n
+        for n, role in zip(tokens, roles)
+        if random.uniform(0, 1) < FULL_NAME_NULL_KEEP_PROB[role]
+    ]
 
-    new_name = [n for n in new_name if n is not None]
     if len(new_name) > 0:
         record_to_modify["full_name"] = " ".join(new_name)
     else:
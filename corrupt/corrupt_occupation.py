@@ -1,33 +1,40 @@
 import numpy as np
 
+# occupationLabel is dictionary encoded, so these functions work with integer
+# codes.  The output column is a tuple of codes, decoded to strings using
+# corrupt.dictionary_encoding.decode_code_lists when the output is written
+
 
 def occupation_format_master_record(master_input_record):
-    if not master_input_record["occupationLabel"]:
+    codes = tuple(master_input_record["occupationLabel"])
+    if not codes:
         master_input_record["_list_occupations"] = None
     else:
-        master_input_record["_list_occupations"] = master_input_record[
-            "occupationLabel"
-        ]
+        master_input_record["_list_occupations"] = codes
     return master_input_record
 
 
-def occupation_gen_uncorrupted_record(formatted_master_record, record_to_modify={}):
+def occupation_gen_uncorrupted_record(formatted_master_record, record_to_modify=None):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     if formatted_master_record["_list_occupations"] is None:
         record_to_modify["occupation"] = None
     else:
-        record_to_modify["occupation"] = ", ".join(
-            formatted_master_record["_list_occupations"]
-        )
+        record_to_modify["occupation"] = formatted_master_record["_list_occupations"]
     return record_to_modify
 
 
-def occupation_corrupt(formatted_master_record, record_to_modify={}):
+def occupation_corrupt(formatted_master_record, record_to_modify=None):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     options = formatted_master_record["_list_occupations"]
     if options is None:
         record_to_modify["occupation"] = None
     elif len(options) == 1:
-        record_to_modify["occupation"] = options[0]
+        record_to_modify["occupation"] = options
     else:
-        record_to_modify["occupation"] = np.random.choice(list(options))
+        record_to_modify["occupation"] = (np.random.choice(options),)
 
     return record_to_modify
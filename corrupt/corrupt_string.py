@@ -1,3 +1,5 @@
+import numpy as np
+
 from corrupt.geco_corrupt import (
     CorruptValueNumpad,
     CorruptValueQuerty,
@@ -9,10 +11,13 @@ def string_corrupt_numpad(
     formatted_master_record,
     input_colname,
     output_colname,
-    record_to_modify={},
+    record_to_modify=None,
     row_prob=0.5,
     col_prob=0.5,
 ):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     input_value = formatted_master_record[input_colname]
     if not input_value:
         record_to_modify[output_colname] = None
@@ -33,10 +38,13 @@ def string_corrupt_querty_keyboard(
     formatted_master_record,
     input_colname,
     output_colname,
-    record_to_modify={},
+    record_to_modify=None,
     row_prob=0.5,
     col_prob=0.5,
 ):
+    if record_to_modify is None:
+        record_to_modify = {}
+
     input_value = formatted_master_record[input_colname]
 
     if not input_value:
@@ -53,3 +61,93 @@ def string_corrupt_querty_keyboard(
     )
 
     return record_to_modify
+
+
+def _numpad_neighbour_tables(row_prob, col_prob):
+    """Turn the numpad row and column neighbour strings into arrays indexed by
+    [row_or_col, digit, option] so they can be used with numpy fancy indexing
+    """
+    numpad_corruptor = CorruptValueNumpad(
+        position_function=position_mod_uniform, row_prob=row_prob, col_prob=col_prob
+    )
+    tables = [numpad_corruptor.rows, numpad_corruptor.cols]
+    max_options = max(len(v) for t in tables for v in t.values())
+
+    neighbours = np.zeros((2, 10, max_options), dtype=np.uint8)
+    num_neighbours = np.zeros((2, 10), dtype=np.int64)
+    for t_index, table in enumerate(tables):
+        for digit, options in table.items():
+            options = np.frombuffer(options.encode("ascii"), dtype=np.uint8)
+            neighbours[t_index, int(digit), : len(options)] = options
+            num_neighbours[t_index, int(digit)] = len(options)
+    return neighbours, num_neighbours
+
+
+def string_corrupt_numpad_batch(strings, row_prob=0.5, col_prob=0.5, start_pos=0):
+    """Vectorised numpad typo, applied to an array of strings in one go
+
+    Equivalent to CorruptValueNumpad.corrupt_value: a digit at a uniformly chosen
+    position is replaced by one of its numpad row or column neighbours.
+    Only positions at or after start_pos are eligible (e.g. start_pos=2
+    leaves the century of an ISO date alone).
+
+    None values in strings are returned as None
+    """
+    strings = np.asarray(strings, dtype=object)
+    is_null = np.array([s is None for s in strings], dtype=bool)
+    filled = np.where(is_null, "", strings)
+
+    as_bytes = filled.astype("S")
+    width = as_bytes.dtype.itemsize
+    if width == 0 or len(as_bytes) == 0:
+        return strings
+
+    chars = as_bytes.view(np.uint8).reshape(len(as_bytes), width).copy()
+
+    is_digit = (chars >= ord("0")) & (chars <= ord("9"))
+    is_digit[:, :start_pos] = False
+    has_digit = is_digit.any(axis=1)
+
+    # Pick a uniformly random eligible position per row
+    keys = np.where(is_digit, np.random.random_sample(chars.shape), -1.0)
+    pos = keys.argmax(axis=1)
+
+    rows = np.arange(len(chars))
+    digit = np.where(has_digit, chars[rows, pos] - ord("0"), 0)
+
+    neighbours, num_neighbours = _numpad_neighbour_tables(row_prob, col_prob)
+    use_col = (np.random.random_sample(len(chars)) > row_prob).astype(np.int64)
+    n_options = num_neighbours[use_col, digit]
+    option = (np.random.random_sample(len(chars)) * n_options).astype(np.int64)
+    new_char = neighbours[use_col, digit, option]
+
+    chars[rows[has_digit], pos[has_digit]] = new_char[has_digit]
+
+    corrupted = chars.view(f"S{width}").ravel().astype(str).astype(object)
+    corrupted[is_null] = None
+    return corrupted
+
+
+def string_corrupt_numpad_records_batch(
+    formatted_master_records,
+    input_colname,
+    output_colname,
+    records_to_modify=None,
+    row_prob=0.5,
+    col_prob=0.5,
+):
+    """Batch version of string_corrupt_numpad, for values whose strings are
+    ascii, such as dates and numbers
+    """
+    if records_to_modify is None:
+        records_to_modify = [{} for _ in formatted_master_records]
+
+    strings = [
+        str(r[input_colname]) if r[input_colname] else None
+        for r in formatted_master_records
+    ]
+    strings = string_corrupt_numpad_batch(strings, row_prob=row_prob, col_prob=col_prob)
+
+    for record_to_modify, s in zip(records_to_modify, strings):
+        record_to_modify[output_colname] = s
+    return records_to_modify
@@ -1,12 +1,24 @@
 from functools import partial
 import random
 
+# Each output record's id is person_id * RECORD_ID_STRIDE + duplicate_index,
+# where the uncorrupted record has duplicate_index 0, e.g. 42003 is the third
+# corrupted record of person 42.  So there can be at most RECORD_ID_STRIDE - 1
+# corrupted records per person
+RECORD_ID_STRIDE = 1000
+
+
+def record_id(person_id, duplicate_index):
+    return person_id * RECORD_ID_STRIDE + duplicate_index
+
 
 def master_record_no_op(master_record):
     return master_record
 
 
-def _basic_null_fn_to_partial(master_record, col_name, record_to_modify={}):
+def _basic_null_fn_to_partial(master_record, col_name, record_to_modify=None):
+    if record_to_modify is None:
+        record_to_modify = {}
 
     record_to_modify[col_name] = None
 
@@ -24,19 +36,28 @@ def format_master_data(master_input_record, config):
     return master_record
 
 
-def generate_uncorrupted_output_record(formatted_master_record, config):
+def generate_uncorrupted_output_record(
+    formatted_master_record, config, uncorrupted_values=None
+):
+    """
+    If uncorrupted_values (see corrupt.error_vector.generate_uncorrupted_values)
+    is provided, the record is built from it rather than recomputed
+    """
 
     uncorrupted_record = {"uncorrupted_record": True}
 
-    uncorrupted_record["cluster"] = formatted_master_record["human"]
+    uncorrupted_record["cluster"] = formatted_master_record["person_id"]
 
     for c in config:
+        if uncorrupted_values is not None:
+            uncorrupted_record.update(uncorrupted_values[c["col_name"]])
+            continue
         fn = c["gen_uncorrupted_record"]
         uncorrupted_record = fn(
             formatted_master_record, record_to_modify=uncorrupted_record
         )
 
-    uncorrupted_record["id"] = formatted_master_record["human"] + "_0"
+    uncorrupted_record["id"] = record_id(formatted_master_record["person_id"], 0)
 
     return uncorrupted_record
 
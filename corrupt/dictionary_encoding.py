@@ -0,0 +1,55 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from path_fns.filepaths import transformed_master_data_vocabulary_filename
+
+
+@functools.lru_cache(maxsize=None)
+def get_vocabulary(colname):
+    """
+    Load the vocabulary for a dictionary encoded column (see
+    transform_master_data/dictionary_encode.py) as an array of values
+    indexed by code
+    """
+    table = pq.read_table(transformed_master_data_vocabulary_filename(colname))
+    codes = table["code"].to_numpy()
+    vocabulary = np.empty(len(codes), dtype=object)
+    vocabulary[codes] = table["value"].to_pylist()
+    return vocabulary
+
+
+def _is_null(value):
+    # Lists of codes are never null, so only check scalars
+    return np.ndim(value) == 0 and pd.isna(value)
+
+
+def decode_code_lists(values, vocabulary, separator=", "):
+    """
+    Decode a column in which each value is a list of codes, such as the output
+    of occupation_corrupt, into a pandas Categorical of strings.
+
+    The strings are only built once per distinct list of codes, and the result is
+    written to parquet as a dictionary encoded column.  Nulls and empty lists
+    become nulls
+    """
+    category_positions = {}
+    categories = []
+    decoded = {}
+
+    codes = np.full(len(values), -1, dtype=np.int64)
+    for i, value in enumerate(values):
+        if _is_null(value) or len(value) == 0:
+            continue
+        key = tuple(value)
+        if key not in decoded:
+            string = separator.join(vocabulary[list(key)])
+            if string not in category_positions:
+                category_positions[string] = len(categories)
+                categories.append(string)
+            decoded[key] = category_positions[string]
+        codes[i] = decoded[key]
+
+    return pd.Categorical.from_codes(codes, categories=categories)
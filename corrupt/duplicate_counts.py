@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+
+# Each distribution is described in the same format as get_zipf_dist, i.e.
+# {"vals": (1, 2, 3), "weights": [0.5, 0.3, 0.2]}
+# so that any of them can be passed to sample_duplicate_counts
+
+
+def zipf_duplicate_count_dist(max_corrupted_records, zipf_theta=0.5):
+    """Zipf distribution of the number of corrupted records, using the same
+    parameterisation as GeCo's get_zipf_dist.
+
+    Unlike get_zipf_dist, every value from 1 to max_corrupted_records
+    gets non-zero weight
+    """
+    vals = tuple(range(1, max_corrupted_records + 1))
+    zipf_num = [1.0 / (v ** (1.0 - zipf_theta)) for v in vals]
+    weights = [z / sum(zipf_num) for z in zipf_num]
+    return {"vals": vals, "weights": weights}
+
+
+def poisson_duplicate_count_dist(mean, max_corrupted_records, min_corrupted_records=1):
+    """Poisson distribution of the number of corrupted records, truncated to
+    the range [min_corrupted_records, max_corrupted_records]
+    """
+    vals = tuple(range(min_corrupted_records, max_corrupted_records + 1))
+    pmf = [math.exp(-mean) * mean**k / math.factorial(k) for k in vals]
+    weights = [p / sum(pmf) for p in pmf]
+    return {"vals": vals, "weights": weights}
+
+
+def empirical_duplicate_count_dist(histogram):
+    """Distribution from an observed histogram of duplicate counts e.g.
+    {1: 5000, 2: 1200, 3: 150}
+    """
+    vals = tuple(sorted(histogram.keys()))
+    total = sum(histogram.values())
+    weights = [histogram[v] / total for v in vals]
+    return {"vals": vals, "weights": weights}
+
+
+def sample_duplicate_counts(num_persons, duplicate_count_dist):
+    """Draw the number of corrupted records for every person in one go"""
+    return np.random.choice(
+        duplicate_count_dist["vals"],
+        size=num_persons,
+        p=duplicate_count_dist["weights"],
+    ).astype(np.int64)
+
+
+def plan_duplicates(duplicate_counts):
+    """
+    Explode per-person duplicate counts into a plan with one row per output record
+
+    | person_index | duplicate_index |
+    |-------------:|----------------:|
+    |            0 |               0 |
+    |            0 |               1 |
+    |            1 |               0 |
+    |            1 |               1 |
+    |            1 |               2 |
+
+    duplicate_index 0 is the uncorrupted record, 1..n are the corrupted records.
+    Rows are ordered by person, so the output records for person i are the
+    contiguous slice plan_offsets(duplicate_counts)[i:i+2]
+    """
+    records_per_person = duplicate_counts + 1
+    num_output_records = int(records_per_person.sum())
+
+    person_index = np.repeat(np.arange(len(duplicate_counts)), records_per_person)
+
+    starts = plan_offsets(duplicate_counts)[:-1]
+    duplicate_index = np.arange(num_output_records) - np.repeat(
+        starts, records_per_person
+    )
+
+    import pandas as pd
+
+    return pd.DataFrame(
+        {"person_index": person_index, "duplicate_index": duplicate_index}
+    )
+
+
+def plan_offsets(duplicate_counts):
+    """Start position of each person's records in the plan, plus a final
+    entry equal to the total number of output records
+    """
+    return np.concatenate([[0], np.cumsum(duplicate_counts + 1)])
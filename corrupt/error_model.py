@@ -0,0 +1,115 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from corrupt.error_vector import error_vector_distribution, ramp_position
+
+
+class GaussianCopulaErrorModel:
+    """
+    An error model in which errors in different columns can be correlated.
+
+    Each column has a latent standard normal variable.  The latent variables
+    are correlated with each other according to `correlations`, and each
+    column's error vector value is found by cutting its latent variable at
+    thresholds chosen so the marginal probabilities match
+    error_vector_distribution.
+
+    Error vector values are ordered from least to most severe: do nothing,
+    then each corruption function, then null.  A positive correlation between
+    two columns therefore means that an error in one column makes an error in
+    the other more likely, e.g. a change of surname going with a change of
+    marital status.
+
+    The probabilities ramp from start_prob_null/start_prob_corrupt for the
+    first duplicate to end_prob_null/end_prob_corrupt for duplicate number
+    max_duplicate_index.
+
+    The thresholds for every column and duplicate index are compiled into
+    lookup tables when the model is created, so that sampling is a matrix
+    multiply and a comparison.
+
+    Example:
+        error_model = GaussianCopulaErrorModel(
+            config,
+            max_duplicate_index=3,
+            correlations={("full_name", "dob"): 0.3},
+        )
+        error_vectors = generate_error_vectors(config, 3, error_model=error_model)
+    """
+
+    def __init__(self, config, max_duplicate_index, correlations=None):
+        self.col_names = [entry["col_name"] for entry in config]
+        self.max_duplicate_index = max_duplicate_index
+
+        self.correlation_matrix = self._build_correlation_matrix(correlations or {})
+        try:
+            self.cholesky = np.linalg.cholesky(self.correlation_matrix)
+        except np.linalg.LinAlgError:
+            raise ValueError(
+                "The correlations provided do not form a valid correlation matrix"
+            )
+
+        self.values = {}
+        self.thresholds = {}
+        for entry in config:
+            values, thresholds = self._compile_thresholds(entry)
+            self.values[entry["col_name"]] = values
+            self.thresholds[entry["col_name"]] = thresholds
+
+    def _build_correlation_matrix(self, correlations):
+        index = {c: i for i, c in enumerate(self.col_names)}
+        matrix = np.eye(len(self.col_names))
+        for (col_a, col_b), rho in correlations.items():
+            matrix[index[col_a], index[col_b]] = rho
+            matrix[index[col_b], index[col_a]] = rho
+        return matrix
+
+    def _compile_thresholds(self, entry):
+        """
+        Returns the error vector values in order of severity, and an array of
+        shape (max_duplicate_index + 1, num_values - 1) of thresholds on the
+        latent normal scale.  Row d holds the thresholds for duplicate index d
+        """
+        normal = NormalDist()
+
+        thresholds = []
+        for duplicate_index in range(self.max_duplicate_index + 1):
+            position = ramp_position(max(duplicate_index, 1), self.max_duplicate_index)
+            values, weights = error_vector_distribution(entry, position)
+
+            # Reorder from [-1, 0, 1, ..n] to [0, 1, ..n, -1]
+            values = values[1:] + values[:1]
+            weights = weights[1:] + weights[:1]
+
+            cumulative = np.cumsum(weights)[:-1]
+            row = []
+            for c in cumulative:
+                if c <= 0:
+                    row.append(-np.inf)
+                elif c >= 1:
+                    row.append(np.inf)
+                else:
+                    row.append(normal.inv_cdf(c))
+            thresholds.append(row)
+
+        return np.array(values), np.array(thresholds)
+
+    def sample(self, duplicate_index):
+        """
+        Draw one error vector for each element of duplicate_index.
+
+        Returns a dict of {output_col_name: array of error vector values}
+        """
+        duplicate_index = np.asarray(duplicate_index)
+        lookup_row = np.clip(duplicate_index, 0, self.max_duplicate_index)
+
+        z = np.random.standard_normal((len(duplicate_index), len(self.col_names)))
+        z = z @ self.cholesky.T
+
+        error_vector_table = {}
+        for j, col_name in enumerate(self.col_names):
+            thresholds = self.thresholds[col_name][lookup_row]
+            category = (z[:, j : j + 1] > thresholds).sum(axis=1)
+            error_vector_table[col_name] = self.values[col_name][category]
+        return error_vector_table
@@ -1,7 +1,9 @@
 import numpy as np
 
 
-def generate_error_vectors(config, num_error_vectors_to_generate):
+def generate_error_vectors(
+    config, num_error_vectors_to_generate, error_model=None, max_duplicate_index=None
+):
     """
     An error vector is a succinct description of how corruptions will be introduced
     into an original, master record
@@ -33,34 +35,38 @@ def generate_error_vectors(config, num_error_vectors_to_generate):
      ..
      n: Use the nth error function specified in the config
 
+    The ith error vector is for duplicate number i.  Without an error_model,
+    the probabilities of nulls and corruptions ramp up to duplicate number
+    max_duplicate_index (see default_max_duplicate_index and
+    error_vector_distribution).
+
+    If an error_model is provided (see corrupt.error_model), error vectors are
+    drawn from it, allowing for correlations between columns.
     """
 
+    if error_model is not None:
+        duplicate_index = np.arange(1, num_error_vectors_to_generate + 1)
+        error_vector_table = error_model.sample(duplicate_index)
+        return [
+            {col_name: codes[i] for col_name, codes in error_vector_table.items()}
+            for i in range(num_error_vectors_to_generate)
+        ]
+
     # The following is an extremely simple implementation with no correlations!
 
+    if max_duplicate_index is None:
+        max_duplicate_index = default_max_duplicate_index()
+
     list_error_vectors = []
 
     for this_vector in range(num_error_vectors_to_generate):
+        position = ramp_position(this_vector + 1, max_duplicate_index)
         error_vector = {}
         for entry in config:
             col_name = entry["col_name"]
-            corruption_functions = entry["corruption_functions"]
-            num_corruption_functions = len(corruption_functions)
-
-            null_probability = 0.1
-            do_nothing_probability = 0.5
-            probability_corrupt = 1 - null_probability - do_nothing_probability
-
-            reweighted_corruption_probabilities = [
-                f["p"] * probability_corrupt for f in corruption_functions
-            ]
-
-            # i.e. if there are two corruption functions, this will be [-1, 0, 1, 2]
-            error_vector_values = [-1] + list(range(num_corruption_functions + 1))
-
-            error_vector_weights = [
-                null_probability,
-                do_nothing_probability,
-            ] + reweighted_corruption_probabilities
+            error_vector_values, error_vector_weights = error_vector_distribution(
+                entry, position
+            )
 
             chosen_error_vector_value = np.random.choice(
                 error_vector_values, p=error_vector_weights
@@ -70,16 +76,160 @@ def generate_error_vectors(config, num_error_vectors_to_generate):
     return list_error_vectors
 
 
-def apply_error_vector(error_vector, formatted_master_record, config):
+def default_max_duplicate_index():
+    """
+    The duplicate number the probabilities ramp up to when there is no error
+    model, MAX_CORRUPTED_RECORDS in corrupt/config.py, as in get_error_model
+    """
+    from corrupt.config import MAX_CORRUPTED_RECORDS
+
+    return MAX_CORRUPTED_RECORDS
+
+
+def ramp_position(duplicate_index, max_duplicate_index):
+    """
+    How far duplicate number duplicate_index is along the ramp from the first
+    duplicate (0) to duplicate number max_duplicate_index (1)
+    """
+    if max_duplicate_index <= 1:
+        return np.zeros_like(duplicate_index, dtype=float)
+    position = (np.asarray(duplicate_index) - 1) / (max_duplicate_index - 1)
+    return np.clip(position, 0, 1)
+
+
+def error_vector_distribution(entry, ramp_position=0.0):
+    """
+    The possible error vector values for a single config entry, and their
+    probabilities
+
+    The probabilities of nulls and corruptions move linearly from
+    start_prob_null/start_prob_corrupt (ramp_position=0) to
+    end_prob_null/end_prob_corrupt (ramp_position=1), if these keys are
+    set in the config entry
+    """
+    corruption_functions = entry["corruption_functions"]
+    num_corruption_functions = len(corruption_functions)
+
+    start_prob_null = entry.get("start_prob_null", 0.1)
+    end_prob_null = entry.get("end_prob_null", start_prob_null)
+    start_prob_corrupt = entry.get("start_prob_corrupt", 0.4)
+    end_prob_corrupt = entry.get("end_prob_corrupt", start_prob_corrupt)
+
+    null_probability = (
+        start_prob_null + (end_prob_null - start_prob_null) * ramp_position
+    )
+    probability_corrupt = (
+        start_prob_corrupt + (end_prob_corrupt - start_prob_corrupt) * ramp_position
+    )
+    do_nothing_probability = 1 - null_probability - probability_corrupt
+
+    reweighted_corruption_probabilities = [
+        f["p"] * probability_corrupt for f in corruption_functions
+    ]
+
+    # i.e. if there are two corruption functions, this will be [-1, 0, 1, 2]
+    error_vector_values = [-1] + list(range(num_corruption_functions + 1))
+
+    error_vector_weights = [
+        null_probability,
+        do_nothing_probability,
+    ] + reweighted_corruption_probabilities
+
+    return error_vector_values, error_vector_weights
+
+
+def generate_error_vector_table(
+    config, duplicate_index, error_model=None, max_duplicate_index=None
+):
+    """
+    Vectorised equivalent of generate_error_vectors, producing one error vector
+    for every row of a duplicates plan (see corrupt.duplicate_counts.plan_duplicates)
+
+    Returns a dict of {output_col_name: array of corruption function indices}.
+    Rows with duplicate_index 0 are the uncorrupted records, so are always 0
+
+    Without an error_model, the probabilities ramp up to duplicate number
+    max_duplicate_index, as in generate_error_vectors
+    """
+    duplicate_index = np.asarray(duplicate_index)
+
+    if error_model is not None:
+        error_vector_table = error_model.sample(duplicate_index)
+        for codes in error_vector_table.values():
+            codes[duplicate_index == 0] = 0
+        return error_vector_table
+
+    if max_duplicate_index is None:
+        max_duplicate_index = default_max_duplicate_index()
+
+    error_vector_table = {
+        entry["col_name"]: np.zeros(len(duplicate_index), dtype=int) for entry in config
+    }
+    # Rows with the same duplicate index share a distribution, so are drawn together
+    for index in np.unique(duplicate_index[duplicate_index > 0]):
+        rows = np.flatnonzero(duplicate_index == index)
+        position = ramp_position(index, max_duplicate_index)
+        for entry in config:
+            values, weights = error_vector_distribution(entry, position)
+            error_vector_table[entry["col_name"]][rows] = np.random.choice(
+                values, size=len(rows), p=weights
+            )
+    return error_vector_table
+
+
+def generate_uncorrupted_values(formatted_master_record, config):
+    """
+    The output of each column's gen_uncorrupted_record, in the format
+    {col_name: {output_col_name: value}}
+
+    These are deterministic, so are computed once per master record and reused
+    by the uncorrupted record and every duplicate that leaves the column unchanged
+    """
+    return {
+        entry["col_name"]: entry["gen_uncorrupted_record"](formatted_master_record)
+        for entry in config
+    }
+
+
+def generate_uncorrupted_values_batch(formatted_master_records, config):
+    """
+    generate_uncorrupted_values for each of formatted_master_records, using the
+    batch version of each column's gen_uncorrupted_record if it has one
+    """
+    from corrupt.batch_functions import apply_fn_to_records
+
+    uncorrupted_values = [{} for _ in formatted_master_records]
+    for entry in config:
+        col_values = apply_fn_to_records(
+            entry["gen_uncorrupted_record"],
+            formatted_master_records,
+            [{} for _ in formatted_master_records],
+        )
+        for values, col_value in zip(uncorrupted_values, col_values):
+            values[entry["col_name"]] = col_value
+    return uncorrupted_values
+
+
+def apply_error_vector(
+    error_vector, formatted_master_record, config, uncorrupted_values=None
+):
     """
     Use an error vector to corrupt a record
+
+    If uncorrupted_values (see generate_uncorrupted_values) is provided, columns
+    with an error vector value of 0 are copied from it rather than recomputed
     """
     output_record = {}
     for output_col in config:
         output_col_name = output_col["col_name"]
+        error_vector_value = error_vector[output_col_name]
+
+        if error_vector_value == 0 and uncorrupted_values is not None:
+            output_record.update(uncorrupted_values[output_col_name])
+            continue
+
         null_fn = output_col["null_function"]
         no_change_fn = output_col["gen_uncorrupted_record"]
-        error_vector_value = error_vector[output_col_name]
 
         corruption_functions = [c["fn"] for c in output_col["corruption_functions"]]
         if error_vector_value == -1:
@@ -92,3 +242,51 @@ def apply_error_vector(error_vector, formatted_master_record, config):
         output_record = fn(formatted_master_record, record_to_modify=output_record)
 
     return output_record
+
+
+def fns_by_error_vector_value(entry):
+    """The function for each error vector value of a config entry"""
+    fns = {-1: entry["null_function"], 0: entry["gen_uncorrupted_record"]}
+    for i, c in enumerate(entry["corruption_functions"]):
+        fns[i + 1] = c["fn"]
+    return fns
+
+
+def apply_error_vector_table(
+    error_vector_table, formatted_master_records, config, uncorrupted_values=None
+):
+    """
+    Batch equivalent of apply_error_vector, which corrupts the ith formatted
+    master record with the ith error vector in error_vector_table (see
+    generate_error_vector_table), and returns a list of the output records.
+
+    The records with the same error vector value in a column are corrupted
+    together, with a single call of the function's batch version if it has one
+    (see corrupt.batch_functions).  If uncorrupted_values, a list with the
+    uncorrupted values of each record, is provided, columns with an error vector
+    value of 0 are copied from it
+    """
+    from corrupt.batch_functions import apply_fn_to_records
+
+    output_records = [{} for _ in formatted_master_records]
+    for output_col in config:
+        output_col_name = output_col["col_name"]
+        codes = np.asarray(error_vector_table[output_col_name])
+
+        for value, fn in fns_by_error_vector_value(output_col).items():
+            rows = np.flatnonzero(codes == value)
+            if len(rows) == 0:
+                continue
+
+            if value == 0 and uncorrupted_values is not None:
+                for row in rows:
+                    output_records[row].update(uncorrupted_values[row][output_col_name])
+                continue
+
+            apply_fn_to_records(
+                fn,
+                [formatted_master_records[row] for row in rows],
+                [output_records[row] for row in rows],
+            )
+
+    return output_records
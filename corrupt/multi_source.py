@@ -0,0 +1,280 @@
+import logging
+import os
+
+from path_fns.filepaths import CORRUPTED_RECORDS_MULTI_SOURCE
+
+# Generates several source datasets, e.g. a register and a survey, from the same
+# persons in one pass over the master data.  Each master record is formatted,
+# and its uncorrupted values computed, once, and shared by every source.  Each
+# source then samples which persons it covers, how many records it holds for
+# each, and their error vectors, using its own config (see SOURCES in
+# corrupt/config.py).
+#
+# Each source's records are written to their own partition,
+# out_dir/source_dataset=<name>/records.parquet.  The cluster is the person_id in
+# every source, and record ids are unique across sources, so the partitions can
+# be read together for link-only linkage:
+#
+# select * from read_parquet('<out_dir>/*/*.parquet', hive_partitioning=true)
+
+logger = logging.getLogger(__name__)
+
+# Settings used for a source if it does not set them
+SOURCE_DEFAULTS = {"coverage": 1.0, "include_uncorrupted_record": False}
+
+
+def _check_shared_formatting(sources):
+    """
+    The formatted master record and uncorrupted values are shared by all
+    sources, so they must be computed the same way for every source
+    """
+    base_config = sources[0]["config"]
+    for source in sources[1:]:
+        config = source["config"]
+        same = [entry["col_name"] for entry in config] == [
+            entry["col_name"] for entry in base_config
+        ] and all(
+            entry[key] is base_entry[key]
+            for entry, base_entry in zip(config, base_config)
+            for key in ("format_master_data", "gen_uncorrupted_record")
+        )
+        if not same:
+            raise ValueError(
+                f"Source {source['source_dataset']} must have the same columns, "
+                "format_master_data and gen_uncorrupted_record as "
+                f"{sources[0]['source_dataset']}"
+            )
+
+
+def resolve_sources(sources):
+    """
+    Fill in each source's defaults, its duplicate count distribution and error
+    model, and the offset added to its duplicate indices so that record ids are
+    unique across sources.  Returns new source dicts
+    """
+    from corrupt.config import (
+        ERROR_CORRELATIONS,
+        MAX_CORRUPTED_RECORDS,
+        get_duplicate_count_dist,
+        get_error_model,
+    )
+    from corrupt.corruption_functions import RECORD_ID_STRIDE
+
+    names = [source["source_dataset"] for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Source names must be unique: {names}")
+    _check_shared_formatting(sources)
+
+    resolved = []
+    id_offset = 0
+    for source in sources:
+        source = {**SOURCE_DEFAULTS, **source}
+        max_corrupted_records = source.setdefault(
+            "max_corrupted_records", MAX_CORRUPTED_RECORDS
+        )
+        source.setdefault(
+            "duplicate_count_dist", get_duplicate_count_dist(max_corrupted_records)
+        )
+        source["error_model"] = get_error_model(
+            source["config"],
+            max_corrupted_records,
+            source.get("error_correlations", ERROR_CORRELATIONS),
+        )
+        source["id_offset"] = id_offset
+        id_offset += max_corrupted_records + 1
+        resolved.append(source)
+
+    if id_offset > RECORD_ID_STRIDE:
+        raise ValueError(
+            f"The sources have {id_offset} records per person in total, which must "
+            f"be at most {RECORD_ID_STRIDE} so that every record has a unique id"
+        )
+    return resolved
+
+
+def sample_source_population(num_persons, source):
+    """
+    Decide up front, for each of num_persons persons, how many corrupted records
+    they have in the source, and whether they appear in it at all.  Returns the
+    arrays (duplicate_counts, covered), which can be sliced to plan a batch of
+    persons at a time
+    """
+    import numpy as np
+
+    from corrupt.duplicate_counts import sample_duplicate_counts
+
+    duplicate_counts = sample_duplicate_counts(
+        num_persons, source["duplicate_count_dist"]
+    )
+    covered = np.random.random(num_persons) < source["coverage"]
+    return duplicate_counts, covered
+
+
+def plan_source_records(duplicate_counts, covered, source):
+    """
+    The duplicate index and error vector of each of the source's records for
+    the persons in a population (see sample_source_population).
+
+    Returns the plan (see corrupt.duplicate_counts.plan_duplicates) filtered to
+    the source's records, with a column per error vector entry
+    """
+    from corrupt.duplicate_counts import plan_duplicates
+    from corrupt.error_vector import generate_error_vector_table
+
+    plan = plan_duplicates(duplicate_counts)
+
+    error_vector_table = generate_error_vector_table(
+        source["config"], plan["duplicate_index"], error_model=source["error_model"]
+    )
+    plan = plan.assign(**error_vector_table)
+
+    keep = covered[plan["person_index"].to_numpy()]
+    if not source["include_uncorrupted_record"]:
+        keep &= plan["duplicate_index"].to_numpy() > 0
+    return plan[keep]
+
+
+def warm_lookups():
+    """
+    Load the lookups used by the corruption functions, e.g. before forking
+    worker processes, so that they are loaded once and shared
+    """
+    from corrupt.corrupt_lat_lng import get_place_index
+    from corrupt.corrupt_name import (
+        SOUND_ALIKE_NAME_TYPES,
+        get_family_name_alternatives_lookup,
+        get_given_name_alternatives_lookup,
+        get_phonetic_name_index,
+    )
+    from corrupt.dictionary_encoding import get_vocabulary
+
+    get_given_name_alternatives_lookup()
+    get_family_name_alternatives_lookup()
+    for name_type in set(SOUND_ALIKE_NAME_TYPES.values()):
+        get_phonetic_name_index(name_type)
+    get_place_index()
+    get_vocabulary("occupationLabel")
+    get_vocabulary("country_citizenLabel")
+
+
+def prepare_master_records(master_records, config):
+    """
+    Format each master record, and compute its uncorrupted values, once, so that
+    they can be shared by every source.  Returns a list of
+    (formatted_master_record, uncorrupted_values)
+    """
+    from corrupt.corruption_functions import format_master_data
+    from corrupt.error_vector import generate_uncorrupted_values_batch
+
+    formatted_master_records = [
+        format_master_data(master_input_record, config)
+        for master_input_record in master_records
+    ]
+    uncorrupted_values = generate_uncorrupted_values_batch(
+        formatted_master_records, config
+    )
+    return list(zip(formatted_master_records, uncorrupted_values))
+
+
+def generate_source_records(prepared_master_records, source, population=None):
+    """
+    Yield the output records of a source, which must have been resolved by
+    resolve_sources, for the master records prepared by prepare_master_records.
+
+    population is the (duplicate_counts, covered) of the prepared master records
+    (see sample_source_population), which is sampled if not given
+    """
+    from corrupt.run import BATCH_SIZE, generate_plan_records
+
+    if population is None:
+        population = sample_source_population(len(prepared_master_records), source)
+    plan = plan_source_records(*population, source)
+
+    # A batch of rows of the plan is corrupted at a time, so that records are
+    # yielded as they are needed
+    for start in range(0, len(plan), BATCH_SIZE):
+        yield from generate_plan_records(
+            plan.iloc[start : start + BATCH_SIZE],
+            prepared_master_records,
+            source["config"],
+            id_offset=source["id_offset"],
+        )
+
+
+def source_partition_path(out_dir, source_dataset):
+    return os.path.join(out_dir, f"source_dataset={source_dataset}", "records.parquet")
+
+
+def corrupt_records_multi_source(
+    sources=None,
+    limit=None,
+    in_path=None,
+    out_dir=CORRUPTED_RECORDS_MULTI_SOURCE,
+):
+    """
+    Corrupt the master data once for each source in sources (by default SOURCES
+    in corrupt/config.py), in a single pass, writing each source's records to
+    its own partition of out_dir.  Returns out_dir
+    """
+    import pandas as pd
+
+    from corrupt.record_writer import ParquetBatchWriter
+    from corrupt.run import (
+        MASTER_DATA_PATH,
+        count_master_records,
+        read_master_record_batches,
+        _output_records_to_arrow,
+    )
+    from duckdb_fns.connection import get_connection, log_peak_memory
+
+    if sources is None:
+        from corrupt.config import SOURCES
+
+        sources = SOURCES
+    if in_path is None:
+        in_path = MASTER_DATA_PATH
+
+    sources = resolve_sources(sources)
+
+    writers = {}
+    for source in sources:
+        out_path = source_partition_path(out_dir, source["source_dataset"])
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        writers[source["source_dataset"]] = ParquetBatchWriter(out_path)
+
+    con = get_connection()
+    num_persons = count_master_records(con, in_path, limit)
+    populations = [sample_source_population(num_persons, source) for source in sources]
+
+    try:
+        first_person = 0
+        for master_records in read_master_record_batches(con, in_path, limit):
+            end_person = first_person + len(master_records)
+            prepared = prepare_master_records(master_records, sources[0]["config"])
+            for source, population in zip(sources, populations):
+                batch_population = [arr[first_person:end_person] for arr in population]
+                output_records = list(
+                    generate_source_records(
+                        prepared, source, population=batch_population
+                    )
+                )
+                if output_records:
+                    df = pd.DataFrame(output_records)
+                    writer = writers[source["source_dataset"]]
+                    writer.write_table(_output_records_to_arrow(df))
+
+            logger.info(
+                "Written "
+                + ", ".join(
+                    f"{writer.num_rows:,.0f} {name}" for name, writer in writers.items()
+                )
+                + " output records"
+            )
+            first_person = end_person
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    log_peak_memory(con, "corrupt_records_multi_source")
+
+    return out_dir
@@ -0,0 +1,148 @@
+import numpy as np
+
+
+class PhoneticNameIndex:
+    """
+    An index from phonetic code to the names with that code, with each name's
+    frequency weight within its code, used to swap a name for one that sounds
+    alike e.g. jon for john.
+
+    Names are stored grouped by code, in a single array, with the cumulative
+    weights over all names.  So a sound-alike of a name is drawn with a dict
+    lookup of the name's position and a binary search, and no phonetic codes are
+    computed at corruption time.
+
+    Saved as parquet in the same format as the alternative name lookups, with
+    one row per code:
+
+    | phonetic_code | name_arr                | name_weight_arr |
+    |:--------------|:------------------------|:----------------|
+    | JAN           | ['john', 'jon', 'joan'] | [0.8, 0.15, 0.05] |
+    """
+
+    def __init__(self, codes, names, weights, group_sizes):
+        self.codes = codes
+        self.names = names
+        self.weights = weights
+        self.group_sizes = group_sizes
+
+        ends = np.cumsum(group_sizes)
+        starts = ends - group_sizes
+        self.group_start = np.repeat(starts, group_sizes)
+        self.group_end = np.repeat(ends, group_sizes)
+
+        self.cum_weights = np.cumsum(weights)
+        before = np.concatenate([[0.0], self.cum_weights])
+        # Cumulative weight of all the groups before each name's group
+        self.group_base = before[self.group_start]
+        self.group_total = before[self.group_end] - self.group_base
+
+        self.position = {name: i for i, name in enumerate(names)}
+
+    @classmethod
+    def build(cls, names, counts, encode):
+        """
+        Build the index from the names and their frequency counts, using
+        encode e.g. transform_master_data.phonetic.nysiis.  Names are lower
+        cased, as full name tokens are, and the counts of names that only differ
+        in case are summed.  Names with no phonetic code are left out
+        """
+        import pandas as pd
+
+        df = pd.DataFrame({"name": names, "count": counts})
+        df["name"] = df["name"].str.lower()
+        df = df.groupby("name", as_index=False, sort=False)["count"].sum()
+        df["phonetic_code"] = [encode(name) for name in df["name"]]
+        df = df.dropna(subset=["phonetic_code"])
+        df["weight"] = df["count"] / df.groupby("phonetic_code")["count"].transform(
+            "sum"
+        )
+        df = df.sort_values(
+            ["phonetic_code", "weight", "name"], ascending=[True, False, True]
+        )
+
+        group_sizes = df.groupby("phonetic_code", sort=True).size()
+        return cls(
+            group_sizes.index.tolist(),
+            df["name"].tolist(),
+            df["weight"].to_numpy(dtype=np.float64),
+            group_sizes.to_numpy(dtype=np.int64),
+        )
+
+    def save(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        offsets = np.concatenate([[0], np.cumsum(self.group_sizes)]).astype(np.int32)
+        table = pa.table(
+            {
+                "phonetic_code": pa.array(self.codes, pa.string()),
+                "name_arr": pa.ListArray.from_arrays(
+                    offsets, pa.array(self.names, pa.string())
+                ),
+                "name_weight_arr": pa.ListArray.from_arrays(
+                    offsets, pa.array(self.weights, pa.float64())
+                ),
+            }
+        )
+        pq.write_table(table, path)
+
+    @classmethod
+    def load(cls, path):
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        name_arr = table["name_arr"].combine_chunks()
+        weight_arr = table["name_weight_arr"].combine_chunks()
+        return cls(
+            table["phonetic_code"].to_pylist(),
+            pc.list_flatten(name_arr).to_pylist(),
+            pc.list_flatten(weight_arr).to_numpy(),
+            pc.list_value_length(name_arr).to_numpy().astype(np.int64),
+        )
+
+    def sound_alikes(self, names):
+        """
+        For each name, a different name with the same phonetic code, drawn in
+        proportion to the names' frequency weights.  None where the name is not
+        in the index or no other name has its code
+        """
+        positions = np.array([self.position.get(name, -1) for name in names])
+        result = [None] * len(names)
+        if len(positions) == 0:
+            return result
+
+        valid = positions >= 0
+        valid[valid] &= (
+            self.group_end[positions[valid]] - self.group_start[positions[valid]] > 1
+        )
+        rows = np.flatnonzero(valid)
+        positions = positions[rows]
+
+        # Draw from the name's group with its own weight removed, by skipping
+        # over the name's own interval of the cumulative weights
+        own_weight = self.weights[positions]
+        own_start = (
+            self.cum_weights[positions] - own_weight - self.group_base[positions]
+        )
+        r = np.random.random(len(rows)) * (self.group_total[positions] - own_weight)
+        skip_own = r >= own_start
+        r[skip_own] += own_weight[skip_own]
+
+        drawn = np.searchsorted(
+            self.cum_weights, self.group_base[positions] + r, side="right"
+        )
+        drawn = np.clip(
+            drawn, self.group_start[positions], self.group_end[positions] - 1
+        )
+        # Guard against rounding landing on the name itself
+        drawn = np.where(
+            drawn == positions,
+            np.where(drawn + 1 < self.group_end[positions], drawn + 1, drawn - 1),
+            drawn,
+        )
+
+        for row, position in zip(rows, drawn):
+            result[row] = self.names[position]
+        return result
@@ -0,0 +1,145 @@
+import os
+
+import numpy as np
+
+# Grid cell sizes in degrees, from finest to coarsest.  0.05 degrees is
+# roughly 5km at the equator, 1 degree roughly 100km
+DEFAULT_RESOLUTIONS = (0.05, 0.25, 1.0)
+
+
+def grid_cell(lat, lng, resolution):
+    """Integer id of the grid cell containing each point, at the given resolution"""
+    num_cols = int(np.ceil(360 / resolution)) + 1
+    row = np.floor((np.asarray(lat) + 90) / resolution).astype(np.int64)
+    col = np.floor((np.asarray(lng) + 180) / resolution).astype(np.int64)
+    return row * num_cols + col
+
+
+class PlaceIndex:
+    """
+    A spatial index over real places, used to swap a location for a real
+    nearby place.
+
+    Places are bucketed into grid cells at several resolutions.  For each
+    resolution the index stores the cell ids in sorted order, alongside the
+    position of each place in the places arrays, so the places in a cell
+    are found with a binary search.
+
+    The arrays are saved as .npy files so that workers can memory map them
+    rather than each holding a copy.
+    """
+
+    def __init__(self, lat, lng, place, place_label, resolutions, cells, orders):
+        self.lat = lat
+        self.lng = lng
+        self.place = place
+        self.place_label = place_label
+        self.resolutions = resolutions
+        self.cells = cells
+        self.orders = orders
+
+    @classmethod
+    def build(cls, places_table, resolutions=DEFAULT_RESOLUTIONS):
+        """Build the index from an arrow table with columns place, place_label,
+        lat and lng"""
+        lat = places_table["lat"].to_numpy()
+        lng = places_table["lng"].to_numpy()
+
+        cells = []
+        orders = []
+        for resolution in resolutions:
+            cell = grid_cell(lat, lng, resolution)
+            order = np.argsort(cell, kind="stable")
+            cells.append(cell[order])
+            orders.append(order)
+
+        return cls(
+            lat,
+            lng,
+            places_table["place"].to_pylist(),
+            places_table["place_label"].to_pylist(),
+            tuple(resolutions),
+            cells,
+            orders,
+        )
+
+    def save(self, directory):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        np.save(os.path.join(directory, "lat.npy"), self.lat)
+        np.save(os.path.join(directory, "lng.npy"), self.lng)
+        np.save(os.path.join(directory, "resolutions.npy"), np.array(self.resolutions))
+        for i, (cell, order) in enumerate(zip(self.cells, self.orders)):
+            np.save(os.path.join(directory, f"cells_{i}.npy"), cell)
+            np.save(os.path.join(directory, f"order_{i}.npy"), order)
+
+        labels = pa.table({"place": self.place, "place_label": self.place_label})
+        pq.write_table(labels, os.path.join(directory, "places.parquet"))
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        import pyarrow.parquet as pq
+
+        def load_array(name):
+            return np.load(os.path.join(directory, name), mmap_mode=mmap_mode)
+
+        resolutions = tuple(np.load(os.path.join(directory, "resolutions.npy")))
+        cells = [load_array(f"cells_{i}.npy") for i in range(len(resolutions))]
+        orders = [load_array(f"order_{i}.npy") for i in range(len(resolutions))]
+        labels = pq.read_table(os.path.join(directory, "places.parquet"))
+
+        return cls(
+            load_array("lat.npy"),
+            load_array("lng.npy"),
+            labels["place"].to_pylist(),
+            labels["place_label"].to_pylist(),
+            resolutions,
+            cells,
+            orders,
+        )
+
+    def nearby_place_positions(self, lat, lng):
+        """
+        For each point, find the position of a random different place in the
+        finest grid cell that contains at least one other place.
+
+        Returns an array of positions into the places arrays, with -1 where
+        no other place could be found or the point is null
+        """
+        lat = np.asarray(lat, dtype=float)
+        lng = np.asarray(lng, dtype=float)
+        n = len(lat)
+
+        result = np.full(n, -1, dtype=np.int64)
+        unresolved = ~(np.isnan(lat) | np.isnan(lng))
+
+        for resolution, cells, order in zip(self.resolutions, self.cells, self.orders):
+            idx = np.flatnonzero(unresolved)
+            if len(idx) == 0:
+                break
+
+            cell = grid_cell(lat[idx], lng[idx], resolution)
+            lo = np.searchsorted(cells, cell, side="left")
+            hi = np.searchsorted(cells, cell, side="right")
+            count = hi - lo
+
+            # Need at least two places in the cell to be able to move
+            # somewhere other than the original place
+            ok = count >= 2
+            idx, lo, count = idx[ok], lo[ok], count[ok]
+
+            pick = lo + (np.random.random_sample(len(idx)) * count).astype(np.int64)
+            position = np.asarray(order[pick])
+
+            # If we picked the original place, move to the next place in the cell
+            is_same = (self.lat[position] == lat[idx]) & (
+                self.lng[position] == lng[idx]
+            )
+            pick = np.where(is_same, lo + (pick - lo + 1) % count, pick)
+            position = np.asarray(order[pick])
+
+            result[idx] = position
+            unresolved[idx] = False
+
+        return result
@@ -0,0 +1,61 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ParquetBatchWriter:
+    """
+    Write a stream of arrow tables with the same columns to a single parquet file.
+
+    The column types are taken from the first tables written.  A column that
+    is entirely null in a table has the arrow type null, so the file is only
+    opened once every column has been seen with a real type, and tables are
+    held in memory until then.  All tables are cast to the file's schema, with
+    columns in the order of the first table
+    """
+
+    def __init__(self, out_path):
+        self.out_path = out_path
+        self.writer = None
+        self.pending = []
+        self.num_rows = 0
+
+    def _resolve_schema(self):
+        fields = {}
+        for table in self.pending:
+            for field in table.schema:
+                if field.name not in fields or pa.types.is_null(
+                    fields[field.name].type
+                ):
+                    fields[field.name] = field
+        return pa.schema(fields.values())
+
+    def _flush_pending(self, schema):
+        self.writer = pq.ParquetWriter(self.out_path, schema)
+        for table in self.pending:
+            self.writer.write_table(table.select(schema.names).cast(schema))
+        self.pending = []
+
+    def write_table(self, table):
+        self.num_rows += table.num_rows
+
+        if self.writer is not None:
+            schema = self.writer.schema
+            self.writer.write_table(table.select(schema.names).cast(schema))
+            return
+
+        self.pending.append(table)
+        schema = self._resolve_schema()
+        if not any(pa.types.is_null(field.type) for field in schema):
+            self._flush_pending(schema)
+
+    def close(self):
+        if self.writer is None and self.pending:
+            self._flush_pending(self._resolve_schema())
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
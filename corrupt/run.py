@@ -0,0 +1,346 @@
+import argparse
+import logging
+import os
+
+from path_fns.filepaths import (
+    TRANSFORMED_MASTER_DATA_ONE_ROW_PER_PERSON,
+    CORRUPTED_RECORDS,
+    CORRUPTED_RECORDS_MULTI_SOURCE,
+    CORRUPTED_RECORDS_WITH_BLOCKING_KEYS,
+    CORRUPTED_TERM_FREQUENCIES,
+)
+
+# Entry point for corrupting the master data:
+#
+# python -m corrupt --limit 1000
+
+logger = logging.getLogger(__name__)
+
+MASTER_DATA_PATH = os.path.join(
+    TRANSFORMED_MASTER_DATA_ONE_ROW_PER_PERSON, "transformed_master_data.parquet"
+)
+
+
+# Number of master records read, corrupted and written at a time
+BATCH_SIZE = 10_000
+
+
+def read_master_record_batches(
+    con, in_path=MASTER_DATA_PATH, limit=None, batch_size=BATCH_SIZE
+):
+    """
+    Stream the transformed master data as lists of dicts, one dict per person.
+
+    Persons are read in person_id order.  Insertion order is not preserved by
+    the connection, so without the order by, separate reads, e.g. by sweep
+    workers, could return different persons for the same limit
+    """
+
+    sql = f"select * from '{in_path}' order by person_id"
+    if limit is not None:
+        sql += f" limit {limit}"
+    reader = con.execute(sql).fetch_record_batch(batch_size)
+    for batch in reader:
+        yield batch.to_pylist()
+
+
+def count_master_records(con, in_path=MASTER_DATA_PATH, limit=None):
+    """The number of master records read_master_record_batches will yield"""
+    (num_records,) = con.execute(f"select count(*) from '{in_path}'").fetchone()
+    return num_records if limit is None else min(num_records, limit)
+
+
+def generate_plan_records(plan, prepared_master_records, config, id_offset=0):
+    """
+    Yield the output record of each row of plan, a duplicates plan (see
+    corrupt.duplicate_counts.plan_duplicates) with a column per error vector
+    entry, in which person_index indexes prepared_master_records, a list of
+    (formatted_master_record, uncorrupted_values).
+
+    The corrupted records are generated together, so that the records with the
+    same error vector value in a column are corrupted in one batch.  id_offset is
+    added to the duplicate index in each record's id
+    """
+    import numpy as np
+
+    from corrupt.corruption_functions import (
+        generate_uncorrupted_output_record,
+        record_id,
+    )
+    from corrupt.error_vector import apply_error_vector_table
+
+    person_indices = plan["person_index"].to_numpy()
+    duplicate_indices = plan["duplicate_index"].to_numpy()
+
+    corrupted = np.flatnonzero(duplicate_indices > 0)
+    corrupted_prepared = [prepared_master_records[i] for i in person_indices[corrupted]]
+    corrupted_records = apply_error_vector_table(
+        {
+            entry["col_name"]: plan[entry["col_name"]].to_numpy()[corrupted]
+            for entry in config
+        },
+        [formatted for formatted, _ in corrupted_prepared],
+        config,
+        uncorrupted_values=[uncorrupted for _, uncorrupted in corrupted_prepared],
+    )
+    corrupted_records = iter(corrupted_records)
+
+    for person_index, duplicate_index in zip(
+        person_indices.tolist(), duplicate_indices.tolist()
+    ):
+        formatted_master_record, uncorrupted_values = prepared_master_records[
+            person_index
+        ]
+        person_id = formatted_master_record["person_id"]
+
+        if duplicate_index == 0:
+            record = generate_uncorrupted_output_record(
+                formatted_master_record, config, uncorrupted_values=uncorrupted_values
+            )
+        else:
+            record = next(corrupted_records)
+            record["uncorrupted_record"] = False
+            record["cluster"] = person_id
+        record["id"] = record_id(person_id, id_offset + duplicate_index)
+        yield record
+
+
+def generate_output_records(master_records, config, plan, error_model=None):
+    """
+    Yield an output record for each row of plan, a slice of the duplicates plan
+    (see corrupt.duplicate_counts.plan_duplicates) covering master_records, in
+    which person_index counts from the first of master_records.  So each master
+    record's uncorrupted record is followed by its corrupted records
+    """
+    from corrupt.corruption_functions import format_master_data
+    from corrupt.error_vector import (
+        generate_error_vector_table,
+        generate_uncorrupted_values_batch,
+    )
+
+    # Formats the input data into an easy format for producing
+    # an uncorrupted/corrupted outputs records.  The uncorrupted values are
+    # computed once and shared by the uncorrupted record and all duplicates
+    formatted_master_records = [
+        format_master_data(master_input_record, config)
+        for master_input_record in master_records
+    ]
+    uncorrupted_values = generate_uncorrupted_values_batch(
+        formatted_master_records, config
+    )
+    prepared_master_records = list(zip(formatted_master_records, uncorrupted_values))
+
+    # Decide what types of corruptions to introduce
+    error_vector_table = generate_error_vector_table(
+        config, plan["duplicate_index"], error_model=error_model
+    )
+    plan = plan.assign(**error_vector_table)
+
+    yield from generate_plan_records(plan, prepared_master_records, config)
+
+
+def corrupt_master_record_batches(
+    master_record_batches, config, duplicate_counts, error_model=None
+):
+    """
+    For each batch of master records, yield a list of the output records
+    generated from them, using the Python corruption functions in config.
+
+    duplicate_counts holds the number of corrupted records of every person, in
+    the order the batches are read, so the duplicates plan is built once for all
+    persons and each batch takes its slice of it
+    """
+    from corrupt.duplicate_counts import plan_duplicates, plan_offsets
+
+    plan = plan_duplicates(duplicate_counts)
+    offsets = plan_offsets(duplicate_counts)
+
+    first_person = 0
+    for master_records in master_record_batches:
+        end_person = first_person + len(master_records)
+        batch_plan = plan.iloc[offsets[first_person] : offsets[end_person]].copy()
+        batch_plan["person_index"] -= first_person
+        yield list(
+            generate_output_records(
+                master_records, config, batch_plan, error_model=error_model
+            )
+        )
+        first_person = end_person
+
+
+def _output_records_to_arrow(df):
+    """Decode dictionary encoded columns, and convert to an arrow table"""
+    import pyarrow as pa
+
+    from corrupt.dictionary_encoding import get_vocabulary, decode_code_lists
+
+    # Occupation and country of citizenship are dictionary encoded until this point
+    df["occupation"] = decode_code_lists(
+        df["occupation"], get_vocabulary("occupationLabel")
+    )
+    df["country_citizenship"] = decode_code_lists(
+        df["country_citizenship"], get_vocabulary("country_citizenLabel")
+    )
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def corrupt_records(
+    backend="python",
+    limit=None,
+    max_corrupted_records=None,
+    in_path=MASTER_DATA_PATH,
+    out_path=CORRUPTED_RECORDS,
+    splink_outputs=True,
+    records_with_keys_path=CORRUPTED_RECORDS_WITH_BLOCKING_KEYS,
+    tf_dir=CORRUPTED_TERM_FREQUENCIES,
+):
+    """
+    Corrupt the master data using the settings in corrupt/config.py, and write
+    the output to out_path in batches.  Returns out_path.
+
+    If splink_outputs, also write the records with blocking key columns, and
+    term frequency tables (see linkage_benchmark/splink_outputs.py)
+
+    backend "python" applies the corruption functions, using their batch versions
+    in corrupt/batch_functions.py where they have one.  "duckdb" compiles the
+    config into SQL expressions, falling back to Python only for the corruption
+    functions that have no SQL form
+    """
+    import pandas as pd
+
+    from corrupt.config import (
+        CONFIG,
+        MAX_CORRUPTED_RECORDS,
+        get_duplicate_count_dist,
+        get_error_model,
+    )
+    from corrupt.corruption_functions import RECORD_ID_STRIDE
+    from corrupt.record_writer import ParquetBatchWriter
+    from duckdb_fns.connection import get_connection, log_peak_memory
+
+    if max_corrupted_records is None:
+        max_corrupted_records = MAX_CORRUPTED_RECORDS
+    if max_corrupted_records >= RECORD_ID_STRIDE:
+        raise ValueError(
+            f"max_corrupted_records must be less than {RECORD_ID_STRIDE}, "
+            "so that every record has a unique id"
+        )
+
+    config = CONFIG
+    duplicate_count_dist = get_duplicate_count_dist(max_corrupted_records)
+    error_model = get_error_model(config, max_corrupted_records)
+
+    con = get_connection()
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    if backend == "duckdb":
+        from corrupt.sql_pushdown import corrupt_records_sql_pushdown
+
+        master_table = f"'{in_path}'"
+        if limit is not None:
+            master_table = (
+                f"(select * from '{in_path}' order by person_id limit {limit})"
+            )
+
+        df = corrupt_records_sql_pushdown(
+            con,
+            master_table,
+            config,
+            duplicate_count_dist,
+            error_model=error_model,
+        )
+        output_batches = [df]
+    else:
+        from corrupt.duplicate_counts import sample_duplicate_counts
+
+        duplicate_counts = sample_duplicate_counts(
+            count_master_records(con, in_path, limit), duplicate_count_dist
+        )
+        master_record_batches = read_master_record_batches(con, in_path, limit)
+        output_batches = (
+            pd.DataFrame(output_records)
+            for output_records in corrupt_master_record_batches(
+                master_record_batches,
+                config,
+                duplicate_counts,
+                error_model=error_model,
+            )
+        )
+
+    with ParquetBatchWriter(out_path) as writer:
+        for df in output_batches:
+            writer.write_table(_output_records_to_arrow(df))
+            logger.info(f"Written {writer.num_rows:,.0f} output records")
+
+    if splink_outputs:
+        from linkage_benchmark.splink_outputs import write_splink_outputs
+
+        write_splink_outputs(con, out_path, records_with_keys_path, tf_dir)
+
+    log_peak_memory(con, "corrupt_records")
+
+    return out_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m corrupt",
+        description="Generate corrupted duplicate records from the master data",
+    )
+    parser.add_argument("--backend", choices=["python", "duckdb"], default="python")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only corrupt the first LIMIT master records",
+    )
+    parser.add_argument(
+        "--max-corrupted-records",
+        type=int,
+        default=None,
+        help="Maximum number of corrupted records per person",
+    )
+    parser.add_argument("--in-path", default=MASTER_DATA_PATH)
+    parser.add_argument(
+        "--out-path",
+        default=None,
+        help=f"Defaults to {CORRUPTED_RECORDS}, or with --multi-source, the "
+        f"directory {CORRUPTED_RECORDS_MULTI_SOURCE}",
+    )
+    parser.add_argument(
+        "--multi-source",
+        action="store_true",
+        help="Generate a dataset for each source in SOURCES in corrupt/config.py",
+    )
+    parser.add_argument(
+        "--no-splink-outputs",
+        action="store_true",
+        help="Do not write blocking key columns and term frequency tables",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("corrupt").setLevel(logging.INFO)
+    logging.getLogger("duckdb_fns").setLevel(logging.INFO)
+    logging.getLogger("linkage_benchmark").setLevel(logging.INFO)
+
+    if args.multi_source:
+        from corrupt.multi_source import corrupt_records_multi_source
+
+        if args.backend != "python":
+            parser.error("--multi-source only supports the python backend")
+        corrupt_records_multi_source(
+            limit=args.limit,
+            in_path=args.in_path,
+            out_dir=args.out_path or CORRUPTED_RECORDS_MULTI_SOURCE,
+        )
+        return
+
+    corrupt_records(
+        backend=args.backend,
+        limit=args.limit,
+        max_corrupted_records=args.max_corrupted_records,
+        in_path=args.in_path,
+        out_path=args.out_path or CORRUPTED_RECORDS,
+        splink_outputs=not args.no_splink_outputs,
+    )
@@ -0,0 +1,279 @@
+import argparse
+import io
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from corrupt.corruption_functions import RECORD_ID_STRIDE
+
+# A local HTTP service that generates corrupted records on demand, e.g. a few
+# thousand clustered records with a fixed seed for a unit test, without running
+# the batch scripts.
+#
+# The master data is read, formatted, and its uncorrupted values computed, once
+# at startup, and the name lookups and place index loaded, so a request only
+# samples persons and applies the corruption functions in CONFIG:
+#
+# python -m corrupt.service --limit 100000
+# curl 'http://127.0.0.1:8765/records?n=1000&seed=42&format=parquet' -o records.parquet
+#
+# GET /records takes the parameters:
+#
+# n: the number of records (default 1000)
+# seed: the random seed, so the same request returns the same records
+# format: arrow (an Arrow IPC stream, the default) or parquet
+# max_corrupted_records: default MAX_CORRUPTED_RECORDS in corrupt/config.py
+#
+# Each sampled person's uncorrupted record is followed by their corrupted
+# records, so the records are grouped into clusters, although the last cluster
+# may be cut short to return exactly n records.  A request for more records
+# than the loaded master records can generate returns a 400.  GET /health returns the number
+# of master records loaded
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_NUM_RECORDS = 1000
+
+# Largest n a request can ask for
+MAX_NUM_RECORDS = 1_000_000
+
+CONTENT_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class RecordService:
+    """
+    Generates corrupted records from master records that are prepared once.
+
+    The corruption functions use the global random state, so requests are
+    generated one at a time, which makes the output for a seed reproducible
+    """
+
+    def __init__(self, in_path=None, limit=None):
+        from corrupt.config import CONFIG
+        from corrupt.multi_source import prepare_master_records, warm_lookups
+        from corrupt.run import MASTER_DATA_PATH, read_master_record_batches
+        from duckdb_fns.connection import get_connection
+
+        con = get_connection()
+        master_records = [
+            record
+            for batch in read_master_record_batches(
+                con, in_path or MASTER_DATA_PATH, limit
+            )
+            for record in batch
+        ]
+        if not master_records:
+            raise ValueError("No master records to generate records from")
+
+        warm_lookups()
+        self.config = CONFIG
+        self.prepared = prepare_master_records(master_records, CONFIG)
+        self.sources = {}
+        self.lock = threading.Lock()
+
+    def _source(self, max_corrupted_records):
+        """The resolved source for max_corrupted_records, compiled once"""
+        from corrupt.multi_source import resolve_sources
+
+        if max_corrupted_records not in self.sources:
+            source = {
+                "source_dataset": "service",
+                "config": self.config,
+                "include_uncorrupted_record": True,
+            }
+            if max_corrupted_records is not None:
+                source["max_corrupted_records"] = max_corrupted_records
+            [self.sources[max_corrupted_records]] = resolve_sources([source])
+        return self.sources[max_corrupted_records]
+
+    def generate(self, num_records, seed=None, max_corrupted_records=None):
+        """
+        num_records corrupted records, as an arrow table.  Raises ValueError if
+        there are too few master records loaded to generate num_records records
+        """
+        import numpy as np
+        import pandas as pd
+
+        from corrupt.multi_source import generate_source_records
+        from corrupt.run import _output_records_to_arrow
+
+        with self.lock:
+            source = self._source(max_corrupted_records)
+
+            np.random.seed(seed)
+            random.seed(seed)
+
+            # Every person has at least one record, so num_records persons
+            # are always enough.  Records are generated lazily, so only the
+            # persons needed are corrupted
+            num_persons = min(num_records, len(self.prepared))
+            person_indices = np.random.choice(
+                len(self.prepared), size=num_persons, replace=False
+            )
+            persons = [self.prepared[i] for i in person_indices]
+            records = list(
+                itertools.islice(generate_source_records(persons, source), num_records)
+            )
+
+        if len(records) < num_records:
+            raise ValueError(
+                f"Only {len(records):,.0f} records could be generated from the "
+                f"{len(self.prepared):,.0f} master records loaded"
+            )
+        return _output_records_to_arrow(pd.DataFrame(records))
+
+
+def serialise_table(table, output_format):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if output_format == "parquet":
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def parse_records_request(query):
+    """The arguments to RecordService.generate, and the format, of a query string"""
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+
+    num_records = int(params.get("n", DEFAULT_NUM_RECORDS))
+    if not 0 < num_records <= MAX_NUM_RECORDS:
+        raise ValueError(f"n must be between 1 and {MAX_NUM_RECORDS:,.0f}")
+
+    seed = int(params["seed"]) if "seed" in params else None
+
+    max_corrupted_records = params.get("max_corrupted_records")
+    if max_corrupted_records is not None:
+        max_corrupted_records = int(max_corrupted_records)
+        if not 0 < max_corrupted_records < RECORD_ID_STRIDE:
+            raise ValueError(
+                f"max_corrupted_records must be between 1 and {RECORD_ID_STRIDE - 1}"
+            )
+
+    output_format = params.get("format", "arrow")
+    if output_format not in CONTENT_TYPES:
+        raise ValueError(f"format must be one of {list(CONTENT_TYPES)}")
+
+    return num_records, seed, max_corrupted_records, output_format
+
+
+class RecordRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which on a kept-alive
+    # connection would otherwise wait on the client's delayed ack
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def respond(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond_json(self, status, obj):
+        self.respond(status, json.dumps(obj).encode(), "application/json")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self.server.service
+
+        if url.path == "/health":
+            self.respond_json(200, {"num_master_records": len(service.prepared)})
+            return
+        if url.path != "/records":
+            self.respond_json(404, {"error": f"Unknown path {url.path}"})
+            return
+
+        try:
+            (
+                num_records,
+                seed,
+                max_corrupted_records,
+                output_format,
+            ) = parse_records_request(url.query)
+        except ValueError as e:
+            self.respond_json(400, {"error": str(e)})
+            return
+
+        start = time.perf_counter()
+        try:
+            table = service.generate(num_records, seed, max_corrupted_records)
+            body = serialise_table(table, output_format)
+        except ValueError as e:
+            self.respond_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            logger.exception(f"Failed to generate records for {self.path}")
+            self.respond_json(500, {"error": str(e)})
+            return
+        logger.info(
+            f"Generated {table.num_rows:,.0f} records as {output_format} in "
+            f"{(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        self.respond(200, body, CONTENT_TYPES[output_format])
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    server = ThreadingHTTPServer((host, port), RecordRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m corrupt.service",
+        description="Serve corrupted records on demand over HTTP",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--in-path", default=None)
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only load the first LIMIT master records",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("corrupt").setLevel(logging.INFO)
+
+    start = time.perf_counter()
+    service = RecordService(in_path=args.in_path, limit=args.limit)
+    logger.info(
+        f"Loaded {len(service.prepared):,.0f} master records in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+    server = make_server(service, args.host, args.port)
+    logger.info(f"Serving records at http://{args.host}:{args.port}/records")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+from functools import partial
+
+import pandas as pd
+
+from corrupt.batch_functions import apply_fn_to_records
+from corrupt.corruption_functions import (
+    RECORD_ID_STRIDE,
+    _basic_null_fn_to_partial,
+    format_master_data,
+)
+from corrupt.corrupt_occupation import (
+    occupation_gen_uncorrupted_record,
+    occupation_corrupt,
+)
+from corrupt.corrupt_country_citizenship import (
+    country_citizenship_gen_uncorrupted_record,
+    country_citizenship_corrupt,
+)
+from corrupt.corrupt_name import (
+    full_name_gen_uncorrupted_record,
+    full_name_alternative,
+    full_name_null,
+    FULL_NAME_NULL_KEEP_PROB,
+)
+from corrupt.corrupt_date import date_gen_uncorrupted_record, date_corrupt_timedelta
+from corrupt.corrupt_lat_lng import lat_lng_uncorrupted_record
+from corrupt.duplicate_counts import sample_duplicate_counts, plan_duplicates
+from corrupt.error_vector import (
+    fns_by_error_vector_value,
+    generate_error_vector_table,
+)
+
+# The SQL expressions below operate on the raw (unformatted) master data, in which
+# every column is a list.  Each returns a tuple of
+# (output column name, DuckDB SQL expression) that has the same effect as the
+# Python function it replaces
+
+
+def _sql_random_list_element(list_col):
+    return f"{list_col}[cast(floor(random() * len({list_col})) as integer) + 1]"
+
+
+def _sql_code_list_uncorrupted(list_col):
+    return f"case when len({list_col}) = 0 then NULL else {list_col} end"
+
+
+def _sql_code_list_corrupt(list_col):
+    return f"""
+    case
+        when len({list_col}) = 0 then NULL
+        else [{_sql_random_list_element(list_col)}]
+    end
+    """
+
+
+# occupationLabel and country_citizenLabel are dictionary encoded lists of codes.
+# As in the Python functions, the output is a list of codes, which is decoded
+# when the output is written
+
+
+def _sql_occupation_uncorrupted():
+    return ("occupation", _sql_code_list_uncorrupted("occupationLabel"))
+
+
+def _sql_occupation_corrupt():
+    return ("occupation", _sql_code_list_corrupt("occupationLabel"))
+
+
+def _sql_country_citizenship_uncorrupted():
+    return (
+        "country_citizenship",
+        _sql_code_list_uncorrupted("country_citizenLabel"),
+    )
+
+
+def _sql_country_citizenship_corrupt():
+    return ("country_citizenship", _sql_code_list_corrupt("country_citizenLabel"))
+
+
+def _sql_basic_null(col_name):
+    return (col_name, "NULL")
+
+
+def _sql_full_name_uncorrupted():
+    return ("full_name", "humanLabel[1]")
+
+
+def _sql_full_name_alternative():
+    sql = f"""
+    case
+        when len(full_name_arr) = 1 then full_name_arr[1]
+        else lower({_sql_random_list_element("full_name_arr")})
+    end
+    """
+    return ("full_name", sql)
+
+
+def _sql_full_name_null():
+    # Keep each token with the probability for its role
+    keep_prob = [
+        f"when '{role}' then {p}" for role, p in FULL_NAME_NULL_KEEP_PROB.items()
+    ]
+    keep_prob = " ".join(keep_prob)
+    sql = f"""
+    list_aggr(
+        list_transform(
+            list_filter(
+                range(1, len(full_name_tokens) + 1),
+                i -> random() < case full_name_token_roles[i] {keep_prob} end
+            ),
+            i -> full_name_tokens[i]
+        ),
+        'string_agg',
+        ' '
+    )
+    """
+    return ("full_name", sql)
+
+
+def _sql_date_uncorrupted(input_colname, output_colname):
+    return (output_colname, f"cast({input_colname}[1] as varchar)")
+
+
+def _sql_date_corrupt_timedelta(input_colname, output_colname):
+    # Probabilities 0.7, 0.2, 0.1 for small, medium and large, expressed
+    # as conditional probabilities so each branch can use its own random()
+    sql = f"""
+    cast(
+        {input_colname}[1] +
+        case
+            when random() < 0.7 then cast(floor(random() * 11) as integer) - 5
+            when random() < 2.0 / 3 then cast(floor(random() * 123) as integer) - 61
+            else 1000
+        end
+    as varchar)
+    """
+    return (output_colname, sql)
+
+
+def _sql_lat_lng_uncorrupted(input_colname, output_colname):
+    return (output_colname, f"{input_colname}[1]")
+
+
+SQL_EXPRESSIONS = {
+    occupation_gen_uncorrupted_record: _sql_occupation_uncorrupted,
+    occupation_corrupt: _sql_occupation_corrupt,
+    country_citizenship_gen_uncorrupted_record: _sql_country_citizenship_uncorrupted,
+    country_citizenship_corrupt: _sql_country_citizenship_corrupt,
+    _basic_null_fn_to_partial: _sql_basic_null,
+    full_name_gen_uncorrupted_record: _sql_full_name_uncorrupted,
+    full_name_alternative: _sql_full_name_alternative,
+    full_name_null: _sql_full_name_null,
+    date_gen_uncorrupted_record: _sql_date_uncorrupted,
+    date_corrupt_timedelta: _sql_date_corrupt_timedelta,
+    lat_lng_uncorrupted_record: _sql_lat_lng_uncorrupted,
+}
+
+
+def compile_fn_to_sql(fn):
+    """
+    Look up the SQL form of a corruption function, including functions
+    wrapped in functools.partial.
+
+    Returns (output column name, SQL expression) or None if the function
+    has no SQL form
+    """
+    kwargs = {}
+    if isinstance(fn, partial):
+        kwargs = fn.keywords
+        fn = fn.func
+
+    if fn not in SQL_EXPRESSIONS:
+        return None
+    return SQL_EXPRESSIONS[fn](**kwargs)
+
+
+def compile_config_entry(entry, error_vector_col):
+    """
+    Compile a config entry into a SQL case expression, switching on the
+    error vector value in error_vector_col.
+
+    Returns (output column name, SQL expression, python_fns), where python_fns is
+    a dict of {error vector value: fn} for the functions with no SQL form.
+    Rows with these values are NULL in the SQL output and must be filled in
+    using Python
+    """
+    output_col_name = None
+    whens = []
+    python_fns = {}
+
+    for value, fn in fns_by_error_vector_value(entry).items():
+        compiled = compile_fn_to_sql(fn)
+        if compiled is None:
+            python_fns[value] = fn
+            continue
+        output_col_name, sql = compiled
+        whens.append(f"when {value} then {sql}")
+
+    if whens:
+        whens = "\n".join(whens)
+        sql = f"case {error_vector_col} {whens} end"
+    else:
+        sql = "NULL"
+
+    return output_col_name, sql, python_fns
+
+
+def corrupt_records_sql_pushdown(
+    con, master_table, config, duplicate_count_dist, error_model=None
+):
+    """
+    Generate uncorrupted and corrupted records inside DuckDB
+
+    The duplicates plan and error vectors are generated in numpy and registered
+    with DuckDB as an exploded error vector table with one row per output record.
+    Each config entry is compiled to a SQL case expression over that table
+    joined to the master data.  Corruption functions with no SQL form are then
+    applied in Python, only for the rows that need them.
+
+    master_table can be a table name or any table expression DuckDB can select
+    from e.g. "'path/to/file.parquet'"
+    """
+
+    sql = f"""
+    select row_number() over (order by person_id) - 1 as person_index, *
+    from {master_table}
+    """
+    master_indexed = con.execute(sql).fetch_arrow_table()
+    con.register("__master_indexed", master_indexed)
+
+    duplicate_counts = sample_duplicate_counts(
+        master_indexed.num_rows, duplicate_count_dist
+    )
+    plan = plan_duplicates(duplicate_counts)
+    error_vector_table = generate_error_vector_table(
+        config, plan["duplicate_index"], error_model=error_model
+    )
+
+    select_exprs = []
+    python_work = []
+    for i, entry in enumerate(config):
+        error_vector_col = f"__ev_{i}"
+        plan[error_vector_col] = error_vector_table[entry["col_name"]]
+
+        output_col_name, sql, python_fns = compile_config_entry(entry, error_vector_col)
+        if output_col_name is not None:
+            select_exprs.append(f'{sql} as "{output_col_name}"')
+        if python_fns:
+            python_work.append((error_vector_col, output_col_name, python_fns))
+
+    con.register("__error_vectors", plan)
+
+    select_exprs = ", \n".join(select_exprs)
+    sql = f"""
+    select
+        ev.*,
+        m.person_id as cluster,
+        m.person_id * {RECORD_ID_STRIDE} + ev.duplicate_index as id,
+        ev.duplicate_index = 0 as uncorrupted_record,
+        {select_exprs}
+    from __error_vectors as ev
+    inner join __master_indexed as m
+    on ev.person_index = m.person_index
+    order by ev.person_index, ev.duplicate_index
+    """
+    df = con.execute(sql).df()
+
+    if python_work:
+        df = _apply_python_fallback(con, df, python_work, config)
+
+    ev_cols = [c for c in df.columns if c.startswith("__ev_")]
+    df = df.drop(columns=ev_cols + ["person_index", "duplicate_index"])
+
+    con.unregister("__error_vectors")
+    con.unregister("__master_indexed")
+
+    return df
+
+
+def _apply_python_fallback(con, df, python_work, config):
+    """Apply corruption functions that have no SQL form, formatting each
+    master record that needs them once"""
+
+    needs_python = pd.Series(False, index=df.index)
+    for error_vector_col, _, python_fns in python_work:
+        needs_python |= df[error_vector_col].isin(list(python_fns.keys()))
+
+    person_indices = df.loc[needs_python, "person_index"].unique().tolist()
+
+    sql = """
+    select *
+    from __master_indexed
+    where person_index in (select unnest(?))
+    """
+    master_records = con.execute(sql, [person_indices]).fetch_arrow_table()
+    master_records = master_records.to_pylist()
+    formatted = {
+        r["person_index"]: format_master_data(r, config) for r in master_records
+    }
+
+    # The rows with each error vector value are corrupted together, so functions
+    # with a batch version are called once per value
+    for error_vector_col, output_col_name, python_fns in python_work:
+        for value, fn in python_fns.items():
+            rows = df.index[df[error_vector_col] == value]
+            if len(rows) == 0:
+                continue
+            outputs = apply_fn_to_records(
+                fn,
+                [formatted[i] for i in df.loc[rows, "person_index"]],
+                [{} for _ in rows],
+            )
+            for k in outputs[0]:
+                if k not in df.columns:
+                    df[k] = None
+                df[k] = df[k].astype(object)
+                df.loc[rows, k] = pd.Series(
+                    [output[k] for output in outputs], index=rows, dtype=object
+                )
+    return df
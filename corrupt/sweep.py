@@ -0,0 +1,330 @@
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import re
+
+from path_fns.filepaths import CORRUPTED_SWEEPS
+
+# Parameter sweeps: generate many corrupted datasets that differ only in their
+# corruption settings, e.g. to study how linkage accuracy changes with error
+# rates.
+#
+# Every variant's error model and duplicate count distribution is compiled
+# once, and the name lookups and place index loaded once, in the parent.  The
+# variants then run in parallel in forked worker processes, which share all of
+# this with the parent rather than each recomputing it.  The variants are split
+# into a group per worker, and each worker streams the master records in
+# batches, formatting each batch and computing its uncorrupted values once for
+# every variant in its group.
+#
+# A grid is of the form {param: [values]}, and there is a variant for every
+# combination of values.  The params are:
+#
+# max_corrupted_records
+# <col_name>.<key>: a setting of a column in CONFIG e.g. dob.start_prob_null, or
+#   <col_name>.p for the weights of its corruption functions
+# *.<key>: a setting applied to every column e.g. *.end_prob_corrupt
+#
+# Each run of a sweep is written to a new version directory,
+# CORRUPTED_SWEEPS/<sweep_name>/v<n>/, which holds sweep.json with the grid, and
+# a directory per variant holding its records.parquet and params.json
+#
+# python -m corrupt.sweep --grid grid.json --limit 10000
+
+logger = logging.getLogger(__name__)
+
+# Set in the parent before the worker processes are forked, so that workers
+# share it rather than it being pickled for each variant
+_SWEEP_STATE = {}
+
+
+def expand_grid(grid):
+    """A dict of params for every combination of the values in grid"""
+    params = list(grid)
+    return [
+        dict(zip(params, values))
+        for values in itertools.product(*(grid[param] for param in params))
+    ]
+
+
+def variant_settings(params, config):
+    """
+    The config overrides and max_corrupted_records (None if not set) of a
+    variant's params
+    """
+    col_names = [entry["col_name"] for entry in config]
+    overrides = {}
+    max_corrupted_records = None
+    for param, value in params.items():
+        if param == "max_corrupted_records":
+            max_corrupted_records = value
+            continue
+        if "." not in param:
+            raise ValueError(f"Unknown sweep parameter {param}")
+        col_name, key = param.split(".", 1)
+        for col in col_names if col_name == "*" else [col_name]:
+            overrides.setdefault(col, {})[key] = value
+    return overrides, max_corrupted_records
+
+
+def next_version_dir(sweep_dir):
+    """A new directory sweep_dir/v<n>, with n one more than the latest version"""
+    versions = [
+        int(m.group(1))
+        for name in (os.listdir(sweep_dir) if os.path.exists(sweep_dir) else [])
+        if (m := re.fullmatch(r"v(\d+)", name))
+    ]
+    version_dir = os.path.join(sweep_dir, f"v{max(versions, default=0) + 1:03}")
+    os.makedirs(version_dir)
+    return version_dir
+
+
+def variant_groups(num_variants, num_workers):
+    """Split the variants into a group for each worker, in turn"""
+    num_groups = min(num_workers, num_variants)
+    return [list(range(g, num_variants, num_groups)) for g in range(num_groups)]
+
+
+def run_variant_group(variant_indices):
+    """
+    Generate and write the records of a group of variants, in a worker process.
+    Returns a list of (variant_index, num_records)
+    """
+    import numpy as np
+    import pandas as pd
+
+    from corrupt.multi_source import (
+        generate_source_records,
+        prepare_master_records,
+        sample_source_population,
+    )
+    from corrupt.record_writer import ParquetBatchWriter
+    from corrupt.run import (
+        BATCH_SIZE,
+        count_master_records,
+        read_master_record_batches,
+        _output_records_to_arrow,
+    )
+    from duckdb_fns.connection import get_connection
+
+    in_path, limit = _SWEEP_STATE["in_path"], _SWEEP_STATE["limit"]
+    variants = [_SWEEP_STATE["variants"][i] for i in variant_indices]
+
+    # The pool is started before the parent connects to DuckDB, so this is a new
+    # connection of the worker's own
+    con = get_connection()
+    num_persons = count_master_records(con, in_path, limit)
+
+    # Each variant keeps its own random state, so that its records only depend on
+    # its seed, and not on the other variants in its group
+    populations, random_states = [], []
+    for variant in variants:
+        np.random.seed(variant["seed"])
+        random.seed(variant["seed"])
+        populations.append(sample_source_population(num_persons, variant))
+        random_states.append((np.random.get_state(), random.getstate()))
+
+    writers = [
+        ParquetBatchWriter(os.path.join(variant["out_dir"], "records.parquet"))
+        for variant in variants
+    ]
+    try:
+        first_person = 0
+        for master_records in read_master_record_batches(con, in_path, limit):
+            end_person = first_person + len(master_records)
+            prepared = prepare_master_records(master_records, _SWEEP_STATE["config"])
+
+            for i, variant in enumerate(variants):
+                np.random.set_state(random_states[i][0])
+                random.setstate(random_states[i][1])
+
+                population = [arr[first_person:end_person] for arr in populations[i]]
+                records = generate_source_records(prepared, variant, population)
+                while batch := list(itertools.islice(records, BATCH_SIZE)):
+                    table = _output_records_to_arrow(pd.DataFrame(batch))
+                    writers[i].write_table(table)
+
+                random_states[i] = (np.random.get_state(), random.getstate())
+            first_person = end_person
+    finally:
+        for writer in writers:
+            writer.close()
+
+    return [
+        (variant_index, writer.num_rows)
+        for variant_index, writer in zip(variant_indices, writers)
+    ]
+
+
+def run_sweep(
+    grid,
+    sweep_name="sweep",
+    limit=None,
+    in_path=None,
+    out_dir=CORRUPTED_SWEEPS,
+    num_workers=None,
+    seed=0,
+    splink_outputs=True,
+):
+    """
+    Generate a corrupted dataset for every combination of params in grid, see
+    the top of this module.  Returns the version directory written to
+    """
+    from corrupt.config import CONFIG, config_with_overrides
+    from corrupt.multi_source import resolve_sources, warm_lookups
+    from corrupt.run import MASTER_DATA_PATH, count_master_records
+    from duckdb_fns.connection import get_connection
+    from linkage_benchmark.splink_outputs import write_splink_outputs
+
+    if in_path is None:
+        in_path = MASTER_DATA_PATH
+
+    version_dir = next_version_dir(os.path.join(out_dir, sweep_name))
+
+    variants = []
+    for variant_index, params in enumerate(expand_grid(grid)):
+        overrides, max_corrupted_records = variant_settings(params, CONFIG)
+        source = {
+            "source_dataset": f"variant_{variant_index:03}",
+            "config": config_with_overrides(CONFIG, overrides),
+            "include_uncorrupted_record": True,
+        }
+        if max_corrupted_records is not None:
+            source["max_corrupted_records"] = max_corrupted_records
+        # Every variant is a dataset of its own, so ids start at 0 in each
+        [variant] = resolve_sources([source])
+        variant["params"] = params
+        variant["seed"] = seed + variant_index
+        variant["out_dir"] = os.path.join(version_dir, variant["source_dataset"])
+        variants.append(variant)
+
+    warm_lookups()
+
+    sweep = {
+        "grid": grid,
+        "in_path": in_path,
+        "limit": limit,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "variants": [],
+    }
+    for variant in variants:
+        os.makedirs(variant["out_dir"])
+        variant_params = {
+            "params": variant["params"],
+            "max_corrupted_records": variant["max_corrupted_records"],
+            "seed": variant["seed"],
+        }
+        with open(os.path.join(variant["out_dir"], "params.json"), "w") as f:
+            json.dump(variant_params, f, indent=1)
+        sweep["variants"].append({"name": variant["source_dataset"], **variant_params})
+
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    groups = variant_groups(len(variants), num_workers)
+
+    _SWEEP_STATE.update(in_path=in_path, limit=limit, config=CONFIG, variants=variants)
+    try:
+        # The workers are forked before the parent connects to DuckDB, as a
+        # process forked from one with a live DuckDB connection can deadlock
+        context = multiprocessing.get_context("fork")
+        with context.Pool(len(groups)) as pool:
+            con = get_connection()
+            sweep["num_master_records"] = count_master_records(con, in_path, limit)
+            for group_results in pool.imap_unordered(run_variant_group, groups):
+                for variant_index, num_rows in group_results:
+                    variant = variants[variant_index]
+                    sweep["variants"][variant_index]["num_records"] = num_rows
+                    logger.info(
+                        f"Written {num_rows:,.0f} records for "
+                        f"{variant['source_dataset']}: {variant['params']}"
+                    )
+
+                    # DuckDB is multithreaded, so these are written by the parent
+                    # while the workers carry on with the other groups
+                    if splink_outputs:
+                        write_splink_outputs(
+                            con,
+                            os.path.join(variant["out_dir"], "records.parquet"),
+                            os.path.join(
+                                variant["out_dir"],
+                                "records_with_blocking_keys.parquet",
+                            ),
+                            os.path.join(variant["out_dir"], "term_frequencies"),
+                        )
+    finally:
+        _SWEEP_STATE.clear()
+
+    # Written last, so a version without sweep.json is incomplete
+    with open(os.path.join(version_dir, "sweep.json"), "w") as f:
+        json.dump(sweep, f, indent=1)
+
+    return version_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m corrupt.sweep",
+        description="Generate a corrupted dataset for every combination of "
+        "params in a grid of corruption settings",
+    )
+    parser.add_argument(
+        "--grid",
+        default=None,
+        help="JSON file of the grid, {param: [values]}.  Defaults to SWEEP_GRID "
+        "in corrupt/config.py",
+    )
+    parser.add_argument("--name", default="sweep")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only corrupt the first LIMIT master records",
+    )
+    parser.add_argument("--in-path", default=None)
+    parser.add_argument("--out-dir", default=CORRUPTED_SWEEPS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Variant i is generated with seed SEED + i",
+    )
+    parser.add_argument(
+        "--no-splink-outputs",
+        action="store_true",
+        help="Do not write blocking key columns and term frequency tables",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("corrupt").setLevel(logging.INFO)
+    logging.getLogger("linkage_benchmark").setLevel(logging.INFO)
+
+    if args.grid is None:
+        from corrupt.config import SWEEP_GRID
+
+        grid = SWEEP_GRID
+    else:
+        with open(args.grid) as f:
+            grid = json.load(f)
+
+    version_dir = run_sweep(
+        grid,
+        sweep_name=args.name,
+        limit=args.limit,
+        in_path=args.in_path,
+        out_dir=args.out_dir,
+        num_workers=args.workers,
+        seed=args.seed,
+        splink_outputs=not args.no_splink_outputs,
+    )
+    logger.info(f"Written sweep to {version_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import functools
+import json
+import logging
+import os
+
+import duckdb
+
+from path_fns.filepaths import OUT_BASE
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# DuckDB settings applied to every connection.  Each can be overridden by a JSON
+# config file (path given in the SPLINK_SYNTH_DUCKDB_CONFIG environment variable)
+# or by an environment variable, which takes precedence over the config file e.g.
+#
+# SPLINK_SYNTH_DUCKDB_THREADS=8 SPLINK_SYNTH_DUCKDB_MEMORY_LIMIT=16GB python 05_...
+
+CONFIG_FILE_ENV_VAR = "SPLINK_SYNTH_DUCKDB_CONFIG"
+
+DEFAULT_SETTINGS = {
+    "threads": None,
+    "memory_limit": None,
+    "temp_directory": os.path.join(OUT_BASE, "duckdb_temp"),
+    "preserve_insertion_order": False,
+}
+
+ENV_VARS = {
+    "threads": "SPLINK_SYNTH_DUCKDB_THREADS",
+    "memory_limit": "SPLINK_SYNTH_DUCKDB_MEMORY_LIMIT",
+    "temp_directory": "SPLINK_SYNTH_DUCKDB_TEMP_DIRECTORY",
+    "preserve_insertion_order": "SPLINK_SYNTH_DUCKDB_PRESERVE_INSERTION_ORDER",
+}
+
+
+def get_duckdb_settings():
+    """
+    The DuckDB settings to use, from the defaults, the config file and
+    environment variables, in increasing order of precedence.
+    Settings with a value of None are left as DuckDB's default
+    """
+    settings = dict(DEFAULT_SETTINGS)
+
+    config_path = os.environ.get(CONFIG_FILE_ENV_VAR)
+    if config_path:
+        with open(config_path) as f:
+            settings.update(json.load(f))
+
+    for setting, env_var in ENV_VARS.items():
+        if env_var in os.environ:
+            settings[setting] = os.environ[env_var]
+
+    return settings
+
+
+def _sql_literal(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if str(value).lower() in ("true", "false"):
+        return str(value).lower()
+    return f"'{value}'"
+
+
+@functools.lru_cache(maxsize=None)
+def get_connection():
+    """
+    Get the DuckDB connection for this process, configured with the
+    threads, memory limit and temp directory from get_duckdb_settings.
+
+    The temp directory allows DuckDB to spill to disk rather than running out
+    of memory.  The same connection is returned on every call
+    """
+    settings = get_duckdb_settings()
+
+    if settings.get("temp_directory"):
+        os.makedirs(settings["temp_directory"], exist_ok=True)
+
+    con = duckdb.connect()
+    for setting, value in settings.items():
+        if value is None:
+            continue
+        con.execute(f"SET {setting} = {_sql_literal(value)}")
+
+    applied = {k: v for k, v in settings.items() if v is not None}
+    logger.info(f"DuckDB connection settings: {applied}")
+    return con
+
+
+# The most memory DuckDB has held at the end of any stage logged in this process
+_max_duckdb_bytes_logged = 0
+
+
+def log_peak_memory(con, stage_name):
+    """
+    Log the peak memory used by this process, and the memory DuckDB is
+    currently holding, at the end of a stage.
+
+    DuckDB only reports the memory it is holding now, not its peak, so the most
+    it has held at the end of any stage logged so far is also logged
+    """
+    global _max_duckdb_bytes_logged
+
+    message = f"{stage_name}:"
+
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux
+        peak_rss_gb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024**2
+        message += f" peak process memory {peak_rss_gb:,.2f} GB."
+
+    try:
+        sql = "select sum(memory_usage_bytes) from duckdb_memory()"
+        duckdb_bytes = con.execute(sql).fetchone()[0] or 0
+        _max_duckdb_bytes_logged = max(_max_duckdb_bytes_logged, duckdb_bytes)
+        message += (
+            f" DuckDB memory currently in use {duckdb_bytes / 1024**3:,.2f} GB, "
+            f"at most {_max_duckdb_bytes_logged / 1024**3:,.2f} GB at the end of "
+            "any stage so far."
+        )
+    except duckdb.Error:
+        # duckdb_memory() is not available in older versions of DuckDB
+        pass
+
+    logger.info(message)
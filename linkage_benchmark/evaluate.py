@@ -0,0 +1,218 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _total_true_pairs(con, records_table):
+    """Number of pairs of records that truly match i.e. sum of n(n-1)/2 over clusters"""
+    sql = f"""
+    select coalesce(sum(n * (n - 1) / 2), 0)
+    from (
+        select count(*) as n
+        from {records_table}
+        group by cluster
+    )
+    """
+    return int(con.execute(sql).fetchone()[0])
+
+
+def threshold_sweep(con, predictions_table, records_table, score_decimal_places=None):
+    """
+    Precision, recall and F1 at every threshold, in one sort of the predictions
+
+    predictions_table has columns id_l, id_r and score.  records_table has the
+    columns id and cluster, as output by 07_corrupt_records.py.  Both can be
+    any table expression DuckDB can select from, e.g. a quoted parquet path.
+
+    Predictions are grouped by score, and cumulative counts of true and false
+    positives are computed from the highest score downwards, so each output row
+    gives the counts that would result from accepting all pairs with
+    score >= threshold.  Recall is relative to all truly matching pairs in
+    records_table, including those the linker did not score.
+
+    If score_decimal_places is set, scores are rounded before grouping, which
+    limits the number of thresholds in the output.
+    """
+
+    total_true_pairs = _total_true_pairs(con, records_table)
+
+    if score_decimal_places is None:
+        score_expr = "p.score"
+    else:
+        score_expr = f"round(p.score, {score_decimal_places})"
+
+    sql = f"""
+    with labelled as (
+        select
+            {score_expr} as score,
+            l.cluster = r.cluster as is_match
+        from {predictions_table} as p
+        inner join {records_table} as l
+        on p.id_l = l.id
+        inner join {records_table} as r
+        on p.id_r = r.id
+    ),
+    by_score as (
+        select
+            score,
+            sum(cast(is_match as bigint)) as tp,
+            sum(cast(not is_match as bigint)) as fp
+        from labelled
+        group by score
+    ),
+    cumulative as (
+        select
+            score as threshold,
+            sum(tp) over (order by score desc rows unbounded preceding) as tp,
+            sum(fp) over (order by score desc rows unbounded preceding) as fp
+        from by_score
+    )
+    select
+        threshold,
+        tp,
+        fp,
+        {total_true_pairs} - tp as fn,
+        cast(tp as double) / (tp + fp) as precision,
+        cast(tp as double) / nullif({total_true_pairs}, 0) as recall,
+        2.0 * tp / (2 * tp + fp + ({total_true_pairs} - tp)) as f1
+    from cumulative
+    order by threshold desc
+    """
+    return con.execute(sql)
+
+
+def cluster_predictions(
+    con, predictions_table, records_table, threshold, output_table_name
+):
+    """
+    Cluster records using the connected components of the graph of predictions
+    with score >= threshold, using iterative minimum label propagation.
+
+    Creates the table output_table_name with columns id, cluster (the true
+    cluster) and predicted_cluster
+    """
+
+    sql = f"""
+    create or replace table __edges as
+    select id_l, id_r
+    from {predictions_table}
+    where score >= {threshold}
+    union all
+    select id_r as id_l, id_l as id_r
+    from {predictions_table}
+    where score >= {threshold}
+    """
+    con.execute(sql)
+
+    sql = f"""
+    create or replace table {output_table_name} as
+    select id, cluster, id as predicted_cluster
+    from {records_table}
+    """
+    con.execute(sql)
+
+    iteration = 0
+    while True:
+        iteration += 1
+        sql = f"""
+        create or replace table __neighbour_min as
+        select e.id_l as id, min(n.predicted_cluster) as predicted_cluster
+        from __edges as e
+        inner join {output_table_name} as n
+        on e.id_r = n.id
+        group by e.id_l
+        """
+        con.execute(sql)
+
+        sql = f"""
+        select count(*)
+        from {output_table_name} as c
+        inner join __neighbour_min as m
+        on c.id = m.id
+        where m.predicted_cluster < c.predicted_cluster
+        """
+        num_changed = con.execute(sql).fetchone()[0]
+        logger.info(f"Clustering iteration {iteration}: {num_changed:,.0f} changes")
+        if num_changed == 0:
+            break
+
+        sql = f"""
+        create or replace table {output_table_name} as
+        select
+            c.id,
+            c.cluster,
+            least(c.predicted_cluster, coalesce(m.predicted_cluster, c.predicted_cluster))
+                as predicted_cluster
+        from {output_table_name} as c
+        left join __neighbour_min as m
+        on c.id = m.id
+        """
+        con.execute(sql)
+
+    con.execute("drop table __edges")
+    con.execute("drop table __neighbour_min")
+
+
+def cluster_metrics(con, clusters_table):
+    """
+    Pairwise precision/recall/F and B-cubed precision/recall/F from a table with
+    columns id, cluster (the true cluster) and predicted_cluster
+    """
+
+    sql = f"""
+    with cells as (
+        select cluster, predicted_cluster, count(*) as n
+        from {clusters_table}
+        group by cluster, predicted_cluster
+    ),
+    true_sizes as (
+        select cluster, sum(n) as true_size
+        from cells
+        group by cluster
+    ),
+    predicted_sizes as (
+        select predicted_cluster, sum(n) as predicted_size
+        from cells
+        group by predicted_cluster
+    ),
+    cells_with_sizes as (
+        select c.n, t.true_size, p.predicted_size
+        from cells as c
+        inner join true_sizes as t
+        on c.cluster = t.cluster
+        inner join predicted_sizes as p
+        on c.predicted_cluster = p.predicted_cluster
+    ),
+    totals as (
+        select
+            sum(n * (n - 1) / 2) as tp_pairs,
+            sum(cast(n * n as double) / predicted_size) / sum(n) as b3_precision,
+            sum(cast(n * n as double) / true_size) / sum(n) as b3_recall
+        from cells_with_sizes
+    ),
+    pair_totals as (
+        select
+            (select sum(true_size * (true_size - 1) / 2) from true_sizes)
+                as true_pairs,
+            (select sum(predicted_size * (predicted_size - 1) / 2)
+             from predicted_sizes) as predicted_pairs
+    ),
+    metrics as (
+        select
+            tp_pairs / nullif(predicted_pairs, 0) as pairwise_precision,
+            tp_pairs / nullif(true_pairs, 0) as pairwise_recall,
+            b3_precision,
+            b3_recall
+        from totals, pair_totals
+    )
+    select
+        pairwise_precision,
+        pairwise_recall,
+        2 * pairwise_precision * pairwise_recall
+            / (pairwise_precision + pairwise_recall) as pairwise_f,
+        b3_precision,
+        b3_recall,
+        2 * b3_precision * b3_recall / (b3_precision + b3_recall) as b3_f
+    from metrics
+    """
+    return con.execute(sql)
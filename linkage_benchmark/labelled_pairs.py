@@ -0,0 +1,151 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Blocking rules are SQL expressions that produce a blocking key from a record.
+# Two records are compared if their blocking keys are equal (and not null)
+DEFAULT_BLOCKING_RULES = {
+    "dob_year": "substr(dob, 1, 4)",
+    "first_name_token": "lower(split_part(full_name, ' ', 1))",
+}
+
+_RECORDS_TABLE = "__pairs_records"
+
+
+def _create_keyed_records_table(con, records_table, blocking_rules):
+    """Compute every blocking key once, in one scan of the records"""
+    key_exprs = [
+        f"{expr} as __key_{i}" for i, expr in enumerate(blocking_rules.values())
+    ]
+    key_exprs = ", \n".join(key_exprs)
+
+    sql = f"""
+    create or replace table {_RECORDS_TABLE} as
+    select id, cluster, {key_exprs}
+    from {records_table}
+    """
+    con.execute(sql)
+
+
+def count_pairs_per_blocking_rule(con, records_table, blocking_rules=None):
+    """
+    Count the number of pairwise comparisons each blocking rule generates,
+    without materialising the pairs.
+
+    The count for each rule is the count of pairs of records that share a
+    blocking key i.e. sum of n(n-1)/2 over the blocking key groups.
+    Pairs that are also generated by earlier rules are included, so the
+    total may overstate the number of distinct pairs.
+
+    Returns a dict of {rule_name: pair_count}
+    """
+    if blocking_rules is None:
+        blocking_rules = DEFAULT_BLOCKING_RULES
+
+    _create_keyed_records_table(con, records_table, blocking_rules)
+
+    counts = {}
+    for i, rule_name in enumerate(blocking_rules):
+        sql = f"""
+        select coalesce(sum(n * (n - 1) / 2), 0)
+        from (
+            select count(*) as n
+            from {_RECORDS_TABLE}
+            where __key_{i} is not null
+            group by __key_{i}
+        )
+        """
+        counts[rule_name] = int(con.execute(sql).fetchone()[0])
+    return counts
+
+
+def _pairs_sql(rule_index, chunk, num_chunks):
+    key = f"__key_{rule_index}"
+
+    # Pairs already generated by an earlier blocking rule are excluded
+    earlier_rules = [
+        f"coalesce(l.__key_{j} = r.__key_{j}, false)" for j in range(rule_index)
+    ]
+    if earlier_rules:
+        exclude_earlier = "and not (" + " or ".join(earlier_rules) + ")"
+    else:
+        exclude_earlier = ""
+
+    return f"""
+    with keyed as (
+        select *
+        from {_RECORDS_TABLE}
+        where {key} is not null
+        and hash({key}) % {num_chunks} = {chunk}
+    )
+    select
+        l.id as id_l,
+        r.id as id_r,
+        l.cluster = r.cluster as is_match
+    from keyed as l
+    inner join keyed as r
+    on l.{key} = r.{key}
+    and l.id < r.id
+    {exclude_earlier}
+    """
+
+
+def generate_labelled_pairs(
+    con, records_table, out_path, blocking_rules=None, num_chunks=16, num_workers=4
+):
+    """
+    Stream labelled candidate pairs to parquet, one file per blocking rule
+    and chunk, under out_path/blocking_rule=<rule_name>/
+
+    Each pair is labelled as a match if both records have the same cluster.
+    Records are split into chunks by hashing the blocking key, so every pair
+    lands in exactly one chunk and the chunks can be written in parallel.
+
+    records_table is any table expression DuckDB can select from, e.g. a
+    quoted parquet path.
+
+    Returns a dict of {rule_name: {"expected_pairs": n, "pairs_written": n}}
+    """
+    if blocking_rules is None:
+        blocking_rules = DEFAULT_BLOCKING_RULES
+
+    expected = count_pairs_per_blocking_rule(con, records_table, blocking_rules)
+    for rule_name, count in expected.items():
+        logger.info(f"Blocking rule {rule_name} generates {count:,.0f} pairs")
+
+    tasks = []
+    for rule_index, rule_name in enumerate(blocking_rules):
+        rule_path = os.path.join(out_path, f"blocking_rule={rule_name}")
+        Path(rule_path).mkdir(parents=True, exist_ok=True)
+        for chunk in range(num_chunks):
+            chunk_path = os.path.join(rule_path, f"chunk_{chunk:03}.parquet")
+            tasks.append((rule_name, rule_index, chunk, chunk_path))
+
+    def write_chunk(task):
+        rule_name, rule_index, chunk, chunk_path = task
+        cursor = con.cursor()
+        sql = f"""
+        COPY ({_pairs_sql(rule_index, chunk, num_chunks)})
+        TO '{chunk_path}' (FORMAT 'parquet')
+        """
+        cursor.execute(sql)
+        sql = f"select count(*) from '{chunk_path}'"
+        pairs_written = cursor.execute(sql).fetchone()[0]
+        cursor.close()
+        return rule_name, pairs_written
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        results = list(executor.map(write_chunk, tasks))
+
+    summary = {
+        rule_name: {"expected_pairs": count, "pairs_written": 0}
+        for rule_name, count in expected.items()
+    }
+    for rule_name, pairs_written in results:
+        summary[rule_name]["pairs_written"] += pairs_written
+
+    con.execute(f"drop table {_RECORDS_TABLE}")
+    return summary
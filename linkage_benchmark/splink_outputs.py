@@ -0,0 +1,151 @@
+import logging
+import os
+from pathlib import Path
+
+import pyarrow as pa
+
+from transform_master_data.phonetic import soundex
+
+logger = logging.getLogger(__name__)
+
+# Precomputes, alongside the corrupted records, the blocking key columns and term
+# frequency tables that a Splink linkage run would otherwise recompute on every
+# trial, so that a linkage run can start straight away
+
+# Blocking key columns added to the records.  The soundex columns are computed
+# separately, from the distinct values of first_name and last_name
+BLOCKING_KEY_COLUMNS = {
+    "dob_year": "substr(dob, 1, 4)",
+    "first_name": "nullif(lower(str_split(full_name, ' ')[1]), '')",
+    "last_name": """
+        case when array_length(str_split(full_name, ' ')) > 1
+        then nullif(lower(str_split(full_name, ' ')[-1]), '')
+        end
+    """,
+    "first_name_prefix_3": "substr(lower(str_split(full_name, ' ')[1]), 1, 3)",
+}
+SOUNDEX_COLUMNS = {
+    "first_name_soundex": "first_name",
+    "last_name_soundex": "last_name",
+}
+
+# Columns for which a term frequency table is written, in Splink's format
+# i.e. a table tf_{col} with columns {col} and tf_{col}
+TERM_FREQUENCY_COLUMNS = [
+    "full_name",
+    "first_name",
+    "last_name",
+    "dob",
+    "occupation",
+    "country_citizenship",
+]
+
+
+def _soundex_lookup(con, table_name, columns):
+    """Soundex of every distinct value of the columns, applied in Python"""
+    union = " union ".join(
+        f"select {col} as value from {table_name} where {col} is not null"
+        for col in columns
+    )
+    values = con.execute(union).fetch_arrow_table()["value"].to_pylist()
+    return pa.table(
+        {
+            "value": pa.array(values, pa.string()),
+            "soundex": pa.array([soundex(v) for v in values], pa.string()),
+        }
+    )
+
+
+def add_blocking_keys(con, records_table, out_path):
+    """
+    Write the records in records_table to out_path with the blocking key columns
+    in BLOCKING_KEY_COLUMNS and SOUNDEX_COLUMNS added
+    """
+    key_exprs = ", \n".join(
+        f"{expr} as {col}" for col, expr in BLOCKING_KEY_COLUMNS.items()
+    )
+    sql = f"""
+    create or replace temp table __records_with_keys as
+    select *, {key_exprs}
+    from {records_table}
+    """
+    con.execute(sql)
+
+    lookup = _soundex_lookup(
+        con, "__records_with_keys", list(set(SOUNDEX_COLUMNS.values()))
+    )
+    con.register("__soundex_lookup", lookup)
+
+    soundex_exprs = ", \n".join(
+        f"s_{i}.soundex as {col}" for i, col in enumerate(SOUNDEX_COLUMNS)
+    )
+    soundex_joins = "\n".join(
+        f"left join __soundex_lookup as s_{i} on r.{source_col} = s_{i}.value"
+        for i, source_col in enumerate(SOUNDEX_COLUMNS.values())
+    )
+    sql = f"""
+    COPY (
+    select r.*, {soundex_exprs}
+    from __records_with_keys as r
+    {soundex_joins}
+    order by r.id
+    )
+    TO '{out_path}' (FORMAT 'parquet')
+    """
+    con.execute(sql)
+
+    con.unregister("__soundex_lookup")
+    con.execute("drop table __records_with_keys")
+
+
+def write_term_frequency_tables(
+    con, records_table, out_dir, columns=TERM_FREQUENCY_COLUMNS
+):
+    """
+    Write a term frequency table for each column to out_dir/tf_{col}.parquet.
+    The counts for every column are computed together in a single scan
+    using grouping sets
+    """
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    grouping_sets = ", ".join(f"({col})" for col in columns)
+    cols = ", ".join(columns)
+    grouping_ids = ", ".join(f"grouping({col}) as __grouping_{col}" for col in columns)
+    sql = f"""
+    create or replace temp table __term_counts as
+    select {cols}, {grouping_ids}, count(*) as __count
+    from {records_table}
+    group by grouping sets ({grouping_sets})
+    """
+    con.execute(sql)
+
+    for col in columns:
+        out_path = os.path.join(out_dir, f"tf_{col}.parquet")
+        sql = f"""
+        COPY (
+        select
+            {col},
+            cast(__count as double) / sum(__count) over () as tf_{col}
+        from __term_counts
+        where __grouping_{col} = 0
+        and {col} is not null
+        order by tf_{col} desc
+        )
+        TO '{out_path}' (FORMAT 'parquet')
+        """
+        con.execute(sql)
+
+    con.execute("drop table __term_counts")
+
+
+def write_splink_outputs(con, records_path, records_with_keys_path, tf_dir):
+    """
+    From the corrupted records at records_path, write the records with blocking
+    key columns added to records_with_keys_path, and a term frequency table
+    per column to tf_dir
+    """
+    add_blocking_keys(con, f"'{records_path}'", records_with_keys_path)
+    logger.info(f"Written records with blocking keys to {records_with_keys_path}")
+
+    write_term_frequency_tables(con, f"'{records_with_keys_path}'", tf_dir)
+    logger.info(f"Written term frequency tables to {tf_dir}")
@@ -8,6 +8,17 @@ NAMES = "names"
 
 
 PERSONS_BY_DOD_RAW_OUT_PATH = os.path.join(OUT_BASE, WIKIDATA, RAW, PERSONS, "by_dod")
+PERSONS_BY_DOD_COMPACTED_OUT_PATH = os.path.join(
+    OUT_BASE, WIKIDATA, RAW, PERSONS, "by_dod_compacted"
+)
+PERSONS_BY_DOD_COMPACTION_MANIFEST = os.path.join(
+    PERSONS_BY_DOD_COMPACTED_OUT_PATH, "manifest.json"
+)
+# Persons rescraped by an incremental refresh, which supersede their earlier rows
+PERSONS_DELTAS_RAW_OUT_PATH = os.path.join(OUT_BASE, WIKIDATA, RAW, PERSONS, "deltas")
+PERSONS_REFRESH_STATE = os.path.join(
+    OUT_BASE, WIKIDATA, RAW, PERSONS, "refresh_state.json"
+)
 NAMES_RAW_OUT_PATH_BASE = os.path.join(OUT_BASE, WIKIDATA, RAW, NAMES)
 NAMES_RAW_OUT_PATH_GIVEN_NAME = os.path.join(NAMES_RAW_OUT_PATH_BASE, "name_type=given")
 NAMES_RAW_OUT_PATH_FAMILY_NAME = os.path.join(
@@ -23,6 +34,11 @@ def persons_by_dob_raw_filename_full_year(year):
     return os.path.join(PERSONS_BY_DOD_RAW_OUT_PATH, f"dod_{year}_full.parquet")
 
 
+# Intermediate files written when ingesting a local Wikidata dump rather than
+# scraping the SPARQL endpoint
+WIKIDATA_DUMP_STAGING = os.path.join(OUT_BASE, WIKIDATA, RAW, "dump_staging")
+
+
 # Processed
 PROCESSED = "processed"
 PERSONS_PROCESSED_ONE_ROW_PER_PERSON = os.path.join(
@@ -39,6 +55,22 @@ NAMES_PROCESSED_GIVEN_NAME_ALT_LOOKUP = os.path.join(
 NAMES_PROCESSED_FAMILY_NAME_ALT_LOOKUP = os.path.join(
     OUT_BASE, WIKIDATA, PROCESSED, "alt_name_lookups", "family_name_lookup.parquet"
 )
+# Frequency of each given and family name in the scraped data
+NAMES_PROCESSED_NAME_FREQUENCY_COUNTS = os.path.join(
+    OUT_BASE, WIKIDATA, PROCESSED, "alt_name_lookups", "name_frequency_counts.parquet"
+)
+
+# Index from phonetic code to the given or family names with that code
+NAMES_PROCESSED_PHONETIC_NAME_INDEX = os.path.join(
+    OUT_BASE, WIKIDATA, PROCESSED, "phonetic_name_index"
+)
+
+
+def phonetic_name_index_filename(name_type, encoding):
+    return os.path.join(
+        NAMES_PROCESSED_PHONETIC_NAME_INDEX, f"{name_type}_name_{encoding}.parquet"
+    )
+
 
 # Transformed master data
 TRANSFORMED = "transformed_master_data"
@@ -51,3 +83,58 @@ TRANSFORMED_MASTER_DATA = os.path.join(
 TRANSFORMED_MASTER_DATA_ONE_ROW_PER_PERSON = os.path.join(
     TRANSFORMED_MASTER_DATA, "one_row_per_person"
 )
+
+# The Wikidata id (human) of each person_id, the integer key used in the
+# transformed master data and as the cluster of the corrupted records
+TRANSFORMED_MASTER_DATA_PERSON_IDS = os.path.join(
+    TRANSFORMED_MASTER_DATA, "person_ids", "person_ids.parquet"
+)
+
+# Vocabularies for dictionary encoded columns, one parquet file per column
+# with columns code and value
+TRANSFORMED_MASTER_DATA_VOCABULARIES = os.path.join(
+    TRANSFORMED_MASTER_DATA, "vocabularies"
+)
+
+
+def transformed_master_data_vocabulary_filename(colname):
+    return os.path.join(TRANSFORMED_MASTER_DATA_VOCABULARIES, f"{colname}.parquet")
+
+
+# Spatial index over all places of birth and residence
+TRANSFORMED_MASTER_DATA_PLACE_INDEX = os.path.join(
+    TRANSFORMED_MASTER_DATA, "place_index"
+)
+
+# Corrupted output records
+CORRUPTED = "corrupted"
+CORRUPTED_RECORDS = os.path.join(
+    OUT_BASE, WIKIDATA, CORRUPTED, "corrupted_records.parquet"
+)
+
+# Corrupted records for several source datasets, generated in one pass, with a
+# partition per source i.e. source_dataset=<name>/records.parquet
+CORRUPTED_RECORDS_MULTI_SOURCE = os.path.join(
+    OUT_BASE, WIKIDATA, CORRUPTED, "multi_source"
+)
+
+# Parameter sweeps, with a version directory per run of a sweep, see corrupt/sweep.py
+CORRUPTED_SWEEPS = os.path.join(OUT_BASE, WIKIDATA, CORRUPTED, "sweeps")
+
+# The corrupted records with precomputed blocking key columns, and a term
+# frequency table per column, ready for a Splink linkage run
+CORRUPTED_RECORDS_WITH_BLOCKING_KEYS = os.path.join(
+    OUT_BASE, WIKIDATA, CORRUPTED, "corrupted_records_with_blocking_keys.parquet"
+)
+CORRUPTED_TERM_FREQUENCIES = os.path.join(
+    OUT_BASE, WIKIDATA, CORRUPTED, "term_frequencies"
+)
+
+# Labelled pairwise comparisons, partitioned by blocking rule
+LABELLED_PAIRS = os.path.join(OUT_BASE, WIKIDATA, CORRUPTED, "labelled_pairs")
+
+# Predictions from a linker, with columns id_l, id_r and score, and their evaluation
+LINKAGE_PREDICTIONS = os.path.join(
+    OUT_BASE, WIKIDATA, CORRUPTED, "predictions", "predictions.parquet"
+)
+LINKAGE_EVALUATION = os.path.join(OUT_BASE, WIKIDATA, CORRUPTED, "evaluation")
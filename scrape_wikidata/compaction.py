@@ -0,0 +1,271 @@
+import calendar
+import json
+import logging
+import os
+import re
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from path_fns.filepaths import (
+    PERSONS_BY_DOD_RAW_OUT_PATH,
+    PERSONS_BY_DOD_COMPACTED_OUT_PATH,
+    PERSONS_BY_DOD_COMPACTION_MANIFEST,
+    PERSONS_DELTAS_RAW_OUT_PATH,
+    PERSONS_REFRESH_STATE,
+)
+from scrape_wikidata.refresh import file_written_timestamp
+
+# The scraper writes one small parquet file per month of date of death from 1700
+# to 2000, and one per year before that.  Compaction merges these into a few
+# large files with a single schema, and records which raw files went into which
+# compacted file in a manifest, so that the scraper can still tell which dates
+# have already been scraped
+
+logger = logging.getLogger(__name__)
+
+# Roughly the number of rows in each compacted file, and in each of its row groups
+COMPACTED_FILE_ROWS = 2_000_000
+COMPACTED_ROW_GROUP_ROWS = 250_000
+
+RAW_FILENAME_REGEX = re.compile(r"^dod_(-?\d+)_(\d{2}|full)\.parquet$")
+
+
+def raw_file_dod_range(filename):
+    """
+    The range of dates of death covered by a raw scraped file, as a pair of
+    iso formatted strings, e.g. ('2000-12-01', '2000-12-31') for dod_2000_12.parquet
+    """
+    match = RAW_FILENAME_REGEX.match(os.path.basename(filename))
+    year, month = int(match.group(1)), match.group(2)
+    if month == "full":
+        return f"{year:04}-01-01", f"{year:04}-12-31"
+    month = int(month)
+    last_day = calendar.monthrange(year, month)[1]
+    return f"{year:04}-{month:02}-01", f"{year:04}-{month:02}-{last_day:02}"
+
+
+def load_manifest(manifest_path=PERSONS_BY_DOD_COMPACTION_MANIFEST):
+    """
+    The manifest is a list of compacted files, each of the form
+    {"compacted_file": ..., "num_rows": ..., "sources": [{"source": ...,
+    "dod_start": ..., "dod_end": ..., "written": ...}, ...]}
+    where written is when the raw file was written, which the first incremental
+    refresh starts from
+    """
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, manifest_path=PERSONS_BY_DOD_COMPACTION_MANIFEST):
+    # Written to a temporary file first so an interrupted run never leaves
+    # a partially written manifest
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def compacted_sources(manifest_path=PERSONS_BY_DOD_COMPACTION_MANIFEST):
+    return {
+        source["source"]
+        for compacted in load_manifest(manifest_path)
+        for source in compacted["sources"]
+    }
+
+
+def raw_file_exists(filename, manifest_path=PERSONS_BY_DOD_COMPACTION_MANIFEST):
+    """
+    Whether a raw scraped file has already been written, either because it is
+    on disk or because it has been merged into a compacted file.  Use in place
+    of os.path.exists when resuming a scrape
+    """
+    if os.path.exists(filename):
+        return True
+    return os.path.basename(filename) in compacted_sources(manifest_path)
+
+
+def unified_string_schema(paths):
+    """
+    All scraped values are strings, so the unified schema is the union of all
+    column names, in the order first seen, as strings.  A column that is
+    entirely missing from a file is read as null typed by pandas/arrow
+    """
+    names = {}
+    for path in paths:
+        for name in pq.read_schema(path).names:
+            names[name] = None
+    return pa.schema([(name, pa.string()) for name in names])
+
+
+def conform_to_schema(table, schema):
+    """Add any missing columns as nulls, and cast to the schema's column order and types"""
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table.column(field.name).cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _raw_files_to_compact(raw_dir, manifest):
+    already_compacted = {
+        source["source"] for compacted in manifest for source in compacted["sources"]
+    }
+    filenames = [
+        f
+        for f in os.listdir(raw_dir)
+        if RAW_FILENAME_REGEX.match(f) and f not in already_compacted
+    ]
+    # Chronological order, so each compacted file covers a contiguous range of dates
+    return sorted(filenames, key=_sort_key_dod_start)
+
+
+def _sort_key_dod_start(filename):
+    year, month = RAW_FILENAME_REGEX.match(filename).groups()
+    return int(year), 0 if month == "full" else int(month)
+
+
+def compact_raw_persons(
+    raw_dir=PERSONS_BY_DOD_RAW_OUT_PATH,
+    compacted_dir=PERSONS_BY_DOD_COMPACTED_OUT_PATH,
+    manifest_path=PERSONS_BY_DOD_COMPACTION_MANIFEST,
+    file_rows=COMPACTED_FILE_ROWS,
+    row_group_rows=COMPACTED_ROW_GROUP_ROWS,
+    delete_sources=True,
+):
+    """
+    Merge the raw scraped files in raw_dir that have not yet been compacted
+    into new files of around file_rows rows in compacted_dir, and add them to
+    the manifest.  The raw files are deleted once the manifest has been saved.
+
+    Can be run repeatedly as the scrape progresses.  Existing compacted files
+    are never rewritten, and a new compacted file's schema may gain columns,
+    so read them with read_raw_persons
+    """
+    os.makedirs(compacted_dir, exist_ok=True)
+    manifest = load_manifest(manifest_path)
+    filenames = _raw_files_to_compact(raw_dir, manifest)
+    if not filenames:
+        logger.info("No raw files to compact")
+        return manifest
+
+    paths = [os.path.join(raw_dir, f) for f in filenames]
+    schema = unified_string_schema(paths)
+
+    part_number = len(manifest)
+    writer = None
+    # Each raw file is small, so tables are buffered until there are enough rows
+    # for a full row group, rather than writing one tiny row group per raw file
+    buffer = []
+    buffer_rows = 0
+
+    def flush_buffer():
+        nonlocal buffer, buffer_rows
+        if buffer:
+            # Written as a single row group of around row_group_rows rows
+            table = pa.concat_tables(buffer)
+            writer.write_table(table, row_group_size=table.num_rows)
+        buffer = []
+        buffer_rows = 0
+
+    def close_part():
+        flush_buffer()
+        writer.close()
+        compacted = {
+            "compacted_file": os.path.basename(part_path),
+            "num_rows": part_rows,
+            "sources": part_sources,
+        }
+        manifest.append(compacted)
+        save_manifest(manifest, manifest_path)
+        if delete_sources:
+            for source in part_sources:
+                os.remove(os.path.join(raw_dir, source["source"]))
+        logger.info(
+            f"Compacted {len(part_sources):,.0f} raw files, {part_rows:,.0f} rows, "
+            f"dod {part_sources[0]['dod_start']} to {part_sources[-1]['dod_end']} "
+            f"into {part_path}"
+        )
+
+    for filename, path in zip(filenames, paths):
+        if writer is None:
+            part_path = os.path.join(compacted_dir, f"part_{part_number:05}.parquet")
+            writer = pq.ParquetWriter(part_path, schema)
+            part_rows = 0
+            part_sources = []
+
+        table = conform_to_schema(pq.read_table(path), schema)
+        buffer.append(table)
+        buffer_rows += table.num_rows
+        if buffer_rows >= row_group_rows:
+            flush_buffer()
+
+        dod_start, dod_end = raw_file_dod_range(filename)
+        part_sources.append(
+            {
+                "source": filename,
+                "dod_start": dod_start,
+                "dod_end": dod_end,
+                "written": file_written_timestamp(path),
+            }
+        )
+        part_rows += table.num_rows
+
+        if part_rows >= file_rows:
+            close_part()
+            writer = None
+            part_number += 1
+
+    if writer is not None:
+        close_part()
+
+    return manifest
+
+
+def raw_persons_paths(
+    deltas,
+    raw_dir=PERSONS_BY_DOD_RAW_OUT_PATH,
+    compacted_dir=PERSONS_BY_DOD_COMPACTED_OUT_PATH,
+    deltas_dir=PERSONS_DELTAS_RAW_OUT_PATH,
+):
+    """The compacted files, raw files not yet compacted, and the rows of deltas"""
+    paths = []
+    for directory in [compacted_dir, raw_dir]:
+        if os.path.exists(directory):
+            paths.extend(
+                os.path.join(directory, f)
+                for f in sorted(os.listdir(directory))
+                if f.endswith(".parquet")
+            )
+    return paths + [os.path.join(deltas_dir, d["rows_file"]) for d in deltas]
+
+
+def read_raw_persons(
+    raw_dir=PERSONS_BY_DOD_RAW_OUT_PATH,
+    compacted_dir=PERSONS_BY_DOD_COMPACTED_OUT_PATH,
+    deltas_dir=PERSONS_DELTAS_RAW_OUT_PATH,
+    state_path=PERSONS_REFRESH_STATE,
+):
+    """
+    Read all raw scraped persons, both compacted and not yet compacted, into a
+    single arrow table with a unified schema.  Any humans rescraped by an
+    incremental refresh are taken from the refresh deltas instead
+    """
+    from scrape_wikidata.refresh import load_refresh_state, upsert_deltas
+
+    deltas = load_refresh_state(state_path)["deltas"]
+    paths = raw_persons_paths([], raw_dir, compacted_dir, deltas_dir)
+
+    # Columns missing from a file are filled with nulls by the dataset scan
+    schema = unified_string_schema(
+        raw_persons_paths(deltas, raw_dir, compacted_dir, deltas_dir)
+    )
+    table = ds.dataset(paths, schema=schema, format="parquet").to_table()
+    if deltas:
+        table = upsert_deltas(table, schema, deltas, deltas_dir)
+    return table
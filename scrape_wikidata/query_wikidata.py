@@ -1,8 +1,8 @@
-from SPARQLWrapper import SPARQLWrapper, JSON
-import sys
 import pandas as pd
 
-endpoint_url = "https://query.wikidata.org/sparql"
+from scrape_wikidata.sparql_client import ENDPOINT_URL, run_query
+
+endpoint_url = ENDPOINT_URL
 
 QUERY_HUMAN = """
 SELECT
@@ -93,16 +93,30 @@ LIMIT 3000
 """
 
 
+# The same as QUERY_HUMAN, but for a list of humans rather than a date of death.
+# HUMAN_IDS is replaced by e.g. wd:Q42 wd:Q1001
+QUERY_HUMAN_BY_IDS = QUERY_HUMAN.replace(
+    """  ?dod ^wdt:P570 ?human .
+  VALUES ?dod {"+0000-00-00"^^xsd:dateTime}
+""",
+    """  VALUES ?human { HUMAN_IDS }
+  ?human wdt:P570 ?dod .
+""",
+).replace("LIMIT 3000", "LIMIT 100000")
+
+# Humans modified in a time range, replaced as e.g. 2022-09-01T00:00:00Z
+QUERY_MODIFIED_HUMANS = """
+SELECT ?human WHERE {
+  ?human schema:dateModified ?modified .
+  FILTER(?modified >= "MODIFIED_FROM"^^xsd:dateTime && ?modified < "MODIFIED_TO"^^xsd:dateTime)
+  ?human wdt:P31 wd:Q5 .
+}
+"""
+
+
 def get_results(endpoint_url, query):
-    user_agent = "WDQS-example Python/%s.%s" % (
-        sys.version_info[0],
-        sys.version_info[1],
-    )
-    sparql = SPARQLWrapper(endpoint_url, agent=user_agent)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    query_returned = sparql.query()
-    return query_returned.convert()
+    # Shares one pooled, kept-alive HTTP session across all queries
+    return run_query(query, endpoint_url)
 
 
 def get_value_from_result(x):
@@ -136,3 +150,24 @@ def query_with_offset(query, page=0, pagesize=500):
     df = pd.DataFrame(results["results"]["bindings"])
     df = df.applymap(get_value_from_result)
     return df
+
+
+def query_with_human_ids(query, human_ids):
+    values = " ".join(f"wd:{human_id}" for human_id in human_ids)
+    this_query = query.replace("HUMAN_IDS", values)
+    results = get_results(endpoint_url, this_query)
+    df = pd.DataFrame(results["results"]["bindings"])
+    df = df.applymap(get_value_from_result)
+    return df
+
+
+def query_modified_humans(modified_from, modified_to):
+    """The ids, e.g. Q42, of humans modified in [modified_from, modified_to)"""
+    this_query = QUERY_MODIFIED_HUMANS.replace("MODIFIED_FROM", modified_from).replace(
+        "MODIFIED_TO", modified_to
+    )
+    results = get_results(endpoint_url, this_query)
+    return [
+        replace_url(get_value_from_result(row["human"]))
+        for row in results["results"]["bindings"]
+    ]
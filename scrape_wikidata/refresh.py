@@ -0,0 +1,264 @@
+import datetime
+import json
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from path_fns.filepaths import (
+    PERSONS_BY_DOD_RAW_OUT_PATH,
+    PERSONS_BY_DOD_COMPACTED_OUT_PATH,
+    PERSONS_BY_DOD_COMPACTION_MANIFEST,
+    PERSONS_DELTAS_RAW_OUT_PATH,
+    PERSONS_REFRESH_STATE,
+)
+
+# Incremental refresh of the scraped persons.  Rather than rescraping every date
+# of death, ask Wikidata which humans have been modified since the last refresh
+# (schema:dateModified), and scrape only those.
+#
+# Each refresh window writes a delta: the rows for the humans modified in the
+# window, and the list of those humans.  A delta supersedes all earlier rows for
+# its humans, in the raw files, compacted files and earlier deltas, including
+# humans that no longer match the query and so have no rows.  The refresh state
+# records each delta, and whether it has been applied to the output of step 03,
+# i.e. whether it is dirty
+
+logger = logging.getLogger(__name__)
+
+# Length of the dateModified window in each query for modified humans
+REFRESH_WINDOW = datetime.timedelta(hours=6)
+
+# Number of humans scraped in each query
+REFRESH_BATCH_SIZE = 50
+
+ENTITY_URL_PREFIX = "http://www.wikidata.org/entity/"
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def load_refresh_state(state_path=PERSONS_REFRESH_STATE):
+    """
+    The refresh state is of the form {"last_refresh": ..., "deltas": [{"rows_file":
+    ..., "humans_file": ..., "modified_from": ..., "modified_to": ...,
+    "num_humans": ..., "num_rows": ..., "applied_to_processed": ...}, ...]}
+    with deltas in the order they were scraped
+    """
+    if not os.path.exists(state_path):
+        return {"last_refresh": None, "deltas": []}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def save_refresh_state(state, state_path=PERSONS_REFRESH_STATE):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, state_path)
+
+
+def dirty_deltas(state):
+    """Deltas that have not yet been applied to the output of step 03"""
+    return [d for d in state["deltas"] if not d["applied_to_processed"]]
+
+
+def mark_deltas_applied(deltas, state_path=PERSONS_REFRESH_STATE):
+    state = load_refresh_state(state_path)
+    applied = {d["rows_file"] for d in deltas}
+    for delta in state["deltas"]:
+        if delta["rows_file"] in applied:
+            delta["applied_to_processed"] = True
+    save_refresh_state(state, state_path)
+
+
+def file_written_timestamp(path):
+    """The time a file was last written, in TIMESTAMP_FORMAT"""
+    written = datetime.datetime.fromtimestamp(
+        os.path.getmtime(path), tz=datetime.timezone.utc
+    )
+    return written.strftime(TIMESTAMP_FORMAT)
+
+
+def default_last_refresh(
+    raw_dir=PERSONS_BY_DOD_RAW_OUT_PATH,
+    compacted_dir=PERSONS_BY_DOD_COMPACTED_OUT_PATH,
+    manifest_path=PERSONS_BY_DOD_COMPACTION_MANIFEST,
+):
+    """
+    If there has never been a refresh, refresh from when the scrape began, taken
+    to be the time the oldest raw file was written.  Compaction deletes the raw
+    files, so the compaction manifest records when each was written.  Anything
+    modified during the scrape may have been missed, so it is refreshed
+    """
+    from scrape_wikidata.compaction import load_manifest
+
+    written = []
+    if os.path.exists(raw_dir):
+        written.extend(
+            file_written_timestamp(os.path.join(raw_dir, f))
+            for f in os.listdir(raw_dir)
+            if f.endswith(".parquet")
+        )
+    for compacted in load_manifest(manifest_path):
+        for source in compacted["sources"]:
+            if "written" in source:
+                written.append(source["written"])
+            else:
+                # Manifests from before the raw files' times were recorded
+                written.append(
+                    file_written_timestamp(
+                        os.path.join(compacted_dir, compacted["compacted_file"])
+                    )
+                )
+    if not written:
+        raise ValueError("No scraped persons found to refresh")
+    # Timestamps in TIMESTAMP_FORMAT sort in time order
+    return min(written)
+
+
+def human_ids(human_col):
+    """Human ids without the entity url prefix, which the scraper's rows include"""
+    return pc.replace_substring(human_col.cast(pa.string()), ENTITY_URL_PREFIX, "")
+
+
+def scrape_humans(ids, batch_size=REFRESH_BATCH_SIZE):
+    import pandas as pd
+
+    from scrape_wikidata.query_wikidata import (
+        query_with_human_ids,
+        QUERY_HUMAN_BY_IDS,
+    )
+
+    dfs = []
+    for i in range(0, len(ids), batch_size):
+        df = query_with_human_ids(QUERY_HUMAN_BY_IDS, ids[i : i + batch_size])
+        if len(df) > 0:
+            dfs.append(df)
+    if not dfs:
+        return pd.DataFrame({"human": pd.Series([], dtype=object)})
+    return pd.concat(dfs)
+
+
+def refresh_window(modified_from, modified_to, deltas_dir=PERSONS_DELTAS_RAW_OUT_PATH):
+    """
+    Scrape the humans modified in [modified_from, modified_to), writing them as
+    a delta.  Returns the delta's entry in the refresh state, or None if no humans
+    were modified
+    """
+    from scrape_wikidata.query_wikidata import query_modified_humans
+
+    ids = sorted(set(query_modified_humans(modified_from, modified_to)))
+    if not ids:
+        return None
+
+    df = scrape_humans(ids)
+
+    name = "delta_" + modified_from.replace(":", "").replace("-", "")
+    rows_file = f"{name}.parquet"
+    humans_file = f"{name}_humans.parquet"
+    df.to_parquet(os.path.join(deltas_dir, rows_file), index=False)
+    pq.write_table(
+        pa.table({"human": pa.array(ids, pa.string())}),
+        os.path.join(deltas_dir, humans_file),
+    )
+
+    logger.info(
+        f"{len(ids):,.0f} humans modified from {modified_from} to {modified_to}, "
+        f"{len(df):,.0f} rows"
+    )
+
+    return {
+        "rows_file": rows_file,
+        "humans_file": humans_file,
+        "modified_from": modified_from,
+        "modified_to": modified_to,
+        "num_humans": len(ids),
+        "num_rows": len(df),
+        "applied_to_processed": False,
+    }
+
+
+def refresh_persons(
+    since=None,
+    until=None,
+    window=REFRESH_WINDOW,
+    deltas_dir=PERSONS_DELTAS_RAW_OUT_PATH,
+    state_path=PERSONS_REFRESH_STATE,
+):
+    """
+    Scrape the humans modified since the last refresh, one window at a time.
+    The state is saved after each window, so an interrupted refresh resumes from
+    the last completed window
+    """
+    os.makedirs(deltas_dir, exist_ok=True)
+    state = load_refresh_state(state_path)
+
+    if since is None:
+        since = state["last_refresh"] or default_last_refresh()
+    if until is None:
+        until = datetime.datetime.now(datetime.timezone.utc).strftime(TIMESTAMP_FORMAT)
+
+    start = datetime.datetime.strptime(since, TIMESTAMP_FORMAT)
+    end = datetime.datetime.strptime(until, TIMESTAMP_FORMAT)
+
+    while start < end:
+        window_end = min(start + window, end)
+        modified_from = start.strftime(TIMESTAMP_FORMAT)
+        modified_to = window_end.strftime(TIMESTAMP_FORMAT)
+
+        delta = refresh_window(modified_from, modified_to, deltas_dir)
+        if delta is not None:
+            state["deltas"].append(delta)
+        state["last_refresh"] = modified_to
+        save_refresh_state(state, state_path)
+
+        start = window_end
+
+    return state
+
+
+def upsert_deltas(table, schema, deltas, deltas_dir=PERSONS_DELTAS_RAW_OUT_PATH):
+    """
+    Apply deltas, in the order they were scraped, to a table of raw rows, so that
+    each human's rows come only from the latest delta that includes them
+    """
+    from scrape_wikidata.compaction import conform_to_schema
+
+    superseded = pa.array([], pa.string())
+    tables = []
+    for delta in reversed(deltas):
+        rows = pq.read_table(os.path.join(deltas_dir, delta["rows_file"]))
+        rows = rows.filter(
+            pc.invert(pc.is_in(human_ids(rows["human"]), value_set=superseded))
+        )
+        tables.append(conform_to_schema(rows, schema))
+
+        humans = pq.read_table(os.path.join(deltas_dir, delta["humans_file"]))
+        superseded = pa.concat_arrays([superseded, humans["human"].combine_chunks()])
+
+    table = table.filter(
+        pc.invert(pc.is_in(human_ids(table["human"]), value_set=superseded))
+    )
+    return pa.concat_tables([table] + tables[::-1])
+
+
+def read_delta_humans(deltas, deltas_dir=PERSONS_DELTAS_RAW_OUT_PATH):
+    """The ids of the humans rescraped in deltas, as a single column table"""
+    tables = [pq.read_table(os.path.join(deltas_dir, d["humans_file"])) for d in deltas]
+    return (
+        pa.concat_tables(tables)
+        if tables
+        else pa.table({"human": pa.array([], pa.string())})
+    )
+
+
+def read_delta_rows(dirty, all_deltas, schema, deltas_dir=PERSONS_DELTAS_RAW_OUT_PATH):
+    """
+    The current rows for the humans in the dirty deltas.  These all come from
+    deltas, because a delta supersedes all earlier rows for its humans
+    """
+    humans = read_delta_humans(dirty, deltas_dir)["human"].combine_chunks()
+    rows = upsert_deltas(schema.empty_table(), schema, all_deltas, deltas_dir)
+    return rows.filter(pc.is_in(human_ids(rows["human"]), value_set=humans))
@@ -0,0 +1,131 @@
+import functools
+import logging
+import os
+import sys
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import brotli  # noqa: F401  urllib3 can only decode br responses if installed
+except ImportError:
+    brotli = None
+
+# A single pooled HTTP session shared by every SPARQL query in the process, so
+# that connections to the endpoint are kept alive between queries rather than
+# paying for a new TCP and TLS handshake on each one.  Responses are requested
+# compressed, and long queries are sent as a POST.
+#
+# The settings can be overridden by environment variables, e.g.
+#
+# SPLINK_SYNTH_SPARQL_READ_TIMEOUT=120 python 01_scrape_persons.py
+
+logger = logging.getLogger(__name__)
+
+ENDPOINT_URL = "https://query.wikidata.org/sparql"
+
+USER_AGENT = "splink_synthetic_data Python/%s.%s requests/%s" % (
+    sys.version_info[0],
+    sys.version_info[1],
+    requests.__version__,
+)
+
+DEFAULT_SETTINGS = {
+    # Seconds to wait for a connection, and for the response.  The Wikidata
+    # query service itself times out queries after 60 seconds
+    "connect_timeout": 10,
+    "read_timeout": 90,
+    # Queries whose urlencoded form is longer than this are sent as a POST,
+    # because long urls may be rejected
+    "max_get_query_length": 2000,
+    # Retries on throttling (429) and temporary server errors, respecting
+    # the Retry-After header
+    "max_retries": 3,
+    "backoff_factor": 2,
+}
+
+ENV_VARS = {
+    "connect_timeout": "SPLINK_SYNTH_SPARQL_CONNECT_TIMEOUT",
+    "read_timeout": "SPLINK_SYNTH_SPARQL_READ_TIMEOUT",
+    "max_get_query_length": "SPLINK_SYNTH_SPARQL_MAX_GET_QUERY_LENGTH",
+    "max_retries": "SPLINK_SYNTH_SPARQL_MAX_RETRIES",
+    "backoff_factor": "SPLINK_SYNTH_SPARQL_BACKOFF_FACTOR",
+}
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+def get_sparql_settings():
+    """The client settings, from the defaults overridden by environment variables"""
+    settings = dict(DEFAULT_SETTINGS)
+    for setting, env_var in ENV_VARS.items():
+        if env_var in os.environ:
+            settings[setting] = float(os.environ[env_var])
+    settings["max_get_query_length"] = int(settings["max_get_query_length"])
+    settings["max_retries"] = int(settings["max_retries"])
+    return settings
+
+
+def _accept_encoding():
+    if brotli is not None:
+        return "gzip, deflate, br"
+    return "gzip, deflate"
+
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """
+    Get the HTTP session for this process.  The same session, and so the
+    same pool of kept-alive connections, is returned on every call
+    """
+    settings = get_sparql_settings()
+
+    retry = Retry(
+        total=settings["max_retries"],
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET", "POST"],
+        backoff_factor=settings["backoff_factor"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {
+            "User-Agent": USER_AGENT,
+            "Accept": "application/sparql-results+json",
+            "Accept-Encoding": _accept_encoding(),
+        }
+    )
+    return session
+
+
+def run_query(query, endpoint_url=ENDPOINT_URL, session=None):
+    """
+    Run a SPARQL query, returning the parsed JSON results.
+
+    Uses a GET for short queries and a POST for long ones
+    """
+    settings = get_sparql_settings()
+    if session is None:
+        session = get_session()
+    timeout = (settings["connect_timeout"], settings["read_timeout"])
+
+    params = {"query": query, "format": "json"}
+    if len(urlencode(params)) > settings["max_get_query_length"]:
+        response = session.post(endpoint_url, data=params, timeout=timeout)
+    else:
+        response = session.get(endpoint_url, params=params, timeout=timeout)
+
+    response.raise_for_status()
+    logger.debug(
+        f"{response.request.method} {len(response.content):,.0f} bytes "
+        f"({response.headers.get('Content-Encoding', 'uncompressed')}) "
+        f"in {response.elapsed.total_seconds():.2f}s"
+    )
+    return response.json()
@@ -0,0 +1,488 @@
+import bz2
+import gzip
+import json
+import logging
+import os
+import sys
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from path_fns.filepaths import (
+    persons_by_dob_raw_filename_year_month,
+    persons_by_dob_raw_filename_full_year,
+)
+
+logger = logging.getLogger(__name__)
+
+# Reads a locally downloaded Wikidata JSON dump (latest-all.json.bz2 or .gz) as an
+# alternative to scraping the SPARQL endpoint.  The dump is read in two passes:
+#
+# 1. The dump is split into chunks of lines, which are parsed in parallel.  Each
+#    worker writes the humans, entity labels and name variants found in its chunk
+#    to a staging directory
+# 2. DuckDB joins the staged humans and name variants to the labels of the
+#    entities they refer to, to produce the same raw parquet layout as
+#    01_scrape_persons.py and 02_scrape_names.py
+
+# The language of labels, equivalent to "[AUTO_LANGUAGE],en" in the SPARQL queries
+LANGUAGE = "en"
+
+HUMAN = "Q5"
+
+# Classes of given names and family names.  The SPARQL queries use
+# wdt:P31/wdt:P279* to include all subclasses, which is not possible in a single
+# pass of the dump, so the most common classes are listed
+GIVEN_NAME_CLASSES = {"Q202444", "Q12308941", "Q11879590", "Q3409032"}
+FAMILY_NAME_CLASSES = {"Q101352"}
+HYPOCORISM = "Q1130279"
+
+# Properties of humans that refer to other entities, whose labels are looked up
+# in the second pass.  Equivalent to the OPTIONAL clauses in QUERY_HUMAN
+HUMAN_ENTITY_PROPERTIES = {
+    "given_name": "P735",
+    "family_name": "P734",
+    "country_citizen": "P27",
+    "place_birth": "P19",
+    "ethnicity": "P172",
+    "residence": "P551",
+    "sex_or_gender": "P21",
+    "occupation": "P106",
+}
+
+# Properties of humans whose values are used directly
+HUMAN_VALUE_PROPERTIES = {
+    "dob": "P569",
+    "dod": "P570",
+    "birth_name": "P1477",
+    "name_native_language": "P1559",
+    "pseudonym": "P742",
+}
+
+HUMANS = "humans"
+LABELS = "labels"
+NAME_VARIANTS = "name_variants"
+
+HUMANS_SCHEMA = pa.schema(
+    [
+        ("human", pa.string()),
+        ("humanLabel", pa.string()),
+        ("humanAltLabel", pa.string()),
+        ("humanDescription", pa.string()),
+    ]
+    + [(col, pa.list_(pa.string())) for col in HUMAN_ENTITY_PROPERTIES]
+    + [(col, pa.list_(pa.string())) for col in HUMAN_VALUE_PROPERTIES]
+)
+
+LABELS_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("label", pa.string()),
+        ("coordinates", pa.list_(pa.string())),
+        ("country", pa.list_(pa.string())),
+    ]
+)
+
+NAME_VARIANTS_SCHEMA = pa.schema(
+    [
+        ("name_type", pa.string()),
+        ("name_id", pa.string()),
+        ("alt_id", pa.string()),
+        ("alt_text", pa.string()),
+        ("name_variant_type", pa.string()),
+    ]
+)
+
+
+def open_dump(path):
+    """Open a .json, .json.bz2 or .json.gz dump as text.  A path of - reads
+    from stdin, so that a faster parallel decompressor can be piped in, e.g.
+    lbzip2 -dc latest-all.json.bz2 | python 01_02_ingest_wikidata_dump.py -"""
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_line_chunks(f, chunk_size):
+    chunk = []
+    for line in f:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_entity_line(line):
+    """The dump is a JSON array with one entity per line"""
+    line = line.strip().rstrip(",")
+    if line in ("[", "]", ""):
+        return None
+    return json.loads(line)
+
+
+def truthy_statements(entity, prop):
+    """
+    The statements that wdt: returns in SPARQL, i.e. the preferred rank statements
+    if there are any, otherwise the normal rank statements
+    """
+    statements = entity.get("claims", {}).get(prop, [])
+    preferred = [s for s in statements if s.get("rank") == "preferred"]
+    if preferred:
+        return preferred
+    return [s for s in statements if s.get("rank") == "normal"]
+
+
+def sparql_time(time):
+    """
+    A dump time value in the format the SPARQL endpoint returns it.  Dates with
+    only a year or month have 00 for the unknown month and day, which the
+    endpoint returns as 01 e.g. '+1950-00-00T00:00:00Z' -> '1950-01-01T00:00:00Z'
+    """
+    time = time.lstrip("+")
+    sign = "-" if time.startswith("-") else ""
+    date, rest = time[len(sign) :].split("T", 1)
+    year, month, day = date.split("-")
+    month = "01" if month == "00" else month
+    day = "01" if day == "00" else day
+    return f"{sign}{year}-{month}-{day}T{rest}"
+
+
+def snak_value(snak):
+    """The value of a snak in the same format as the SPARQL endpoint returns it"""
+    if snak.get("snaktype") != "value":
+        return None
+
+    value = snak["datavalue"]["value"]
+    value_type = snak["datavalue"]["type"]
+
+    if value_type == "wikibase-entityid":
+        return value["id"]
+    if value_type == "time":
+        return sparql_time(value["time"])
+    if value_type == "globecoordinate":
+        return f"Point({value['longitude']} {value['latitude']})"
+    if value_type == "monolingualtext":
+        return value["text"]
+    if value_type == "string":
+        return value
+    return None
+
+
+def truthy_values(entity, prop):
+    values = [snak_value(s["mainsnak"]) for s in truthy_statements(entity, prop)]
+    return [v for v in values if v is not None]
+
+
+def get_label(entity):
+    label = entity.get("labels", {}).get(LANGUAGE)
+    return label["value"] if label else None
+
+
+def human_row(entity):
+    """
+    A row for a human with the properties QUERY_HUMAN selects, or None if the
+    entity is not a human with a given name, family name, date of birth and
+    date of death
+    """
+    if HUMAN not in truthy_values(entity, "P31"):
+        return None
+
+    row = {"human": entity["id"], "humanLabel": get_label(entity)}
+
+    aliases = entity.get("aliases", {}).get(LANGUAGE, [])
+    row["humanAltLabel"] = ", ".join(a["value"] for a in aliases) or None
+
+    description = entity.get("descriptions", {}).get(LANGUAGE)
+    row["humanDescription"] = description["value"] if description else None
+
+    for col, prop in HUMAN_ENTITY_PROPERTIES.items():
+        row[col] = truthy_values(entity, prop)
+    for col, prop in HUMAN_VALUE_PROPERTIES.items():
+        row[col] = truthy_values(entity, prop)
+
+    required = ["given_name", "family_name", "dob", "dod"]
+    if not all(row[col] for col in required):
+        return None
+    return row
+
+
+def name_variant_rows(entity):
+    """Rows for the name variants recorded on a given name, family name or
+    hypocorism entity"""
+    rows = []
+    classes = set(truthy_values(entity, "P31"))
+
+    def row(name_type, name_id, alt_id, alt_text, name_variant_type):
+        return {
+            "name_type": name_type,
+            "name_id": name_id,
+            "alt_id": alt_id,
+            "alt_text": alt_text,
+            "name_variant_type": name_variant_type,
+        }
+
+    for name_type, name_classes in [
+        ("given", GIVEN_NAME_CLASSES),
+        ("family", FAMILY_NAME_CLASSES),
+    ]:
+        if classes & name_classes:
+            for alt_id in truthy_values(entity, "P460"):
+                rows.append(
+                    row(name_type, entity["id"], alt_id, None, "said_to_be_the_same_as")
+                )
+
+    if classes & GIVEN_NAME_CLASSES:
+        for nickname in truthy_values(entity, "P1449"):
+            rows.append(row("given", entity["id"], None, nickname, "nickname"))
+
+    # The name a hypocorism is 'of' is a qualifier on the instance of statement
+    for statement in entity.get("claims", {}).get("P31", []):
+        if snak_value(statement["mainsnak"]) != HYPOCORISM:
+            continue
+        for qualifier in statement.get("qualifiers", {}).get("P642", []):
+            of = snak_value(qualifier)
+            if of is not None:
+                rows.append(row("given", of, entity["id"], None, "hypocorism"))
+
+    return rows
+
+
+def label_row(entity):
+    """The label, coordinates and country of an entity, which are needed when it
+    is referred to by a human"""
+    label = get_label(entity)
+    coordinates = truthy_values(entity, "P625")
+    if label is None and not coordinates:
+        return None
+    return {
+        "id": entity["id"],
+        "label": label,
+        "coordinates": coordinates,
+        "country": truthy_values(entity, "P17"),
+    }
+
+
+def process_chunk(chunk_index_and_lines, staging_dir):
+    """Parse a chunk of the dump, writing what's found to staging_dir.
+    Returns the number of humans found"""
+    chunk_index, lines = chunk_index_and_lines
+
+    humans, labels, name_variants = [], [], []
+    for line in lines:
+        entity = parse_entity_line(line)
+        if entity is None or entity.get("type") != "item":
+            continue
+
+        row = human_row(entity)
+        if row is not None:
+            humans.append(row)
+        row = label_row(entity)
+        if row is not None:
+            labels.append(row)
+        name_variants.extend(name_variant_rows(entity))
+
+    for kind, rows, schema in [
+        (HUMANS, humans, HUMANS_SCHEMA),
+        (LABELS, labels, LABELS_SCHEMA),
+        (NAME_VARIANTS, name_variants, NAME_VARIANTS_SCHEMA),
+    ]:
+        path = os.path.join(staging_dir, kind, f"chunk_{chunk_index:06}.parquet")
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), path)
+
+    return len(humans)
+
+
+def stage_dump(dump_path, staging_dir, num_workers=None, chunk_size=20_000):
+    """
+    First pass: parse the dump in parallel chunks, writing the humans, labels and
+    name variants to staging_dir
+    """
+    for kind in [HUMANS, LABELS, NAME_VARIANTS]:
+        os.makedirs(os.path.join(staging_dir, kind), exist_ok=True)
+
+    num_humans = 0
+    with open_dump(dump_path) as f, Pool(num_workers) as pool:
+        chunks = enumerate(iter_line_chunks(f, chunk_size))
+        process = partial(process_chunk, staging_dir=staging_dir)
+        for i, chunk_num_humans in enumerate(pool.imap_unordered(process, chunks)):
+            num_humans += chunk_num_humans
+            if i % 100 == 0:
+                logger.info(f"Processed {i + 1:,.0f} chunks, {num_humans:,.0f} humans")
+
+    logger.info(f"Found {num_humans:,.0f} humans")
+    return num_humans
+
+
+def _labelled_list(col):
+    return f"list(coalesce(label, id)) filter (where col = '{col}')"
+
+
+def get_raw_persons(con, staging_dir):
+    """
+    Second pass: one row per human and value, with the same columns as the
+    output of query_with_date(QUERY_HUMAN, date).
+
+    Rather than one row per combination of values as the SPARQL endpoint returns,
+    the nth row for a human holds the nth value of each column, which gives the
+    same result once 03_raw_persons_data_to_one_line_per_person.py aggregates
+    each column into a distinct list
+    """
+    humans = f"'{os.path.join(staging_dir, HUMANS)}/*.parquet'"
+    labels = f"'{os.path.join(staging_dir, LABELS)}/*.parquet'"
+
+    refs = [
+        f"select human, '{col}' as col, unnest({col}) as id from {humans}"
+        for col in HUMAN_ENTITY_PROPERTIES
+    ]
+    refs = " union all ".join(refs)
+
+    sql = f"""
+    with refs as ({refs}),
+    place_countries as (
+        select
+            r.human,
+            case when r.col = 'place_birth' then 'birth_country'
+                else 'residence_country' end as col,
+            unnest(l.country) as id
+        from refs as r
+        inner join {labels} as l
+        on r.id = l.id
+        where r.col in ('place_birth', 'residence')
+    ),
+    labelled_refs as (
+        select r.human, r.col, r.id, l.label, l.coordinates
+        from (select * from refs union all select * from place_countries) as r
+        left join {labels} as l
+        on r.id = l.id
+    ),
+    lists as (
+        select
+            human,
+            list(id) filter (where col = 'given_name') as given_name,
+            {_labelled_list('given_name')} as given_nameLabel,
+            list(id) filter (where col = 'family_name') as family_name,
+            {_labelled_list('family_name')} as family_nameLabel,
+            list(id) filter (where col = 'place_birth') as place_birth,
+            {_labelled_list('place_birth')} as place_birthLabel,
+            flatten(list(coordinates) filter (where col = 'place_birth'))
+                as birth_coordinates,
+            list(id) filter (where col = 'birth_country') as birth_country,
+            {_labelled_list('birth_country')} as birth_countryLabel,
+            list(id) filter (where col = 'occupation') as occupation,
+            {_labelled_list('occupation')} as occupationLabel,
+            list(id) filter (where col = 'ethnicity') as ethnicity,
+            {_labelled_list('ethnicity')} as ethnicityLabel,
+            list(id) filter (where col = 'residence') as residence,
+            {_labelled_list('residence')} as residenceLabel,
+            flatten(list(coordinates) filter (where col = 'residence'))
+                as residence_coordinates,
+            {_labelled_list('residence_country')} as residence_countryLabel,
+            list(id) filter (where col = 'country_citizen') as country_citizen,
+            {_labelled_list('country_citizen')} as country_citizenLabel,
+            {_labelled_list('sex_or_gender')} as sex_or_genderLabel
+        from labelled_refs
+        group by human
+    ),
+    joined as (
+        select
+            h.human,
+            h.humanLabel,
+            h.humanAltLabel,
+            h.humanDescription,
+            h.dob,
+            h.dod,
+            h.birth_name,
+            h.name_native_language,
+            h.pseudonym,
+            l.* exclude (human)
+        from {humans} as h
+        inner join lists as l
+        on h.human = l.human
+    )
+    select * from joined
+    """
+    con.execute(f"create or replace table __dump_persons_lists as {sql}")
+
+    columns = con.execute("describe __dump_persons_lists").fetchall()
+    list_cols = [c[0] for c in columns if c[1].endswith("[]")]
+    num_rows = " , ".join(f"coalesce(len({c}), 0)" for c in list_cols)
+    row_values = ", ".join(f"{c}[i] as {c}" for c in list_cols)
+
+    sql = f"""
+    select
+        human,
+        coalesce(humanLabel, human) as humanLabel,
+        humanAltLabel,
+        humanDescription,
+        {row_values},
+        dod[1] as __partition_dod
+    from (
+        select *, unnest(range(1, greatest({num_rows}) + 1)) as i
+        from __dump_persons_lists
+    )
+    """
+    return con.execute(sql)
+
+
+def write_raw_persons_by_dod(persons_table):
+    """
+    Write the raw persons to the same files as 01_scrape_persons.py, i.e. one
+    file per month of death from 1700 onwards, and one per year before that.
+    persons_table is the output of get_raw_persons
+    """
+    dod = persons_table["__partition_dod"].to_pylist()
+    persons_table = persons_table.drop(["__partition_dod"])
+    years = np.array([int(d[: d.index("-", 1)]) for d in dod])
+    months = np.array([int(d[d.index("-", 1) + 1 :][:2]) for d in dod])
+    # Month 0 is a date with only a year, which the monthly files hold in January
+    months = np.where(months == 0, 1, months)
+    months = np.where(years >= 1700, months, 0)
+
+    order = np.lexsort((months, years))
+    persons_table = persons_table.take(order)
+    years, months = years[order], months[order]
+
+    boundaries = np.flatnonzero((np.diff(years) != 0) | (np.diff(months) != 0)) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(years)]])
+
+    for start, end in zip(starts, ends):
+        year, month = int(years[start]), int(months[start])
+        if month == 0:
+            filename = persons_by_dob_raw_filename_full_year(year)
+        else:
+            filename = persons_by_dob_raw_filename_year_month(year, month)
+        pq.write_table(persons_table.slice(start, end - start), filename)
+
+
+def get_raw_names(con, staging_dir, name_type):
+    """
+    Name variants in the same format as get_standardised_table in
+    scrape_wikidata/names.py.  name_type is 'given' or 'family'
+    """
+    name_variants = f"'{os.path.join(staging_dir, NAME_VARIANTS)}/*.parquet'"
+    labels = f"'{os.path.join(staging_dir, LABELS)}/*.parquet'"
+
+    sql = f"""
+    select distinct
+        n.name_id as {name_type}_name,
+        coalesce(o.label, n.name_id) as original_name,
+        coalesce(n.alt_text, a.label, n.alt_id) as alt_name,
+        n.name_variant_type
+    from {name_variants} as n
+    left join {labels} as o
+    on n.name_id = o.id
+    left join {labels} as a
+    on n.alt_id = a.id
+    where n.name_type = '{name_type}'
+    """
+    return con.execute(sql)
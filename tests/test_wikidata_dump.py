@@ -0,0 +1,98 @@
+import os
+
+import duckdb
+import pyarrow.parquet as pq
+import pytest
+
+from scrape_wikidata import wikidata_dump
+from scrape_wikidata.wikidata_dump import (
+    HUMANS,
+    LABELS,
+    NAME_VARIANTS,
+    get_raw_persons,
+    process_chunk,
+    sparql_time,
+    write_raw_persons_by_dod,
+)
+
+FIXTURE_DUMP = os.path.join(
+    os.path.dirname(__file__), "fixtures", "wikidata_dump_sample.json"
+)
+
+
+@pytest.mark.parametrize(
+    "time, expected",
+    [
+        ("+1950-03-11T00:00:00Z", "1950-03-11T00:00:00Z"),
+        ("+1950-03-00T00:00:00Z", "1950-03-01T00:00:00Z"),
+        ("+1950-00-00T00:00:00Z", "1950-01-01T00:00:00Z"),
+        ("-0500-00-00T00:00:00Z", "-0500-01-01T00:00:00Z"),
+    ],
+)
+def test_sparql_time(time, expected):
+    assert sparql_time(time) == expected
+
+
+@pytest.fixture
+def raw_persons(tmp_path):
+    staging_dir = str(tmp_path / "staging")
+    for kind in [HUMANS, LABELS, NAME_VARIANTS]:
+        os.makedirs(os.path.join(staging_dir, kind))
+
+    with open(FIXTURE_DUMP) as f:
+        num_humans = process_chunk((0, f.readlines()), staging_dir)
+    assert num_humans == 2
+
+    con = duckdb.connect()
+    return get_raw_persons(con, staging_dir).fetch_arrow_table()
+
+
+def test_get_raw_persons(raw_persons):
+    rows = raw_persons.to_pylist()
+    john = [r for r in rows if r["human"] == "Q1001"]
+    mary = [r for r in rows if r["human"] == "Q1002"]
+
+    assert {r["human"] for r in rows} == {"Q1001", "Q1002"}
+
+    # The nth row of a human holds its nth value of each column
+    assert len(john) == 2
+    assert john[0]["humanLabel"] == "John Smith"
+    assert john[0]["humanAltLabel"] == "Johnny Smith"
+    assert john[0]["given_nameLabel"] == "John"
+    assert john[0]["family_nameLabel"] == "Smith"
+    assert john[0]["place_birthLabel"] == "London"
+    assert john[0]["birth_coordinates"] == "Point(-0.1 51.5)"
+    assert john[0]["birth_countryLabel"] == "United Kingdom"
+    assert {r["occupationLabel"] for r in john} == {"writer", "poet"}
+    assert john[0]["dob"] == "1890-03-11T00:00:00Z"
+    assert john[0]["dod"] == "1950-01-01T00:00:00Z"
+    assert john[0]["__partition_dod"] == "1950-01-01T00:00:00Z"
+
+    # The deprecated given name is left out
+    assert len(mary) == 1
+    assert mary[0]["given_nameLabel"] == "Mary"
+    assert mary[0]["dob"] == "1820-07-01T00:00:00Z"
+
+
+def test_write_raw_persons_by_dod(raw_persons, tmp_path, monkeypatch):
+    def year_month(year, month):
+        return str(tmp_path / f"dod_{year}_{month:02}.parquet")
+
+    def full_year(year):
+        return str(tmp_path / f"dod_{year}_full.parquet")
+
+    monkeypatch.setattr(
+        wikidata_dump, "persons_by_dob_raw_filename_year_month", year_month
+    )
+    monkeypatch.setattr(
+        wikidata_dump, "persons_by_dob_raw_filename_full_year", full_year
+    )
+
+    write_raw_persons_by_dod(raw_persons)
+
+    assert sorted(os.listdir(tmp_path / ".")) == sorted(
+        ["staging", "dod_1950_01.parquet", "dod_1901_02.parquet"]
+    )
+    table = pq.read_table(year_month(1950, 1))
+    assert set(table["human"].to_pylist()) == {"Q1001"}
+    assert "__partition_dod" not in table.column_names
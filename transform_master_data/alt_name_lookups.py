@@ -1,8 +1,47 @@
 from .pipeline import SQLPipeline
 
+# The name columns in the scraped data for which we build alternative name lookups
+NAME_COLUMNS = ["given_nameLabel", "family_nameLabel"]
+
+# Stored in the metadata of the cached name frequency counts, and changed
+# whenever get_name_frequency_counts changes, so that a cache written by an
+# older version is recomputed.  Version 2 merges names that differ only in case
+NAME_FREQUENCY_COUNTS_VERSION = "2"
+
+
+def get_name_frequency_counts(
+    con, tablename_scraped_one_row_per_person, name_cols=NAME_COLUMNS
+):
+    """
+    Count the frequency of every name in each of name_cols in the scraped data:
+    | name_col        | name  | count |
+    |:----------------|:------|:------|
+    | given_nameLabel | jody  | 1021  |
+
+    The result is the same for every name lookup built from the scraped data,
+    so it can be computed once and shared between them.  Each name column is
+    counted separately and the counts combined, which is faster than grouping
+    all the names by name_col
+    """
+
+    pipeline = SQLPipeline(con)
+
+    counts_by_col = [
+        f"""
+    select '{col}' as name_col, lower(name) as name, count(*) as count
+    from (select unnest({col}) as name from {tablename_scraped_one_row_per_person})
+    group by lower(name)
+    """
+        for col in name_cols
+    ]
+    sql = " union all ".join(counts_by_col)
+    pipeline.enqueue_sql(sql, "name_frequency_counts")
+
+    return pipeline.execute_pipeline()
+
 
 def get_name_weighted_lookup(
-    con, raw_name_col, tablename_alt_names, tablename_scraped_one_row_per_person
+    con, raw_name_col, tablename_alt_names, tablename_name_frequency_counts
 ):
     """
     Get a table that is a lookup between original names and weighted alternatives:
@@ -10,48 +49,33 @@ def get_name_weighted_lookup(
     |:----------------|:----------------------------------|:-------------------------|
     | jody            | ['joseph', 'joe', 'judith', 'jo'] | [0.43, 0.23, 0.16, 0.16] |
 
+    tablename_name_frequency_counts is the output of get_name_frequency_counts
     """
 
-    # The table 'name_frequency_counts' contains a count of
-    # name frequencies from the scraped data
-
     pipeline = SQLPipeline(con)
 
     sql = f"""
-    select unnest({raw_name_col}) as name
-    from {tablename_scraped_one_row_per_person}
-    """
-    pipeline.enqueue_sql(sql, "all_names")
-
-    sql = """
-    select lower(name) as name, count(*) as count
-    from all_names
-    group by name
-    order by count desc
+    select name, count
+    from {tablename_name_frequency_counts}
+    where name_col = '{raw_name_col}'
     """
 
     pipeline.enqueue_sql(sql, "name_frequency_counts")
 
-    # Concatenate all of our name variants of different types
+    # Concatenate all of our name variants of different types, in both directions.
+    # union (rather than union all) removes duplicates
     sql = f"""
     select
         lower(original_name) as original_name, lower(alt_name) as alt_name, name_variant_type
     from {tablename_alt_names}
 
-    union all
+    union
 
     select
         lower(alt_name) as original_name, lower(original_name) as alt_name, name_variant_type
     from {tablename_alt_names}
     """
 
-    pipeline.enqueue_sql(sql, "name_variants_concat")
-
-    sql = """
-    select distinct original_name, alt_name, name_variant_type
-        from name_variants_concat
-    """
-
     pipeline.enqueue_sql(sql, "distinct_names_concat")
 
     # Weight the name variants, using the frequency of the name variant as the weight
@@ -86,17 +110,28 @@ def get_name_weighted_lookup(
         sum(weighted_count) as weight
     from names_with_weights_as_counts
     group by original_name, alt_name
-    order by original_name, weight desc
     """
     pipeline.enqueue_sql(sql, "names_with_weights_as_floats")
 
-    # Get proportions within groups by counts
     sql = """
     select
         original_name,
-        alt_name,
-        cast(weight as double)/(sum(weight) over (partition by original_name)) as weight
+        sum(weight) as total_weight
     from names_with_weights_as_floats
+    group by original_name
+    """
+    pipeline.enqueue_sql(sql, "total_weights")
+
+    # Get proportions within groups by counts
+    sql = """
+    select
+        w.original_name,
+        w.alt_name,
+        cast(w.weight as double)/t.total_weight as weight
+    from names_with_weights_as_floats as w
+    inner join total_weights as t
+    on w.original_name = t.original_name
+    order by w.original_name, w.weight desc
     """
 
     pipeline.enqueue_sql(sql, "weighted_proportions")
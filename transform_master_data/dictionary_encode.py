@@ -0,0 +1,68 @@
+# Low cardinality, heavily repeated string columns such as occupations are stored
+# as lists of integer codes, with a shared vocabulary table mapping codes to values.
+# This reduces memory use, and means that corruptions that pick from a list
+# pick integers rather than strings
+
+DICTIONARY_ENCODED_COLUMNS = [
+    "occupationLabel",
+    "country_citizenLabel",
+    "given_nameLabel",
+    "family_nameLabel",
+]
+
+
+def get_vocabulary(con, colname, input_table_name):
+    """
+    Get a table with columns code and value, containing every distinct value
+    found in the list column colname
+    """
+    sql = f"""
+    select
+        cast(row_number() over (order by value) - 1 as integer) as code,
+        value
+    from (
+        select distinct unnest({colname}) as value
+        from {input_table_name}
+    )
+    where value is not null
+    """
+    return con.execute(sql)
+
+
+def dictionary_encode_list_column(
+    pipeline, colname, vocabulary_table_name, output_table_name, input_table_name="df"
+):
+    """
+    Replace a list of strings column with a list of integer codes, looked up
+    in vocabulary_table_name, in the same order as the strings
+    """
+
+    sql = f"""
+    select
+        human,
+        unnest({colname}) as value,
+        unnest(range(1, len({colname}) + 1)) as position
+    from {input_table_name}
+    """
+    pipeline.enqueue_sql(sql, f"unnested_{colname}")
+
+    sql = f"""
+    select u.human, list(v.code order by u.position) as codes
+    from unnested_{colname} as u
+    inner join {vocabulary_table_name} as v
+    on u.value = v.value
+    group by u.human
+    """
+    pipeline.enqueue_sql(sql, f"encoded_{colname}")
+
+    sql = f"""
+    select
+        i.* exclude ({colname}),
+        coalesce(e.codes, []) as {colname}
+    from {input_table_name} as i
+    left join encoded_{colname} as e
+    on i.human = e.human
+    """
+    pipeline.enqueue_sql(sql, output_table_name)
+
+    return pipeline
@@ -0,0 +1,68 @@
+def add_full_name_tokens(
+    pipeline,
+    given_name_lookup_table,
+    family_name_lookup_table,
+    output_table_name,
+    input_table_name="df",
+):
+    """
+    Split the first full name in full_name_arr into lower cased tokens, so that
+    corruption functions do not need to parse strings.  Adds the list columns:
+
+    full_name_tokens: e.g. ['john', 'paul', 'smith']
+    full_name_token_roles: e.g. ['first', 'middle', 'last']
+    full_name_token_has_alt: whether the token appears in the given or family name
+        alternatives lookups, e.g. [true, true, false]
+
+    The columns are null if the person has no full name
+    """
+
+    sql = f"""
+    select
+        human,
+        unnest(str_split(lower(full_name_arr[1]), ' ')) as token,
+        unnest(range(1, len(str_split(full_name_arr[1], ' ')) + 1)) as position,
+        len(str_split(full_name_arr[1], ' ')) as num_tokens
+    from {input_table_name}
+    where full_name_arr[1] is not null
+    """
+    pipeline.enqueue_sql(sql, "full_name_tokens_unnested")
+
+    sql = f"""
+    select
+        t.human,
+        list(t.token order by t.position) as full_name_tokens,
+        list(
+            case
+                when t.position = 1 then 'first'
+                when t.position = t.num_tokens then 'last'
+                else 'middle'
+            end
+            order by t.position
+        ) as full_name_token_roles,
+        list(
+            g.original_name is not null or f.original_name is not null
+            order by t.position
+        ) as full_name_token_has_alt
+    from full_name_tokens_unnested as t
+    left join {given_name_lookup_table} as g
+    on t.token = g.original_name
+    left join {family_name_lookup_table} as f
+    on t.token = f.original_name
+    group by t.human
+    """
+    pipeline.enqueue_sql(sql, "full_name_tokens_per_person")
+
+    sql = f"""
+    select
+        i.*,
+        t.full_name_tokens,
+        t.full_name_token_roles,
+        t.full_name_token_has_alt
+    from {input_table_name} as i
+    left join full_name_tokens_per_person as t
+    on i.human = t.human
+    """
+    pipeline.enqueue_sql(sql, output_table_name)
+
+    return pipeline
@@ -0,0 +1,17 @@
+def add_person_ids(pipeline, output_table_name, input_table_name="df"):
+    """
+    Add person_id, an int64 key for each person, which is the number in their
+    Wikidata id (42 for Q42), so a person keeps the same person_id when the data
+    is rescraped or refreshed.  Downstream joins, group bys and pair generation
+    use it in place of the human string, and the mapping back to the Wikidata id
+    is kept in a side table
+    """
+
+    sql = f"""
+    select
+        cast(substr(human, 2) as bigint) as person_id,
+        *
+    from {input_table_name}
+    """
+    pipeline.enqueue_sql(sql, output_table_name)
+    return pipeline
@@ -0,0 +1,155 @@
+import unicodedata
+
+# Phonetic encodings of names, so that names which sound alike get the same code.
+# DuckDB has no phonetic functions, so these are applied in Python to the
+# distinct values of a column, and the results joined back in SQL
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def _ascii_letters(name):
+    """Lower case ascii letters only, with accents removed e.g. 'Zoë-Anne' -> 'zoeanne'"""
+    name = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in name.lower() if "a" <= c <= "z")
+
+
+def soundex(name):
+    """
+    American soundex e.g. soundex('Robert') == soundex('Rupert') == 'R163'.
+    Returns None if the name has no letters
+    """
+    if name is None:
+        return None
+    letters = _ascii_letters(name)
+    if not letters:
+        return None
+
+    code = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0])
+    for c in letters[1:]:
+        digit = SOUNDEX_CODES.get(c)
+        if digit is not None and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code, but vowels do
+        if c not in "hw":
+            previous = digit
+
+    return code.ljust(4, "0")
+
+
+NYSIIS_VOWELS = "AEIOU"
+
+# Replacements for the start and end of a name, applied before encoding
+NYSIIS_PREFIXES = [
+    ("MAC", "MCC"),
+    ("KN", "NN"),
+    ("K", "C"),
+    ("PH", "FF"),
+    ("PF", "FF"),
+    ("SCH", "SSS"),
+]
+NYSIIS_SUFFIXES = [
+    ("EE", "Y"),
+    ("IE", "Y"),
+    ("DT", "D"),
+    ("RT", "D"),
+    ("RD", "D"),
+    ("NT", "D"),
+    ("ND", "D"),
+]
+
+# Length of a NYSIIS code, as in the original algorithm
+NYSIIS_MAX_LENGTH = 6
+
+
+def _nysiis_translate(chars, i):
+    """
+    The translation of the characters starting at chars[i], which replaces the
+    same number of characters.  chars before i have already been translated
+    """
+    c = chars[i]
+    following = "".join(chars[i + 1 : i + 3])
+    if c == "E" and following[:1] == "V":
+        return "AF"
+    if c in NYSIIS_VOWELS:
+        return "A"
+    # Y within a name is a vowel, so that e.g. smyth sounds like smith.  A final
+    # Y, which the suffix rules also produce, is kept
+    if c == "Y" and i < len(chars) - 1:
+        return "A"
+    if c == "Q":
+        return "G"
+    if c == "Z":
+        return "S"
+    if c == "M":
+        return "N"
+    if c == "K":
+        return "N" if following[:1] == "N" else "C"
+    if c == "S" and following == "CH":
+        return "SSS"
+    if c == "P" and following[:1] == "H":
+        return "FF"
+    previous = chars[i - 1]
+    if c == "H" and (
+        previous not in NYSIIS_VOWELS or following[:1] not in NYSIIS_VOWELS
+    ):
+        return previous
+    if c == "W" and previous in NYSIIS_VOWELS:
+        return previous
+    return c
+
+
+def nysiis(name):
+    """
+    New York State Identification and Intelligence System code, which is more
+    specific than soundex e.g. nysiis('Knight') == nysiis('Night') == 'NAGT'.
+    Returns None if the name has no letters
+    """
+    if name is None:
+        return None
+    name = _ascii_letters(name).upper()
+    if not name:
+        return None
+
+    for prefix, replacement in NYSIIS_PREFIXES:
+        if name.startswith(prefix):
+            name = replacement + name[len(prefix) :]
+            break
+    for suffix, replacement in NYSIIS_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[: -len(suffix)] + replacement
+            break
+
+    chars = list(name)
+    code = chars[0]
+    i = 1
+    while i < len(chars):
+        translation = _nysiis_translate(chars, i)
+        chars[i : i + len(translation)] = translation
+        # Repeated characters are only added once
+        for c in translation:
+            if c != code[-1]:
+                code += c
+        i += len(translation)
+
+    if len(code) > 1 and code.endswith("S"):
+        code = code[:-1]
+    if code.endswith("AY"):
+        code = code[:-2] + "Y"
+    if len(code) > 1 and code.endswith("A"):
+        code = code[:-1]
+
+    return code[:NYSIIS_MAX_LENGTH]
+
+
+# Phonetic encodings that a phonetic name index can be built with
+PHONETIC_ENCODINGS = {"nysiis": nysiis, "soundex": soundex}
@@ -0,0 +1,58 @@
+from .parse_point import parse_point_to_lat_lng
+
+
+def get_distinct_places(pipeline, input_table_name):
+    """
+    Get a table of all distinct places of birth and residence, with columns
+    place, place_label, lat and lng.
+
+    The columns of the one row per person table are aggregated independently,
+    so the nth place is not necessarily at the nth coordinates.  Only people with
+    a single place (and so a single label and set of coordinates) are used.
+    """
+
+    sql = f"""
+    select
+        place_birth[1] as place,
+        place_birthLabel[1] as place_label,
+        birth_coordinates as coordinates
+    from {input_table_name}
+    where len(place_birth) = 1
+    and len(place_birthLabel) = 1
+    and len(birth_coordinates) = 1
+
+    union all
+
+    select
+        residence[1] as place,
+        residenceLabel[1] as place_label,
+        residence_coordinates as coordinates
+    from {input_table_name}
+    where len(residence) = 1
+    and len(residenceLabel) = 1
+    and len(residence_coordinates) = 1
+    """
+
+    pipeline.enqueue_sql(sql, "places_with_point_coordinates")
+
+    pipeline = parse_point_to_lat_lng(
+        pipeline,
+        "coordinates",
+        output_table_name="places_with_coordinates",
+        input_table_name="places_with_point_coordinates",
+    )
+
+    sql = """
+    select distinct
+        place,
+        place_label,
+        coordinates[1].lat as lat,
+        coordinates[1].lng as lng
+    from places_with_coordinates
+    where coordinates[1].lat is not null
+    and coordinates[1].lng is not null
+    """
+
+    pipeline.enqueue_sql(sql, "distinct_places")
+
+    return pipeline
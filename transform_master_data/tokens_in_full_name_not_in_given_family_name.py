@@ -1,4 +1,4 @@
-import duckdb
+from duckdb_fns.connection import get_connection
 from transform_master_data.pipeline import SQLPipeline
 
 
@@ -6,7 +6,7 @@ def tokens_in_full_name_not_in_given_family_name():
 
     path = "out_data/wikidata/processed/one_row_per_person/raw_scraped_one_row_per_person.parquet"
 
-    con = duckdb.connect()
+    con = get_connection()
 
     pipeline = SQLPipeline(con)
 